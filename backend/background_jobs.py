@@ -0,0 +1,106 @@
+"""
+Tâches de fond partagées entre les workers Gunicorn
+Chaque worker lance les mêmes boucles; MongoDB arbitre qui exécute quoi
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, List
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from metrics import JOB_DURATION, JOB_RUNS
+
+logger = logging.getLogger(__name__)
+
+_tasks: List[asyncio.Task] = []
+
+
+def worker_id() -> str:
+    """Identifiant du worker courant (recalculé après fork)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def claim_run(db, name: str, interval_seconds: float) -> bool:
+    """
+    Réserve la prochaine exécution d'une tâche périodique
+    Un seul worker obtient le créneau: les autres tombent sur la clé dupliquée
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        await db.job_locks.find_one_and_update(
+            {"_id": name, "$or": [{"next_run_at": {"$lte": now}}, {"next_run_at": {"$exists": False}}]},
+            {"$set": {
+                "next_run_at": now + timedelta(seconds=interval_seconds),
+                "claimed_by": worker_id(),
+                "claimed_at": now
+            }},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def acquire_lease(db, name: str, ttl_seconds: float) -> bool:
+    """
+    Prend ou renouvelle un bail exclusif (élection d'un leader entre workers)
+    Le bail expire si le détenteur cesse de le renouveler
+    """
+    now = datetime.now(timezone.utc)
+    owner = worker_id()
+    try:
+        doc = await db.job_locks.find_one_and_update(
+            {"_id": name, "$or": [{"lease_expires_at": {"$lte": now}}, {"lease_owner": owner}, {"lease_owner": {"$exists": False}}]},
+            {"$set": {"lease_owner": owner, "lease_expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc is not None and doc.get("lease_owner") == owner
+    except DuplicateKeyError:
+        return False
+
+
+async def release_lease(db, name: str):
+    await db.job_locks.update_one(
+        {"_id": name, "lease_owner": worker_id()},
+        {"$unset": {"lease_owner": "", "lease_expires_at": ""}}
+    )
+
+
+async def run_periodic(db, name: str, interval_seconds: float, job: Callable[[], Awaitable], poll_seconds: float = 60):
+    """Exécute `job` toutes les `interval_seconds` secondes, sur un seul worker à la fois"""
+    while True:
+        try:
+            if await claim_run(db, name, interval_seconds):
+                logger.info(f"⏱️ Tâche {name} lancée sur {worker_id()}")
+                started = time.perf_counter()
+                try:
+                    await job()
+                finally:
+                    JOB_DURATION.labels(name).observe(time.perf_counter() - started)
+                JOB_RUNS.labels(name, "success").inc()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            JOB_RUNS.labels(name, "error").inc()
+            logger.error(f"❌ Erreur tâche {name}: {e}")
+        await asyncio.sleep(min(poll_seconds, interval_seconds))
+
+
+def start_background_task(coro) -> asyncio.Task:
+    # Coroutine, ou tâche déjà lancée (préchauffage inachevé) à annuler avec les autres
+    task = asyncio.ensure_future(coro)
+    _tasks.append(task)
+    return task
+
+
+async def stop_background_tasks():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
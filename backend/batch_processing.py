@@ -0,0 +1,113 @@
+"""
+Moteur de traitement par lots pour les tâches de maintenance du catalogue
+Itère un curseur Motor lot par lot, applique une transformation asynchrone avec
+une concurrence bornée et écrit les résultats en bulk_write non ordonnés
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Union
+
+from pymongo.errors import BulkWriteError
+
+from metrics import BATCH_ITEMS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 4
+
+
+class RateLimiter:
+    """Espace les démarrages pour ne pas dépasser `rate_per_second` (ex: quota TMDB)"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def process_cursor(
+    cursor,
+    transform: Callable[[dict], Awaitable[Optional[Union[object, List[object]]]]],
+    collection,
+    name: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate_per_second: Optional[float] = None,
+    describe: Callable[[dict], str] = lambda doc: str(doc.get("title", doc.get("id", "Unknown"))),
+) -> dict:
+    """
+    Applique `transform` à chaque document du curseur
+    `transform` renvoie une opération d'écriture pymongo (UpdateOne...), une liste, ou None
+    Seul le lot courant est en mémoire: la consommation reste stable quelle que soit la taille du catalogue
+    """
+    limiter = RateLimiter(rate_per_second) if rate_per_second else None
+    semaphore = asyncio.Semaphore(concurrency)
+    errors: List[str] = []
+    processed = 0
+    written = 0
+    started = time.monotonic()
+
+    async def run(doc: dict):
+        async with semaphore:
+            if limiter:
+                await limiter.wait()
+            try:
+                return await transform(doc)
+            except Exception as e:
+                errors.append(f"{describe(doc)}: {str(e)}")
+                logger.error(f"❌ {name} - erreur pour {describe(doc)}: {str(e)}")
+                return None
+
+    async def flush(batch: List[dict]) -> int:
+        results = await asyncio.gather(*(run(doc) for doc in batch))
+        operations = []
+        for result in results:
+            if isinstance(result, list):
+                operations.extend(result)
+            elif result is not None:
+                operations.append(result)
+        if not operations:
+            return 0
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            return result.modified_count + result.upserted_count
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors.append(f"Écriture: {error.get('errmsg')}")
+            return e.details.get("nModified", 0) + e.details.get("nUpserted", 0)
+
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            written += await flush(batch)
+            processed += len(batch)
+            BATCH_ITEMS.labels(name).inc(len(batch))
+            batch = []
+            elapsed = time.monotonic() - started
+            logger.info(f"⚙️ {name}: {processed} éléments traités ({processed / elapsed:.1f}/s)")
+    if batch:
+        written += await flush(batch)
+        processed += len(batch)
+        BATCH_ITEMS.labels(name).inc(len(batch))
+
+    elapsed = time.monotonic() - started
+    stats = {
+        "processed": processed,
+        "written": written,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 2),
+        "items_per_second": round(processed / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    logger.info(f"✅ {name} terminé: {processed} traités, {written} écrits, {len(errors)} erreurs ({stats['items_per_second']}/s)")
+    return stats
@@ -0,0 +1,110 @@
+"""
+Budget de démarrage d'un worker: temps d'import de server.py et mémoire résidente
+Usage (depuis backend/): python benchmarks/bench_startup.py [--runs 5] [--max-import-seconds 1.5] [--max-rss-mb 200]
+
+Chaque mesure importe server dans un processus neuf (cache disque chaud après le premier essai).
+Échoue (code 1) si la médiane dépasse un budget, si un module lourd chargé à la demande
+(scipy, qrcode, Pillow...) est importé au démarrage, ou si l'import ouvre une connexion MongoDB
+ou démarre un thread autre que celui des logs: gunicorn --preload forke après cet import
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules qui ne doivent être chargés qu'à la première utilisation
+LAZY_MODULES = ["scipy", "qrcode", "PIL", "pandas", "boto3"]
+# Threads autorisés après l'import (QueueListener des logs, relancé après fork)
+ALLOWED_THREADS = {"MainThread", "_monitor"}
+
+PROBE = """
+import json, resource, sys, threading, time
+started = time.perf_counter()
+import server
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "import_seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "lazy_loaded": [name for name in %r if name in sys.modules],
+    "mongo_opened": server.client.delegate._topology._opened,
+    "thread_targets": sorted(getattr(getattr(thread, "_target", None), "__name__", thread.name) for thread in threading.enumerate()),
+}))
+""" % (LAZY_MODULES,)
+
+
+def probe_env() -> dict:
+    env = dict(os.environ)
+    # Aucune connexion n'est tentée à l'import: une URL locale suffit
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "streamflex_startup_probe")
+    return env
+
+
+def run_probe() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=probe_env(),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int = 15) -> list:
+    """Modules les plus coûteux (temps cumulé, -X importtime)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"], cwd=BACKEND_DIR, env=probe_env(),
+        capture_output=True, text=True, check=True
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        timings.append((int(cumulative), name))
+    return sorted(timings, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de temps d'import et de mémoire d'un worker")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, default=float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", "1.5")))
+    parser.add_argument("--max-rss-mb", type=float, default=float(os.environ.get("STARTUP_RSS_BUDGET_MB", "200")))
+    args = parser.parse_args()
+
+    run_probe()  # premier import: compilation .pyc et cache disque, non compté
+    probes = [run_probe() for _ in range(args.runs)]
+    import_seconds = statistics.median(probe["import_seconds"] for probe in probes)
+    rss_mb = statistics.median(probe["rss_mb"] for probe in probes)
+    last = probes[-1]
+
+    failures = []
+    if import_seconds > args.max_import_seconds:
+        failures.append(f"import en {import_seconds:.2f}s > budget {args.max_import_seconds:.2f}s")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"mémoire résidente {rss_mb:.0f} Mo > budget {args.max_rss_mb:.0f} Mo")
+    if last["lazy_loaded"]:
+        failures.append(f"modules à charger à la demande importés au démarrage: {', '.join(last['lazy_loaded'])}")
+    if last["mongo_opened"]:
+        failures.append("client MongoDB ouvert à l'import (incompatible avec gunicorn --preload)")
+    unexpected = [target for target in last["thread_targets"] if target not in ALLOWED_THREADS]
+    if unexpected:
+        failures.append(f"threads démarrés à l'import: {', '.join(unexpected)}")
+
+    print(f"import de server : {import_seconds * 1000:7.0f} ms (médiane de {args.runs}, budget {args.max_import_seconds * 1000:.0f} ms)")
+    print(f"mémoire résidente: {rss_mb:7.0f} Mo (budget {args.max_rss_mb:.0f} Mo)")
+    if failures:
+        print("\nmodules les plus coûteux (ms cumulées):")
+        for cumulative, name in slowest_imports():
+            print(f"  {cumulative / 1000:8.1f}  {name}")
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Dans le budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark des appels d'import TMDB et de renommage Discord contre les faux serveurs
+Usage (depuis backend/), après avoir lancé benchmarks/fake_upstreams.py:
+    python benchmarks/bench_tmdb_import.py --kind movie --titles 200 --concurrency 8
+    python benchmarks/bench_tmdb_import.py --kind series --discord-renames 5
+
+Rejoue pour chaque titre la séquence d'appels de la route d'import (détails, crédits, logo) via
+les fonctions fetch_tmdb_* du serveur: débit, latence par titre et effet des 429 (nouveaux essais
+de tmdb_get) d'après les compteurs du faux serveur. Aucune écriture en base
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def import_title(server, kind: str, tmdb_id: int):
+    """Mêmes appels TMDB que les routes /movies/import-tmdb, /series/import-tmdb et /episodes/import-tmdb"""
+    if kind == "movie":
+        await server.fetch_tmdb_movie(tmdb_id)
+        await server.fetch_tmdb_movie_credits(tmdb_id)
+        await server.fetch_tmdb_logo(tmdb_id, "movie")
+    elif kind == "series":
+        await server.fetch_tmdb_series(tmdb_id)
+        await server.fetch_tmdb_series_credits(tmdb_id)
+        await server.fetch_tmdb_logo(tmdb_id, "tv")
+    else:
+        await server.fetch_tmdb_episode(tmdb_id, 1 + tmdb_id % 5, 1 + tmdb_id % 20)
+
+
+async def run(args):
+    import server
+    from fastapi import HTTPException
+    from discord_service import DiscordRESTClient
+
+    # Une ligne par requête HTTP noierait le résultat (les 429 restent signalés par tmdb_get)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    fake_root = args.tmdb_url.rsplit("/3", 1)[0]
+    async with httpx.AsyncClient(base_url=fake_root) as fake:
+        await fake.post("/_reset")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        durations, failures = [], 0
+
+        async def one(tmdb_id: int):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await import_title(server, args.kind, tmdb_id)
+                    durations.append(time.perf_counter() - started)
+                except (HTTPException, httpx.HTTPError):
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(args.first_id + i) for i in range(args.titles)))
+        elapsed = time.perf_counter() - started
+
+        print(f"{args.titles} titres ({args.kind}) en {elapsed:.2f}s: {args.titles / elapsed:.1f} titres/s, {failures} échecs")
+        if durations:
+            values = np.array(durations) * 1000
+            print(f"par titre: p50 {np.percentile(values, 50):.0f} ms, p95 {np.percentile(values, 95):.0f} ms, max {values.max():.0f} ms")
+
+        if args.discord_renames:
+            rest = DiscordRESTClient("fake-token", base_url=args.discord_url)
+            results = []
+            started = time.perf_counter()
+            for i in range(args.discord_renames):
+                results.append(await rest.rename_channel("bench-channel", f"🔊 Films : {i}"))
+            await rest.close()
+            print(f"Discord: {sum(results)}/{len(results)} renommages acceptés en {time.perf_counter() - started:.2f}s")
+
+        stats = (await fake.get("/_stats")).json()["routes"]
+    print("\nréponses du faux serveur:")
+    for route, statuses in sorted(stats.items()):
+        print(f"  {route:<22} " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des imports TMDB hors ligne")
+    parser.add_argument("--tmdb-url", default="http://127.0.0.1:8765/3")
+    parser.add_argument("--discord-url", default="http://127.0.0.1:8765/api/v10")
+    parser.add_argument("--kind", choices=["movie", "series", "episode"], default="movie")
+    parser.add_argument("--titles", type=int, default=100)
+    parser.add_argument("--first-id", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--discord-renames", type=int, default=0, help="renommages Discord à tenter après les imports")
+    args = parser.parse_args()
+
+    # Lu par server à l'import; la base n'est pas utilisée par les appels mesurés
+    os.environ["TMDB_BASE_URL"] = args.tmdb_url
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "streamflex_bench")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
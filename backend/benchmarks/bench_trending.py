@@ -0,0 +1,144 @@
+"""
+Benchmark du calcul des tendances (trending.py)
+Usage (depuis backend/): python benchmarks/bench_trending.py [--titles 100000] [--buckets 10] [--mongo-url URL]
+
+Mesure séparément la construction des tableaux à partir des tranches chargées
+et le calcul vectorisé (scores décroissants + top N pour chaque type), puis le chemin complet
+de compute_trending (lecture par lots, tableaux et classement dans des threads) avec le plus long
+blocage de la boucle asyncio observé. Si MongoDB est joignable, les tranches sont lues depuis une
+base jetable (--db, supprimée ensuite); sinon depuis la mémoire par lots de LOAD_BATCH_SIZE
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from trending import WINDOW_HOURS, TRENDING_SIZE, LOAD_BATCH_SIZE, BucketArrays, build_arrays, decayed_scores, load_buckets, rank_titles, top_n  # noqa: E402
+
+BUDGET_SECONDS = 1.0
+# Plus long blocage toléré de la boucle pendant le chemin complet
+LOOP_STALL_BUDGET_SECONDS = 0.1
+
+
+def generate_rows(n_titles: int, buckets_per_title: int, now: datetime) -> list:
+    rng = random.Random(42)
+    hours = [(now - timedelta(hours=h)).strftime("%Y-%m-%dT%H") for h in range(WINDOW_HOURS)]
+    rows = []
+    for i in range(n_titles):
+        content_type = "movie" if i % 3 else "series"
+        for hour in rng.sample(hours, buckets_per_title):
+            rows.append({"content_type": content_type, "content_id": f"title-{i}", "hour": hour, "count": rng.randint(1, 500)})
+    return rows
+
+
+async def full_path(rows: list, now: datetime, db) -> tuple:
+    """Chemin de compute_trending (sans l'écriture des rails); renvoie (durée, plus long blocage de la boucle)"""
+    stall = 0.0
+
+    async def watch_loop():
+        nonlocal stall
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stall = max(stall, time.perf_counter() - before - 0.005)
+
+    watcher = asyncio.create_task(watch_loop())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    if db is not None:
+        arrays = await load_buckets(db, now)
+    else:
+        arrays = BucketArrays(now)
+        for start in range(0, len(rows), LOAD_BATCH_SIZE):
+            await asyncio.to_thread(arrays.add, rows[start:start + LOAD_BATCH_SIZE])
+    await asyncio.to_thread(rank_titles, arrays, TRENDING_SIZE)
+    elapsed = time.perf_counter() - started
+    watcher.cancel()
+    return elapsed, stall
+
+
+async def run_full_path(rows: list, now: datetime, args) -> tuple:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo.errors import PyMongoError
+
+    client = AsyncIOMotorClient(args.mongo_url, serverSelectionTimeoutMS=1000)
+    try:
+        await client.admin.command("ping")
+    except PyMongoError:
+        print(f"⚠️ MongoDB injoignable ({args.mongo_url}): tranches lues depuis la mémoire")
+        return await full_path(rows, now, None)
+    db = client[args.db]
+    try:
+        await db.view_counts_hourly.create_index("hour")
+        for start in range(0, len(rows), LOAD_BATCH_SIZE):
+            await db.view_counts_hourly.insert_many([dict(row) for row in rows[start:start + LOAD_BATCH_SIZE]], ordered=False)
+        return await full_path(rows, now, db)
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+
+def timed(fn, repeat: int):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - started)
+    return result, statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du calcul des tendances")
+    parser.add_argument("--titles", type=int, default=100_000)
+    parser.add_argument("--buckets", type=int, default=10, help="tranches horaires par titre")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="streamflex_bench_trending")
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    rows = generate_rows(args.titles, args.buckets, now)
+    print(f"{args.titles} titres, {len(rows)} tranches")
+
+    (titles, title_index, age_hours, counts), build_time = timed(lambda: build_arrays(rows, now), args.repeat)
+    content_types = np.array([content_type for content_type, _ in titles])
+
+    def score():
+        scores = decayed_scores(title_index, age_hours, counts, len(titles))
+        for content_type in ("movie", "series"):
+            candidates = np.flatnonzero(content_types == content_type)
+            candidates[top_n(scores[candidates], TRENDING_SIZE * 2)]
+        return scores
+
+    _, score_time = timed(score, args.repeat)
+    total = build_time + score_time
+
+    print(f"construction des tableaux : {build_time * 1000:8.1f} ms (médiane)")
+    print(f"scores + top N            : {score_time * 1000:8.1f} ms (médiane)")
+    print(f"total                     : {total * 1000:8.1f} ms (budget {BUDGET_SECONDS * 1000:.0f} ms)")
+
+    full_time, stall = asyncio.run(run_full_path(rows, now, args))
+    print(f"chemin complet            : {full_time * 1000:8.1f} ms, boucle bloquée au plus {stall * 1000:.1f} ms "
+          f"(budget {LOOP_STALL_BUDGET_SECONDS * 1000:.0f} ms)")
+
+    failures = []
+    if total > BUDGET_SECONDS:
+        failures.append("calcul")
+    if stall > LOOP_STALL_BUDGET_SECONDS:
+        failures.append("blocage de la boucle")
+    if failures:
+        print(f"❌ Budget dépassé: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ Dans le budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Faux serveurs TMDB et Discord pour mesurer les imports et rafraîchissements hors ligne
+Usage (depuis backend/):
+    python benchmarks/fake_upstreams.py --port 8765 --latency-ms 80 --jitter-ms 40 --tmdb-rate 40/10 --error-rate 0.01
+
+puis démarrer le serveur (ou un benchmark) avec:
+    TMDB_BASE_URL=http://127.0.0.1:8765/3 DISCORD_API_BASE=http://127.0.0.1:8765/api/v10
+
+TMDB: films, séries, épisodes, crédits et images générés de façon déterministe à partir de l'id,
+ou lus dans --fixtures (réponses enregistrées: <fixtures>/movie/550.json pour /3/movie/550).
+Limite de débit à la TMDB (429 + Retry-After au-delà du quota), erreurs 500 et 404 aléatoires.
+Discord: PATCH /channels/{id} avec les en-têtes X-RateLimit-* et la limite de renommage par canal.
+GET /_stats donne les compteurs par route (réponses, 429, erreurs), POST /_reset les remet à zéro
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+GENRES = [{"id": 28, "name": "Action"}, {"id": 18, "name": "Drame"}, {"id": 35, "name": "Comédie"},
+          {"id": 878, "name": "Science-Fiction"}, {"id": 53, "name": "Thriller"}, {"id": 16, "name": "Animation"}]
+
+
+class TokenBucket:
+    """Quota glissant façon TMDB: `capacity` requêtes, rechargées à `rate` par seconde"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consomme un jeton; retourne 0 ou le délai avant le prochain jeton disponible"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeUpstreams:
+    def __init__(self, args):
+        self.latency = args.latency_ms / 1000
+        self.jitter = args.jitter_ms / 1000
+        self.error_rate = args.error_rate
+        self.missing_rate = args.missing_rate
+        self.fixtures: Optional[Path] = args.fixtures
+        self.rng = random.Random(args.seed)
+        capacity, window = (float(part) for part in args.tmdb_rate.split("/"))
+        self.tmdb_bucket = TokenBucket(capacity, capacity / window) if capacity > 0 else None
+        self.discord_renames = args.discord_renames
+        self.discord_window = args.discord_window
+        self.discord_usage = defaultdict(list)  # canal -> instants des renommages dans la fenêtre
+        self.channel_names = {}
+        self.reset()
+
+    def reset(self):
+        self.stats = defaultdict(lambda: defaultdict(int))
+
+    async def delay(self):
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+    def count(self, route: str, status: int):
+        self.stats[route][str(status)] += 1
+
+    def fixture(self, path: str) -> Optional[dict]:
+        if self.fixtures is None:
+            return None
+        file = self.fixtures / f"{path.strip('/')}.json"
+        return json.loads(file.read_text()) if file.exists() else None
+
+
+# ===== Réponses TMDB générées =====
+def _person(rng: random.Random, job: Optional[str] = None) -> dict:
+    person_id = rng.randint(1, 2_000_000)
+    person = {"id": person_id, "name": f"Personne {person_id}", "profile_path": f"/person{person_id}.jpg" if rng.random() > 0.2 else None}
+    if job:
+        person["job"] = job
+    else:
+        person["character"] = f"Personnage {rng.randint(1, 999)}"
+    return person
+
+
+def generate_tmdb(kind: str, tmdb_id: int, season: int = 0, episode: int = 0) -> dict:
+    rng = random.Random(f"{kind}-{tmdb_id}-{season}-{episode}")
+    common = {
+        "id": tmdb_id,
+        "overview": f"Résumé généré pour {kind} {tmdb_id}.",
+        "poster_path": f"/poster{tmdb_id}.jpg",
+        "backdrop_path": f"/backdrop{tmdb_id}.jpg",
+        "genres": rng.sample(GENRES, rng.randint(1, 3)),
+        "vote_average": round(rng.uniform(4, 9), 3),
+    }
+    if kind == "movie":
+        return {**common, "title": f"Film {tmdb_id}", "release_date": f"{rng.randint(1970, 2025)}-0{rng.randint(1, 9)}-15", "runtime": rng.randint(80, 180)}
+    if kind == "tv":
+        return {**common, "name": f"Série {tmdb_id}", "first_air_date": f"{rng.randint(1990, 2025)}-01-10",
+                "number_of_seasons": rng.randint(1, 10), "created_by": [_person(rng, "Creator")]}
+    if kind == "episode":
+        return {"id": tmdb_id * 1000 + season * 100 + episode, "name": f"Épisode {season}x{episode}", "overview": "Résumé de l'épisode.",
+                "still_path": f"/still{tmdb_id}-{season}-{episode}.jpg", "runtime": rng.randint(20, 60),
+                "air_date": f"{rng.randint(1990, 2025)}-0{rng.randint(1, 9)}-0{rng.randint(1, 9)}",
+                "season_number": season, "episode_number": episode}
+    if kind == "credits":
+        return {"id": tmdb_id, "cast": [_person(rng) for _ in range(rng.randint(5, 20))],
+                "crew": [_person(rng, "Producer"), _person(rng, "Director"), _person(rng, "Writer")]}
+    if kind == "images":
+        languages = rng.sample(["fr", "en", None, "de"], rng.randint(0, 3))
+        return {"id": tmdb_id, "logos": [{"file_path": f"/logo{tmdb_id}-{lang}.png", "iso_639_1": lang} for lang in languages]}
+    raise ValueError(kind)
+
+
+def create_app(upstreams: FakeUpstreams) -> FastAPI:
+    app = FastAPI(title="Faux TMDB / Discord")
+
+    async def tmdb_response(route: str, path: str, kind: str, tmdb_id: int, season: int = 0, episode: int = 0):
+        await upstreams.delay()
+        if upstreams.tmdb_bucket is not None:
+            wait = upstreams.tmdb_bucket.take()
+            if wait > 0:
+                upstreams.count(route, 429)
+                return JSONResponse(
+                    {"status_code": 25, "status_message": "Your request count (#) is over the allowed limit of (40).", "success": False},
+                    status_code=429, headers={"Retry-After": f"{max(1, round(wait))}"}
+                )
+        roll = upstreams.rng.random()
+        if roll < upstreams.error_rate:
+            upstreams.count(route, 500)
+            return JSONResponse({"status_code": 11, "status_message": "Internal error.", "success": False}, status_code=500)
+        body = upstreams.fixture(path)
+        if body is None:
+            if roll < upstreams.error_rate + upstreams.missing_rate:
+                upstreams.count(route, 404)
+                return JSONResponse({"status_code": 34, "status_message": "The resource you requested could not be found.", "success": False}, status_code=404)
+            body = generate_tmdb(kind, tmdb_id, season, episode)
+        upstreams.count(route, 200)
+        return JSONResponse(body)
+
+    @app.get("/3/movie/{tmdb_id}")
+    async def tmdb_movie(tmdb_id: int, request: Request):
+        return await tmdb_response("tmdb movie", request.url.path[2:], "movie", tmdb_id)
+
+    @app.get("/3/tv/{tmdb_id}")
+    async def tmdb_series(tmdb_id: int, request: Request):
+        return await tmdb_response("tmdb tv", request.url.path[2:], "tv", tmdb_id)
+
+    @app.get("/3/{media_type}/{tmdb_id}/credits")
+    async def tmdb_credits(media_type: str, tmdb_id: int, request: Request):
+        return await tmdb_response(f"tmdb {media_type} credits", request.url.path[2:], "credits", tmdb_id)
+
+    @app.get("/3/{media_type}/{tmdb_id}/images")
+    async def tmdb_images(media_type: str, tmdb_id: int, request: Request):
+        return await tmdb_response(f"tmdb {media_type} images", request.url.path[2:], "images", tmdb_id)
+
+    @app.get("/3/tv/{tmdb_id}/season/{season}/episode/{episode}")
+    async def tmdb_episode(tmdb_id: int, season: int, episode: int, request: Request):
+        return await tmdb_response("tmdb episode", request.url.path[2:], "episode", tmdb_id, season, episode)
+
+    @app.patch("/api/v10/channels/{channel_id}")
+    async def discord_rename(channel_id: str, request: Request):
+        await upstreams.delay()
+        route = "discord rename"
+        now = time.monotonic()
+        usage = [t for t in upstreams.discord_usage[channel_id] if now - t < upstreams.discord_window]
+        upstreams.discord_usage[channel_id] = usage
+        if len(usage) >= upstreams.discord_renames:
+            retry_after = round(upstreams.discord_window - (now - usage[0]), 3)
+            upstreams.count(route, 429)
+            return JSONResponse(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                status_code=429, headers={"Retry-After": f"{retry_after:.0f}", "X-RateLimit-Scope": "shared"}
+            )
+        usage.append(now)
+        upstreams.channel_names[channel_id] = (await request.json()).get("name")
+        upstreams.count(route, 200)
+        remaining = upstreams.discord_renames - len(usage)
+        reset_after = upstreams.discord_window - (now - usage[0])
+        return JSONResponse(
+            {"id": channel_id, "name": upstreams.channel_names[channel_id], "type": 2},
+            headers={"X-RateLimit-Limit": str(upstreams.discord_renames), "X-RateLimit-Remaining": str(remaining),
+                     "X-RateLimit-Reset-After": f"{reset_after:.3f}", "X-RateLimit-Bucket": f"channel-{channel_id}"}
+        )
+
+    @app.get("/_stats")
+    async def stats():
+        return {"routes": {route: dict(statuses) for route, statuses in upstreams.stats.items()}, "channels": upstreams.channel_names}
+
+    @app.post("/_reset")
+    async def reset():
+        upstreams.reset()
+        upstreams.discord_usage.clear()
+        return {"status": "ok"}
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Faux serveurs TMDB et Discord")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--tmdb-rate", default="40/10", help="quota TMDB 'requêtes/secondes' (0/1 = illimité)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proportion de réponses 500")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="proportion de réponses 404 (hors fixtures)")
+    parser.add_argument("--discord-renames", type=int, default=2, help="renommages autorisés par canal et par fenêtre")
+    parser.add_argument("--discord-window", type=float, default=600)
+    parser.add_argument("--fixtures", type=Path, help="dossier de réponses TMDB enregistrées")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    print(f"🧪 TMDB_BASE_URL=http://{args.host}:{args.port}/3 DISCORD_API_BASE=http://{args.host}:{args.port}/api/v10")
+    uvicorn.run(create_app(FakeUpstreams(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
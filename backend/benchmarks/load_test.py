@@ -0,0 +1,248 @@
+"""
+Test de charge reproductible sur un serveur démarré avec la base de seed_catalog.py
+Usage (depuis backend/):
+    python benchmarks/load_test.py --base-url http://localhost:8001 --db streamflex_bench --duration 60 --concurrency 64
+
+Chaque client virtuel enchaîne des requêtes tirées selon un mélange pondéré de scénarios (rails de
+l'accueil, liste du catalogue, fiche série, connexion, statistiques de profil, épisodes), sans pause:
+le débit mesuré est la capacité du serveur à cette concurrence. Les identifiants sont tirés avec
+--seed parmi ceux de la base triés: même base et même graine, mêmes titres et mêmes utilisateurs
+(l'entrelacement des requêtes entre clients dépend, lui, des temps de réponse).
+Résultat: débit et p50/p95/p99 par route dans un fichier JSON (benchmarks/results/ par défaut)
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from seed_catalog import BENCH_PASSWORD  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SAMPLE_SIZE = 2000
+LOGGED_IN_USERS = 200
+
+# (nom du scénario, poids): proportions d'une session type, dominée par la navigation
+SCENARIOS = [
+    ("home_trending", 14),
+    ("home_recent", 10),
+    ("home_rails", 10),
+    ("catalog_list", 16),
+    ("series_detail", 12),
+    ("season_episodes", 10),
+    ("episode_detail", 8),
+    ("episode_next", 6),
+    ("continue_watching", 6),
+    ("profile_stats", 5),
+    ("login", 3),
+]
+
+
+class Fixtures:
+    """Identifiants réels de la base de test, tirés par le générateur seedé ($sample ne l'est pas)"""
+
+    def __init__(self, db, rng: random.Random):
+        self.movie_count = db.movies.estimated_document_count()
+        self.series_ids = self._sample(rng, (d["id"] for d in db.series.find({}, {"_id": 0, "id": 1})), SAMPLE_SIZE)
+        self.episode_ids = self._sample(rng, (d["id"] for d in db.episodes.find({}, {"_id": 0, "id": 1})), SAMPLE_SIZE)
+        # Utilisateurs ayant un historique: continue-watching et rails personnalisés non vides
+        active_ids = self._sample(rng, db.watch_history.distinct("user_id"), LOGGED_IN_USERS)
+        self.emails = sorted(
+            d["email"] for d in db.users.find({"id": {"$in": active_ids}, "email": {"$regex": "^bench"}}, {"_id": 0, "email": 1})
+        )
+        if not (self.series_ids and self.episode_ids and self.emails):
+            raise SystemExit("❌ Base vide: lancer d'abord benchmarks/seed_catalog.py")
+        self.tokens = []
+
+    @staticmethod
+    def _sample(rng: random.Random, ids, size: int) -> list:
+        # Tri préalable: l'ordre de lecture MongoDB n'est pas garanti
+        ids = sorted(ids)
+        return rng.sample(ids, min(size, len(ids)))
+
+    def counts(self, db) -> dict:
+        return {name: db[name].estimated_document_count() for name in ("movies", "series", "episodes", "users", "watch_history")}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def add(self, scenario: str, seconds: float, status):
+        if self.recording:
+            self.latencies[scenario].append(seconds)
+            self.statuses[scenario][str(status)] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for scenario, latencies in sorted(self.latencies.items()):
+            values = np.array(latencies) * 1000
+            statuses = dict(self.statuses[scenario])
+            errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+            routes[scenario] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "statuses": statuses,
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(float(np.percentile(values, 50)), 2),
+                "p95_ms": round(float(np.percentile(values, 95)), 2),
+                "p99_ms": round(float(np.percentile(values, 99)), 2),
+                "max_ms": round(float(values.max()), 2),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        return {
+            "requests": total,
+            "errors": sum(route["errors"] for route in routes.values()),
+            "rps": round(total / elapsed, 2),
+            "routes": routes,
+        }
+
+
+async def login(client: httpx.AsyncClient, email: str):
+    response = await client.post("/api/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+    return response, (response.json().get("access_token") if response.status_code == 200 else None)
+
+
+def build_request(scenario: str, fixtures: Fixtures, rng: random.Random):
+    """Retourne (méthode, chemin, paramètres, corps, authentifié)"""
+    if scenario == "home_trending":
+        return "GET", "/api/trending-movies", None, None, False
+    if scenario == "home_recent":
+        return "GET", "/api/recent-movies", None, None, False
+    if scenario == "home_rails":
+        return "GET", "/api/me/rails", None, None, True
+    if scenario == "catalog_list":
+        # Les premières pages sont bien plus consultées que les suivantes
+        pages = max(1, fixtures.movie_count // 24)
+        page = 1 + min(pages - 1, int(pages * rng.random() ** 4))
+        return "GET", "/api/movies", {"page": page, "per_page": 24}, None, False
+    if scenario == "series_detail":
+        return "GET", f"/api/series/{rng.choice(fixtures.series_ids)}", None, None, False
+    if scenario == "season_episodes":
+        return "GET", "/api/episodes", {"series_id": rng.choice(fixtures.series_ids), "season": 1}, None, False
+    if scenario == "episode_detail":
+        return "GET", f"/api/episodes/{rng.choice(fixtures.episode_ids)}", None, None, False
+    if scenario == "episode_next":
+        return "GET", f"/api/episodes/{rng.choice(fixtures.episode_ids)}/next", None, None, False
+    if scenario == "continue_watching":
+        return "GET", "/api/me/continue-watching", None, None, True
+    if scenario == "profile_stats":
+        return "GET", "/api/auth/profile/stats", None, None, True
+    if scenario == "login":
+        return "POST", "/api/auth/login", None, {"email": rng.choice(fixtures.emails), "password": BENCH_PASSWORD}, False
+    raise ValueError(f"Scénario inconnu: {scenario}")
+
+
+async def virtual_user(client: httpx.AsyncClient, fixtures: Fixtures, recorder: Recorder, rng: random.Random, deadline: float):
+    names = [name for name, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(names, weights=weights)[0]
+        method, path, params, body, authenticated = build_request(scenario, fixtures, rng)
+        headers = {"Authorization": f"Bearer {rng.choice(fixtures.tokens)}"} if authenticated else None
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, params=params, json=body, headers=headers)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        recorder.add(scenario, time.perf_counter() - started, status)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+
+async def run(args) -> dict:
+    db = MongoClient(args.mongo_url)[args.db]
+    fixtures = Fixtures(db, random.Random(args.seed))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        # Jetons obtenus avant la mesure: la connexion (bcrypt) n'est comptée que dans son scénario
+        for email in fixtures.emails:
+            _, token = await login(client, email)
+            if token:
+                fixtures.tokens.append(token)
+        if not fixtures.tokens:
+            raise SystemExit(f"❌ Aucune connexion réussie sur {args.base_url} (serveur démarré avec DB_NAME={args.db} ?)")
+        print(f"{len(fixtures.tokens)} utilisateurs connectés, {args.concurrency} clients, {args.warmup}s de chauffe + {args.duration}s")
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        deadline = started + args.warmup + args.duration
+        users = [
+            asyncio.create_task(virtual_user(client, fixtures, recorder, random.Random(args.seed * 1000 + i), deadline))
+            for i in range(args.concurrency)
+        ]
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        measured_from = time.perf_counter()
+        await asyncio.gather(*users)
+        elapsed = time.perf_counter() - measured_from
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "config": {
+            "base_url": args.base_url, "db": args.db, "concurrency": args.concurrency,
+            "duration": args.duration, "warmup": args.warmup, "seed": args.seed,
+            "scenarios": dict(SCENARIOS),
+        },
+        "dataset": fixtures.counts(db),
+        "elapsed_seconds": round(elapsed, 2),
+        **recorder.summary(elapsed),
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{'route':<20}{'req':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, route in report["routes"].items():
+        print(
+            f"{name:<20}{route['requests']:>8}{route['errors']:>6}{route['rps']:>9.1f}"
+            f"{route['p50_ms']:>9.1f}{route['p95_ms']:>9.1f}{route['p99_ms']:>9.1f}{route['max_ms']:>9.1f}"
+        )
+    print(f"{'total':<20}{report['requests']:>8}{report['errors']:>6}{report['rps']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge à mélange pondéré de routes")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="streamflex_bench")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--warmup", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="fichier JSON du résultat (défaut: benchmarks/results/load-<date>.json)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\n📄 Résultat: {output}")
+    if report["errors"]:
+        print(f"⚠️ {report['errors']} réponses en erreur")
+
+
+if __name__ == "__main__":
+    main()
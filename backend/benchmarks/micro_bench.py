@@ -0,0 +1,289 @@
+"""
+Micro-benchmarks des briques exécutées à chaque requête, avec référence (baseline) versionnée
+Usage (depuis backend/):
+    python benchmarks/micro_bench.py run                       # mesure et affiche
+    python benchmarks/micro_bench.py run --save-baseline       # remplace benchmarks/baselines/micro.json
+    python benchmarks/micro_bench.py compare [--tolerance 0.15] [--current resultat.json]
+
+compare relance la suite (ou lit --current) et sort en erreur si un benchmark est plus lent que
+la référence au-delà du seuil: la tolérance, élargie au bruit mesuré des deux côtés.
+La comparaison porte sur le minimum des --repeat séries (le moins perturbé par le reste de la
+machine), le bruit est l'écart relatif entre médiane et minimum; chaque série dure ~0.5s, au moins
+MIN_CALLS appels, ramasse-miettes désactivé.
+La référence n'a de sens que sur la machine qui l'a produite (voir "machine").
+Les benchmarks marqués [db] utilisent une base MongoDB locale (--mongo-url, base jetable --db),
+ignorés si elle est injoignable; --save-baseline refuse alors d'écrire une référence incomplète
+sauf avec --allow-missing-db (benchmarks absents listés dans "missing")
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines" / "micro.json"
+ITEMS = 1000
+TARGET_SECONDS = 0.5
+MIN_CALLS = 20
+# Seuil de régression: au moins NOISE_FACTOR fois le bruit relatif mesuré
+NOISE_FACTOR = 3
+DB_BENCHMARKS = ["get_current_user", "add_to_recent"]
+
+
+class Bench:
+    def __init__(self, name: str, fn: Callable, setup: Optional[Callable] = None, is_async: bool = False, needs_db: bool = False):
+        self.name = name
+        self.fn = fn
+        # setup() fournit l'argument d'un appel, préparé hors chronométrage (données consommées par fn)
+        self.setup = setup
+        self.is_async = is_async
+        self.needs_db = needs_db
+
+
+def _time_batch(bench: Bench, loop: asyncio.AbstractEventLoop, number: int) -> float:
+    args = [bench.setup() for _ in range(number)] if bench.setup else None
+    # Comme timeit: un passage du ramasse-miettes au milieu d'une série fausserait la mesure
+    gc.collect()
+    gc.disable()
+    try:
+        return _run_batch(bench, loop, number, args)
+    finally:
+        gc.enable()
+
+
+def _run_batch(bench: Bench, loop: asyncio.AbstractEventLoop, number: int, args: Optional[list]) -> float:
+    if bench.is_async:
+        async def batch():
+            for i in range(number):
+                await (bench.fn(args[i]) if args else bench.fn())
+        started = time.perf_counter()
+        loop.run_until_complete(batch())
+        return time.perf_counter() - started
+    fn = bench.fn
+    started = time.perf_counter()
+    if args:
+        for arg in args:
+            fn(arg)
+    else:
+        for _ in range(number):
+            fn()
+    return time.perf_counter() - started
+
+
+def measure(bench: Bench, loop: asyncio.AbstractEventLoop, repeat: int) -> dict:
+    """Calibre le nombre d'appels par série (le premier passage sert aussi de chauffe) puis retourne la durée par appel (µs)"""
+    number = 1
+    while True:
+        elapsed = _time_batch(bench, loop, number)
+        if elapsed >= TARGET_SECONDS / 10 or number >= 1_000_000:
+            break
+        number *= 10
+    number = max(MIN_CALLS, int(number * TARGET_SECONDS / max(elapsed, 1e-9)))
+    per_call = [_time_batch(bench, loop, number) / number * 1e6 for _ in range(repeat)]
+    return {
+        "median_us": round(statistics.median(per_call), 3),
+        "min_us": round(min(per_call), 3),
+        "stdev_us": round(statistics.stdev(per_call), 3) if repeat > 1 else 0.0,
+        "calls_per_repeat": number,
+    }
+
+
+def build_suite(loop: asyncio.AbstractEventLoop, db_available: bool) -> List[Bench]:
+    # Import tardif: server lit MONGO_URL et DB_NAME à l'import
+    import server
+    from fastapi.security import HTTPAuthorizationCredentials
+    from pydantic import TypeAdapter
+
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+
+    def iso() -> str:
+        return (now - timedelta(seconds=rng.randint(0, 10**8))).isoformat()
+
+    movie_docs = [{
+        "id": str(uuid.uuid4()), "tmdb_id": 1000 + i, "title": f"Film {i}", "description": "x" * 300,
+        "poster_url": f"https://image.tmdb.org/t/p/original/p{i}.jpg", "backdrop_url": f"https://image.tmdb.org/t/p/original/b{i}.jpg",
+        "logo_url": None, "video_url": f"https://cdn.example.com/{i}.mp4", "genres": ["Action", "Drame"],
+        "release_year": 2000 + i % 25, "duration": 120, "rating": 7.5, "director": "Réalisateur", "director_tmdb_id": 42,
+        "director_photo": None, "cast": [{"tmdb_id": j, "name": f"Acteur {j}", "character": "Rôle", "photo": None} for j in range(10)],
+        "available": True, "created_at": iso(), "updated_at": iso(),
+    } for i in range(ITEMS)]
+    episode_docs = [{
+        "id": str(uuid.uuid4()), "series_id": "serie", "tmdb_id": None, "season_number": 1 + i // 20, "episode_number": 1 + i % 20,
+        "episode_order": (1 + i // 20) * 10000 + 1 + i % 20, "title": f"Épisode {i}", "description": "x" * 200,
+        "still_url": f"https://image.tmdb.org/t/p/original/s{i}.jpg", "video_url": f"https://cdn.example.com/e{i}.mp4",
+        "duration": 45, "air_date": "2024-01-01", "available": True, "created_at": iso(), "updated_at": iso(),
+    } for i in range(ITEMS)]
+
+    movies_adapter = TypeAdapter(List[server.Movie])
+    episodes_adapter = TypeAdapter(List[server.Episode])
+    movies = movies_adapter.validate_python(movie_docs)
+    episodes = episodes_adapter.validate_python(episode_docs)
+
+    def fix_dates(docs: list):
+        # Boucle recopiée des routes de liste (/movies, /series, /episodes)
+        for doc in docs:
+            if isinstance(doc.get('created_at'), str):
+                doc['created_at'] = datetime.fromisoformat(doc['created_at'])
+
+    claims = {"sub": str(uuid.uuid4()), "email": "bench@example.com", "username": "bench", "role": "user", "subscription": "gratuit"}
+    token = server.create_access_token(data=claims)
+
+    suite = [
+        Bench("create_access_token", lambda: server.create_access_token(data=claims)),
+        Bench("decode_user_id", lambda: server.decode_user_id(token)),
+        Bench("movie_validate_1k", lambda: movies_adapter.validate_python(movie_docs)),
+        Bench("movie_serialize_1k", lambda: json.dumps(movies_adapter.dump_python(movies, mode="json"))),
+        Bench("episode_validate_1k", lambda: episodes_adapter.validate_python(episode_docs)),
+        Bench("episode_serialize_1k", lambda: json.dumps(episodes_adapter.dump_python(episodes, mode="json"))),
+        Bench("fromisoformat_fix_1k", fix_dates, setup=lambda: [dict(doc) for doc in movie_docs]),
+    ]
+
+    if db_available:
+        user_doc = {
+            "id": claims["sub"], "email": claims["email"], "username": claims["username"], "password_hash": "x",
+            "role": "user", "subscription": "gratuit", "subscription_date": None, "created_at": iso(), "updated_at": iso(),
+        }
+        loop.run_until_complete(server.db.users.replace_one({"id": user_doc["id"]}, user_doc, upsert=True))
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        recent_ids = [str(uuid.uuid4()) for _ in range(50)]
+        suite += [
+            Bench("get_current_user", lambda: server.get_current_user(credentials), is_async=True, needs_db=True),
+            Bench("add_to_recent", lambda content_id: server.add_to_recent("movies", content_id),
+                  setup=lambda: rng.choice(recent_ids), is_async=True, needs_db=True),
+        ]
+    return suite
+
+
+def mongo_reachable(mongo_url: str) -> bool:
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    try:
+        MongoClient(mongo_url, serverSelectionTimeoutMS=1000).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+def run_suite(args) -> dict:
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db
+    db_available = mongo_reachable(args.mongo_url)
+    if not db_available:
+        print(f"⚠️ MongoDB injoignable ({args.mongo_url}): benchmarks [db] ignorés")
+
+    # Boucle créée avant l'import de server: Motor s'y rattache au premier appel
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {}
+    try:
+        for bench in build_suite(loop, db_available):
+            if args.only and args.only not in bench.name:
+                continue
+            results[bench.name] = measure(bench, loop, args.repeat)
+            tag = " [db]" if bench.needs_db else ""
+            print(f"{bench.name + tag:<28}{results[bench.name]['median_us']:>12.2f} µs  (±{results[bench.name]['stdev_us']:.2f})")
+    finally:
+        if db_available:
+            import server
+            loop.run_until_complete(server.client.drop_database(args.db))
+        loop.close()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor() or platform.machine()},
+        "repeat": args.repeat,
+        "benchmarks": results,
+        "missing": [] if db_available or args.only else DB_BENCHMARKS,
+    }
+
+
+def relative_noise(result: dict) -> float:
+    """Écart relatif entre médiane et minimum des séries (moins sensible qu'un écart-type à une série aberrante)"""
+    return result["median_us"] / result["min_us"] - 1 if result["min_us"] else 0.0
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> bool:
+    """
+    Affiche l'écart des minimums par benchmark; retourne False si au moins un ralentissement
+    dépasse max(tolérance, NOISE_FACTOR x bruit relatif de la référence ou de la mesure)
+    """
+    if baseline.get("machine") != current.get("machine"):
+        print("⚠️ Machine différente de celle de la référence: écarts peu significatifs")
+    ok = True
+    for name in baseline.get("missing", []):
+        print(f"⚠️ {name}: absent de la référence (enregistrée sans MongoDB)")
+    print(f"{'benchmark':<28}{'référence':>12}{'actuel':>12}{'écart':>9}{'seuil':>8}")
+    for name in sorted(set(baseline["benchmarks"]) | set(current["benchmarks"])):
+        before = baseline["benchmarks"].get(name)
+        after = current["benchmarks"].get(name)
+        if before is None or after is None:
+            print(f"{name:<28}{'absent de la ' + ('référence' if before is None else 'mesure'):>33}")
+            continue
+        delta = after["min_us"] / before["min_us"] - 1
+        threshold = max(tolerance, NOISE_FACTOR * max(relative_noise(before), relative_noise(after)))
+        verdict = ""
+        if delta > threshold:
+            verdict = "  ❌ régression"
+            ok = False
+        elif delta < -threshold:
+            verdict = "  ✅ amélioration"
+        print(f"{name:<28}{before['min_us']:>12.2f}{after['min_us']:>12.2f}{delta:>+9.1%}{threshold:>8.0%}{verdict}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks des fonctions appelées à chaque requête")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("run", "compare"):
+        command = sub.add_parser(name)
+        command.add_argument("--mongo-url", default="mongodb://localhost:27017")
+        command.add_argument("--db", default="streamflex_microbench")
+        command.add_argument("--repeat", type=int, default=7)
+        command.add_argument("--only", help="ne lancer que les benchmarks dont le nom contient ce texte")
+        command.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    sub.choices["run"].add_argument("--output", type=Path, help="écrire le résultat dans ce fichier JSON")
+    sub.choices["run"].add_argument("--save-baseline", action="store_true", help="remplacer la référence par ce résultat")
+    sub.choices["run"].add_argument("--allow-missing-db", action="store_true", help="enregistrer la référence même sans les benchmarks [db]")
+    sub.choices["compare"].add_argument("--current", type=Path, help="résultat déjà mesuré (sinon la suite est relancée)")
+    sub.choices["compare"].add_argument("--tolerance", type=float, default=0.15, help="ralentissement toléré (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        result = run_suite(args)
+        if args.save_baseline and result["missing"] and not args.allow_missing_db:
+            print(f"❌ Référence non enregistrée: benchmarks [db] manquants ({', '.join(result['missing'])}); "
+                  f"lancer MongoDB ou passer --allow-missing-db")
+            sys.exit(2)
+        targets = [path for path in (args.output, args.baseline if args.save_baseline else None) if path]
+        for path in targets:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n")
+            print(f"📄 {path}")
+        return
+
+    if not args.baseline.exists():
+        print(f"❌ Référence absente: {args.baseline} (créer avec: run --save-baseline)")
+        sys.exit(2)
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text()) if args.current else run_suite(args)
+    print()
+    if not compare(baseline, current, args.tolerance):
+        print(f"\n❌ Régression au-delà du seuil (tolérance {args.tolerance:.0%} ou bruit mesuré)")
+        sys.exit(1)
+    print(f"\n✅ Aucune régression au-delà du seuil (tolérance {args.tolerance:.0%} ou bruit mesuré)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Générateur de catalogue synthétique pour les tests de charge
+Usage (depuis backend/):
+    python benchmarks/seed_catalog.py --db streamflex_bench --drop
+    python benchmarks/seed_catalog.py --movies 20000 --series 2000 --episodes 500000 --history 1000000 --users 100000
+
+Remplit une base locale avec des documents de la même forme que ceux écrits par les routes
+(champs dérivés compris: episode_order, résumés de saisons, updated_at). Identifiants, dates et
+contenus ne dépendent que de --seed et --now (affiché en fin de remplissage): deux exécutions avec
+les mêmes valeurs produisent les mêmes documents, au sel bcrypt du mot de passe près.
+Tous les utilisateurs partagent le mot de passe BENCH_PASSWORD (un seul calcul bcrypt).
+Refuse d'écrire dans une base qui contient déjà des utilisateurs, sauf avec --drop
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+from passlib.context import CryptContext
+from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from continue_watching import episode_order  # noqa: E402
+
+BENCH_PASSWORD = "bench-password"
+BATCH_SIZE = 5000
+GENRES = [
+    "Action", "Aventure", "Animation", "Comédie", "Crime", "Documentaire", "Drame", "Familial",
+    "Fantastique", "Histoire", "Horreur", "Musique", "Mystère", "Romance", "Science-Fiction", "Thriller", "Guerre", "Western"
+]
+WORDS = ["nuit", "ombre", "dernier", "royaume", "secret", "voyage", "rouge", "silence", "empire", "retour", "ciel", "loup", "océan", "feu", "mémoire"]
+IMAGE_BASE = "https://image.tmdb.org/t/p/original"
+VIDEO_BASE = "https://cdn.example.com/videos"
+
+
+class Seeder:
+    def __init__(self, db, rng: random.Random, now: datetime):
+        self.db = db
+        self.rng = rng
+        self.now = now
+        self.people = [{"tmdb_id": 100000 + i, "name": f"Personne {i}"} for i in range(5000)]
+
+    def _uuid(self) -> str:
+        """uuid4 tiré du générateur seedé (uuid.uuid4() lit os.urandom)"""
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _iso(self, days_ago_max: int) -> str:
+        return (self.now - timedelta(seconds=self.rng.randint(0, days_ago_max * 86400))).isoformat()
+
+    def _title(self) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(1, 4))).capitalize()
+
+    def _cast(self) -> list:
+        return [
+            {"tmdb_id": person["tmdb_id"], "name": person["name"], "character": self._title(), "photo": None}
+            for person in self.rng.sample(self.people, 6)
+        ]
+
+    def _insert(self, collection, docs_iter, total: int, label: str):
+        started = time.perf_counter()
+        batch, written = [], 0
+        for doc in docs_iter:
+            batch.append(doc)
+            if len(batch) >= BATCH_SIZE:
+                collection.insert_many(batch, ordered=False)
+                written += len(batch)
+                batch = []
+                print(f"\r  {label}: {written}/{total}", end="", flush=True)
+        if batch:
+            collection.insert_many(batch, ordered=False)
+            written += len(batch)
+        print(f"\r  {label}: {written} en {time.perf_counter() - started:.1f}s")
+        return written
+
+    def movies(self, count: int) -> list:
+        ids = [self._uuid() for _ in range(count)]
+
+        def generate():
+            for i, movie_id in enumerate(ids):
+                created_at = self._iso(1500)
+                director = self.rng.choice(self.people)
+                yield {
+                    "id": movie_id,
+                    "tmdb_id": 1_000_000 + i,
+                    "title": self._title(),
+                    "description": " ".join(self.rng.choice(WORDS) for _ in range(40)),
+                    "poster_url": f"{IMAGE_BASE}/poster-{i}.jpg",
+                    "backdrop_url": f"{IMAGE_BASE}/backdrop-{i}.jpg",
+                    "logo_url": None,
+                    "video_url": f"{VIDEO_BASE}/movies/{movie_id}.mp4",
+                    "genres": self.rng.sample(GENRES, self.rng.randint(1, 3)),
+                    "release_year": self.rng.randint(1960, self.now.year),
+                    "duration": self.rng.randint(80, 180),
+                    "rating": round(self.rng.uniform(3, 9.5), 1),
+                    "director": director["name"],
+                    "director_tmdb_id": director["tmdb_id"],
+                    "director_photo": None,
+                    "cast": self._cast(),
+                    "available": self.rng.random() > 0.03,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+
+        self._insert(self.db.movies, generate(), count, "films")
+        return ids
+
+    def series(self, count: int, episode_total: int) -> dict:
+        """Séries et épisodes (répartis inégalement), avec les résumés de saisons"""
+        series_ids = [self._uuid() for _ in range(count)]
+        # Répartition à longue traîne: quelques séries très longues, beaucoup de courtes
+        weights = [1 / (rank + 1) ** 0.7 for rank in range(count)]
+        scale = episode_total / sum(weights)
+        episode_counts = [max(1, round(w * scale)) for w in weights]
+        episodes_by_series = {}
+
+        def generate_series():
+            for i, series_id in enumerate(series_ids):
+                created_at = self._iso(1500)
+                seasons = []
+                remaining = episode_counts[i]
+                season_number = 1
+                episodes = []
+                while remaining > 0:
+                    in_season = min(remaining, self.rng.randint(6, 24))
+                    season_start = self.now - timedelta(days=self.rng.randint(30, 5000))
+                    for episode_number in range(1, in_season + 1):
+                        episodes.append({
+                            "id": self._uuid(),
+                            "series_id": series_id,
+                            "tmdb_id": None,
+                            "season_number": season_number,
+                            "episode_number": episode_number,
+                            "episode_order": episode_order(season_number, episode_number),
+                            "title": self._title(),
+                            "description": " ".join(self.rng.choice(WORDS) for _ in range(25)),
+                            "still_url": f"{IMAGE_BASE}/still-{series_id[:8]}-{season_number}-{episode_number}.jpg",
+                            "video_url": f"{VIDEO_BASE}/series/{series_id}/{season_number}/{episode_number}.mp4",
+                            "duration": self.rng.randint(20, 60),
+                            "air_date": (season_start + timedelta(days=7 * episode_number)).date().isoformat(),
+                            "available": True,
+                            "created_at": created_at,
+                            "updated_at": created_at,
+                        })
+                    season_episodes = episodes[-in_season:]
+                    seasons.append({
+                        "season_number": season_number,
+                        "episode_count": in_season,
+                        "available_count": in_season,
+                        "first_air_date": season_episodes[0]["air_date"],
+                        "last_air_date": season_episodes[-1]["air_date"],
+                        "first_episode_id": season_episodes[0]["id"],
+                        "still_url": season_episodes[0]["still_url"],
+                    })
+                    remaining -= in_season
+                    season_number += 1
+                episodes_by_series[series_id] = episodes
+                creator = self.rng.choice(self.people)
+                yield {
+                    "id": series_id,
+                    "tmdb_id": 2_000_000 + i,
+                    "title": self._title(),
+                    "description": " ".join(self.rng.choice(WORDS) for _ in range(40)),
+                    "poster_url": f"{IMAGE_BASE}/series-poster-{i}.jpg",
+                    "backdrop_url": f"{IMAGE_BASE}/series-backdrop-{i}.jpg",
+                    "logo_url": None,
+                    "genres": self.rng.sample(GENRES, self.rng.randint(1, 3)),
+                    "release_year": self.rng.randint(1990, self.now.year),
+                    "rating": round(self.rng.uniform(3, 9.5), 1),
+                    "total_seasons": len(seasons),
+                    "seasons": seasons,
+                    "seasons_rev": 0,
+                    "creator": creator["name"],
+                    "creator_tmdb_id": creator["tmdb_id"],
+                    "creator_photo": None,
+                    "cast": self._cast(),
+                    "available": True,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+
+        self._insert(self.db.series, generate_series(), count, "séries")
+        total = sum(len(episodes) for episodes in episodes_by_series.values())
+        self._insert(self.db.episodes, (e for episodes in episodes_by_series.values() for e in episodes), total, "épisodes")
+        return episodes_by_series
+
+    def users(self, count: int) -> list:
+        password_hash = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(BENCH_PASSWORD)
+        ids = [self._uuid() for _ in range(count)]
+
+        def generate():
+            for i, user_id in enumerate(ids):
+                created_at = self._iso(900)
+                subscription = self.rng.choices(["gratuit", "premium", "vip"], weights=[80, 15, 5])[0]
+                yield {
+                    "id": user_id,
+                    "email": f"bench{i}@example.com",
+                    "username": f"bench{i}",
+                    "password_hash": password_hash,
+                    "role": "user",
+                    "subscription": subscription,
+                    "subscription_date": created_at if subscription != "gratuit" else None,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+
+        self._insert(self.db.users, generate(), count, "utilisateurs")
+        return ids
+
+    def watch_history(self, count: int, user_ids: list, movie_ids: list, episodes_by_series: dict) -> int:
+        """
+        Historique concentré sur une minorité de titres et d'utilisateurs (comme en production)
+        Une ligne par (utilisateur, titre, épisode): les tirages en double sont ignorés, d'où moins
+        de lignes que `count`. Renvoie le nombre de lignes écrites
+        """
+        series_ids = list(episodes_by_series)
+        active_users = user_ids[:max(1, len(user_ids) // 3)]
+
+        def pick(items: list):
+            # Loi de puissance: les premiers éléments sont beaucoup plus regardés
+            return items[min(len(items) - 1, int(len(items) * self.rng.random() ** 3))]
+
+        def generate():
+            seen = set()
+            for _ in range(count):
+                user_id = self.rng.choice(active_users)
+                watched_at = self._iso(120)
+                if movie_ids and (not series_ids or self.rng.random() < 0.45):
+                    content_type, content_id, episode = "movie", pick(movie_ids), None
+                else:
+                    content_type, content_id = "series", pick(series_ids)
+                    episode = self.rng.choice(episodes_by_series[content_id])
+                key = (user_id, content_id, episode["id"] if episode else None)
+                if key in seen:
+                    continue
+                seen.add(key)
+                duration = (episode["duration"] if episode else self.rng.randint(80, 180)) * 60
+                yield {
+                    "id": self._uuid(),
+                    "user_id": user_id,
+                    "content_type": content_type,
+                    "content_id": content_id,
+                    "episode_id": episode["id"] if episode else None,
+                    "season_number": episode["season_number"] if episode else None,
+                    "episode_number": episode["episode_number"] if episode else None,
+                    "position": self.rng.randint(0, duration),
+                    "duration": duration,
+                    "watched_at": watched_at,
+                    "created_at": watched_at,
+                    "updated_at": watched_at,
+                }
+
+        return self._insert(self.db.watch_history, generate(), count, "historique")
+
+    def recent_content(self, movie_ids: list, series_ids: list):
+        self.db.recent_content.insert_many([
+            {"type": "movies", "items": movie_ids[:10]},
+            {"type": "series", "items": series_ids[:10]},
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un catalogue synthétique dans une base MongoDB locale")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="streamflex_bench")
+    parser.add_argument("--movies", type=int, default=20_000)
+    parser.add_argument("--series", type=int, default=2_000)
+    parser.add_argument("--episodes", type=int, default=500_000)
+    parser.add_argument("--history", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", type=datetime.fromisoformat, help="date de référence ISO des dates générées (défaut: maintenant)")
+    parser.add_argument("--drop", action="store_true", help="supprimer la base avant de la remplir")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_url)
+    if args.drop:
+        client.drop_database(args.db)
+    db = client[args.db]
+    if db.users.estimated_document_count():
+        print(f"❌ La base {args.db} contient déjà des utilisateurs (utiliser --drop sur une base de test)")
+        sys.exit(1)
+
+    now = args.now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    seeder = Seeder(db, random.Random(args.seed), now)
+    started = time.perf_counter()
+    print(f"🌱 Remplissage de {args.db}")
+    movie_ids = seeder.movies(args.movies)
+    episodes_by_series = seeder.series(args.series, args.episodes)
+    user_ids = seeder.users(args.users)
+    history = seeder.watch_history(args.history, user_ids, movie_ids, episodes_by_series)
+    if history < args.history:
+        print(f"  historique: {args.history - history} tirages en double ignorés ({history} lignes écrites)")
+    seeder.recent_content(movie_ids, list(episodes_by_series))
+    print(f"✅ Terminé en {time.perf_counter() - started:.0f}s - démarrer le serveur avec DB_NAME={args.db}")
+    print(f"   (rejouer à l'identique: --seed {args.seed} --now {now.isoformat()})")
+    print("   (les index, tendances et index de similarité sont créés par les tâches de démarrage)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Cache mémoire à durée de vie limitée (par worker)
+Un seul chargement par clé à la fois: les requêtes concurrentes attendent le même résultat.
+Avec `max_entries`, les entrées les plus anciennes sont évincées (caches par utilisateur)
+Les succès et échecs sont comptés par nom de cache (métrique cache_requests_total)
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from metrics import CACHE_REQUESTS
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl_seconds: float, max_entries: Optional[int] = None):
+        self.name = name
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._values: Dict[Hashable, Tuple[float, Any]] = {}
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._values.get(key)
+        if entry and entry[0] > time.monotonic():
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return entry[1]
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            CACHE_REQUESTS.labels(self.name, "wait").inc()
+            return await asyncio.shield(pending)
+
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        future = self._loading[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Évite l'avertissement "exception never retrieved" quand personne n'attend
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            self._store(key, value)
+            return value
+        finally:
+            self._loading.pop(key, None)
+
+    def _store(self, key: Hashable, value: Any):
+        self._values.pop(key, None)
+        self._values[key] = (time.monotonic() + self.ttl, value)
+        if self.max_entries is not None:
+            while len(self._values) > self.max_entries:
+                self._values.pop(next(iter(self._values)))
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
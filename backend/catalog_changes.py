@@ -0,0 +1,210 @@
+"""
+Journal des modifications du catalogue (synchronisation différentielle des clients)
+Une entrée par document (films, séries, épisodes) portant la séquence de sa dernière modification:
+un client qui garde une copie locale ne demande que les entrées de séquence > à la sienne.
+- les écritures du catalogue horodatent déjà `updated_at`: un séquenceur unique (bail) les relève
+  et attribue les séquences, dans l'ordre, puis publie la séquence validée
+- les suppressions écrivent une pierre tombale en attente de séquence
+- les pierres tombales sont purgées après TOMBSTONE_RETENTION: un client plus ancien que la
+  dernière purge (min_seq) doit resynchroniser entièrement
+L'époque change si le journal est reconstruit (base restaurée): les clients repartent de zéro
+"""
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Iterable, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from background_jobs import acquire_lease, release_lease
+
+logger = logging.getLogger(__name__)
+
+CATALOG_COLLECTIONS = ("movies", "series", "episodes")
+CATALOG_SYNC_INTERVAL_SECONDS = int(os.environ.get('CATALOG_SYNC_SECONDS', '30'))
+TOMBSTONE_RETENTION = timedelta(days=int(os.environ.get('CATALOG_TOMBSTONE_DAYS', '30')))
+# Recouvrement du relevé: couvre les écritures horodatées avant le filigrane mais validées après
+SCAN_OVERLAP = timedelta(seconds=60)
+SEQUENCER_LEASE_SECONDS = 600
+SCAN_BATCH_SIZE = 1000
+MAX_CHANGES_PAGE = 5000
+STATE_ID = "catalog"
+
+
+async def ensure_indexes(db):
+    await db.catalog_changes.create_index([("collection", ASCENDING), ("id", ASCENDING)], unique=True)
+    await db.catalog_changes.create_index("seq")
+    await db.catalog_changes.create_index([("collection", ASCENDING), ("seq", ASCENDING)])
+    # Relevé `updated_at > filigrane` toutes les 30s: même index que celui des snapshots incrémentaux
+    for collection in CATALOG_COLLECTIONS:
+        await db[collection].create_index("updated_at")
+
+
+async def _get_state(db) -> dict:
+    """État du journal (créé avec une nouvelle époque au premier appel)"""
+    return await db.catalog_sync_state.find_one_and_update(
+        {"_id": STATE_ID},
+        {"$setOnInsert": {"epoch": uuid.uuid4().hex, "allocated_seq": 0, "committed_seq": 0, "min_seq": 0, "watermark": None}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _allocate(db, count: int) -> int:
+    """Réserve `count` séquences consécutives (jamais réutilisées) et renvoie la première"""
+    state = await db.catalog_sync_state.find_one_and_update(
+        {"_id": STATE_ID},
+        {"$inc": {"allocated_seq": count}},
+        projection={"allocated_seq": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return state["allocated_seq"] - count + 1
+
+
+async def record_catalog_deletions(db, collection: str, ids: Iterable[str]):
+    """Pierres tombales en attente: le séquenceur leur attribue une séquence au prochain passage"""
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {"collection": collection, "id": content_id},
+            {"$set": {"op": "delete", "seq": None, "changed_at": now}, "$unset": {"updated_at": ""}},
+            upsert=True
+        )
+        for content_id in ids
+    ]
+    if operations:
+        await db.catalog_changes.bulk_write(operations, ordered=False)
+
+
+async def _sequence_batch(db, collection: str, docs: List[dict], now: datetime) -> int:
+    """Attribue une séquence aux documents dont la version n'est pas encore journalisée"""
+    known = {
+        entry["id"]: entry.get("updated_at")
+        async for entry in db.catalog_changes.find(
+            {"collection": collection, "id": {"$in": [doc["id"] for doc in docs]}, "op": "upsert"},
+            {"_id": 0, "id": 1, "updated_at": 1}
+        )
+    }
+    changed = [doc for doc in docs if doc["id"] not in known or known[doc["id"]] != doc.get("updated_at")]
+    if not changed:
+        return 0
+
+    first = await _allocate(db, len(changed))
+    operations = [
+        # Une pierre tombale n'est jamais remplacée par le relevé (document supprimé entre-temps):
+        # le filtre ne la trouve pas et l'insertion échoue sur la clé unique
+        UpdateOne(
+            {"collection": collection, "id": doc["id"], "op": {"$ne": "delete"}},
+            {"$set": {"op": "upsert", "seq": first + offset, "updated_at": doc.get("updated_at"), "changed_at": now}},
+            upsert=True
+        )
+        for offset, doc in enumerate(changed)
+    ]
+    try:
+        await db.catalog_changes.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+    return len(changed)
+
+
+async def sequence_changes(db) -> dict:
+    """Relève les modifications depuis le dernier passage et publie la nouvelle séquence validée"""
+    if not await acquire_lease(db, "catalog_sequencer", SEQUENCER_LEASE_SECONDS):
+        return {}
+    try:
+        state = await _get_state(db)
+        started_at = datetime.now(timezone.utc)
+        watermark = state.get("watermark")
+        stats = {}
+
+        for collection in CATALOG_COLLECTIONS:
+            # Premier passage: tout le catalogue (documents antérieurs à `updated_at` compris)
+            query = {"updated_at": {"$gt": (datetime.fromisoformat(watermark) - SCAN_OVERLAP).isoformat()}} if watermark else {}
+            sequenced = 0
+            batch = []
+            async for doc in db[collection].find(query, {"_id": 0, "id": 1, "updated_at": 1}).batch_size(SCAN_BATCH_SIZE):
+                batch.append(doc)
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    sequenced += await _sequence_batch(db, collection, batch, started_at)
+                    batch = []
+            if batch:
+                sequenced += await _sequence_batch(db, collection, batch, started_at)
+            stats[collection] = sequenced
+
+        pending = await db.catalog_changes.find({"seq": None}, {"_id": 1}).sort("changed_at", 1).to_list(None)
+        if pending:
+            first = await _allocate(db, len(pending))
+            await db.catalog_changes.bulk_write([
+                UpdateOne({"_id": entry["_id"], "seq": None}, {"$set": {"seq": first + offset}})
+                for offset, entry in enumerate(pending)
+            ], ordered=False)
+        stats["deletions"] = len(pending)
+
+        # Compactage: les pierres tombales anciennes disparaissent, min_seq avance d'autant
+        expired = await db.catalog_changes.find_one(
+            {"op": "delete", "seq": {"$ne": None}, "changed_at": {"$lt": started_at - TOMBSTONE_RETENTION}},
+            {"_id": 0, "seq": 1},
+            sort=[("seq", -1)]
+        )
+        update = {"watermark": started_at.isoformat()}
+        if expired:
+            await db.catalog_changes.delete_many({"op": "delete", "seq": {"$lte": expired["seq"]}})
+            update["min_seq"] = max(state.get("min_seq", 0), expired["seq"])
+
+        # Toutes les entrées jusqu'à allocated_seq sont écrites: elles deviennent visibles ensemble
+        current = await db.catalog_sync_state.find_one({"_id": STATE_ID}, {"allocated_seq": 1})
+        update["committed_seq"] = current["allocated_seq"]
+        await db.catalog_sync_state.update_one({"_id": STATE_ID}, {"$set": update})
+
+        if any(stats.values()):
+            logger.info(f"🔁 Journal catalogue: {stats} (séquence {update['committed_seq']})")
+        return stats
+    finally:
+        await release_lease(db, "catalog_sequencer")
+
+
+async def get_catalog_changes(db, since: int, epoch: Optional[str], limit: int, collections: Optional[List[str]] = None) -> dict:
+    """
+    Entrées de séquence > `since`, avec l'état courant des documents modifiés
+    `reset` demande au client de vider sa copie et de repartir de since=0
+    """
+    state = await _get_state(db)
+    if since > 0 and (epoch != state["epoch"] or since < state.get("min_seq", 0)):
+        return {"reset": True, "epoch": state["epoch"], "changes": [], "next_since": 0, "has_more": True}
+
+    limit = max(1, min(limit, MAX_CHANGES_PAGE))
+    query = {"seq": {"$gt": since, "$lte": state["committed_seq"]}}
+    if collections:
+        query["collection"] = {"$in": collections}
+    entries = await db.catalog_changes.find(
+        query,
+        {"_id": 0, "collection": 1, "id": 1, "op": 1, "seq": 1}
+    ).sort("seq", 1).limit(limit + 1).to_list(limit + 1)
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    docs = {}
+    for collection in collections or CATALOG_COLLECTIONS:
+        ids = [entry["id"] for entry in entries if entry["collection"] == collection and entry["op"] == "upsert"]
+        if ids:
+            async for doc in db[collection].find({"id": {"$in": ids}}, {"_id": 0}):
+                docs[(collection, doc["id"])] = doc
+
+    changes = []
+    for entry in entries:
+        doc = docs.get((entry["collection"], entry["id"]))
+        # Document supprimé depuis: sa pierre tombale arrivera avec une séquence plus récente
+        if entry["op"] == "upsert" and doc is None:
+            continue
+        changes.append({**entry, "doc": doc} if doc else entry)
+
+    return {
+        "reset": False,
+        "epoch": state["epoch"],
+        "changes": changes,
+        "next_since": entries[-1]["seq"] if entries else since,
+        "has_more": has_more
+    }
@@ -0,0 +1,185 @@
+"""
+Reprise de lecture et épisode suivant
+Chaque épisode porte un ordre précalculé dans sa série (episode_order), indexé avec
+series_id: l'épisode suivant est une seule lecture d'index, sans charger toute la série
+"""
+import logging
+from typing import List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+# Au-delà de cette proportion, un contenu est considéré comme terminé
+COMPLETED_RATIO = 0.9
+# Nombre de lignes d'historique examinées pour construire la reprise de lecture
+HISTORY_SCAN_LIMIT = 200
+EPISODES_PER_SEASON = 10000
+
+EPISODE_FIELDS = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    "season_number": 1,
+    "episode_number": 1,
+    "still_url": 1,
+    "video_url": 1,
+    "duration": 1,
+}
+CONTENT_FIELDS = {"_id": 0, "title": 1, "poster_url": 1, "backdrop_url": 1, "available": 1}
+
+
+def episode_order(season_number: int, episode_number: int) -> int:
+    return season_number * EPISODES_PER_SEASON + episode_number
+
+
+def _order_expr(prefix: str = "$") -> dict:
+    return {"$add": [
+        {"$multiply": [{"$ifNull": [f"{prefix}season_number", 0]}, EPISODES_PER_SEASON]},
+        {"$ifNull": [f"{prefix}episode_number", 0]}
+    ]}
+
+
+async def ensure_indexes(db):
+    await db.watch_history.create_index([("user_id", ASCENDING), ("watched_at", DESCENDING)])
+    await db.episodes.create_index([("series_id", ASCENDING), ("episode_order", ASCENDING)])
+
+
+async def backfill_episode_order(db) -> int:
+    """Calcule episode_order pour les épisodes créés avant son introduction"""
+    result = await db.episodes.update_many(
+        {"episode_order": {"$exists": False}},
+        [{"$set": {"episode_order": _order_expr()}}]
+    )
+    if result.modified_count:
+        logger.info(f"🔢 Ordre calculé pour {result.modified_count} épisodes")
+    return result.modified_count
+
+
+def _lookup_by_id(collection: str, local_field: str, projection: dict, as_field: str) -> dict:
+    """Jointure sur le champ `id` ne ramenant que les champs utiles"""
+    return {"$lookup": {
+        "from": collection,
+        "let": {"id": local_field},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$id", "$$id"]}}},
+            {"$limit": 1},
+            {"$project": projection}
+        ],
+        "as": as_field
+    }}
+
+
+def _next_episode_lookup(series_field: str, order_expr, as_field: str) -> dict:
+    """Premier épisode disponible après `order_expr` dans la série (index series_id, episode_order)"""
+    return {"$lookup": {
+        "from": "episodes",
+        "let": {"series_id": series_field, "order": order_expr},
+        "pipeline": [
+            {"$match": {"$expr": {"$and": [
+                {"$eq": ["$series_id", "$$series_id"]},
+                {"$gt": ["$episode_order", "$$order"]}
+            ]}}},
+            {"$match": {"available": {"$ne": False}}},
+            {"$sort": {"episode_order": 1}},
+            {"$limit": 1},
+            {"$project": EPISODE_FIELDS}
+        ],
+        "as": as_field
+    }}
+
+
+def _prefetch(video_url: Optional[str], image_url: Optional[str]) -> dict:
+    return {"video_url": video_url, "image_url": image_url}
+
+
+async def get_next_episode(db, episode_id: str) -> Optional[dict]:
+    """Épisode courant et épisode suivant en une seule agrégation; None si l'épisode n'existe pas"""
+    pipeline = [
+        {"$match": {"id": episode_id}},
+        {"$limit": 1},
+        _next_episode_lookup("$series_id", {"$ifNull": ["$episode_order", _order_expr()]}, "next"),
+        {"$project": {"_id": 0, "id": 1, "series_id": 1, "season_number": 1, "episode_number": 1, "next": 1}}
+    ]
+    results = await db.episodes.aggregate(pipeline).to_list(1)
+    if not results:
+        return None
+
+    current = results[0]
+    next_episode = current.pop("next")[0] if current.get("next") else None
+    return {
+        "current": current,
+        "next_episode": next_episode,
+        "prefetch": _prefetch(next_episode["video_url"], next_episode.get("still_url")) if next_episode else None
+    }
+
+
+async def get_continue_watching(db, user_id: str, limit: int = 20) -> List[dict]:
+    """
+    Dernière position par film/série, avec l'épisode suivant quand l'épisode en cours est terminé
+    Une seule agrégation sur l'index (user_id, watched_at)
+    """
+    is_finished = {"$and": [
+        {"$gt": [{"$ifNull": ["$duration", 0]}, 0]},
+        {"$gte": [{"$divide": ["$position", "$duration"]}, COMPLETED_RATIO]}
+    ]}
+    pipeline = [
+        {"$match": {"user_id": user_id, "position": {"$exists": True}}},
+        {"$sort": {"watched_at": -1}},
+        {"$limit": HISTORY_SCAN_LIMIT},
+        {"$group": {
+            "_id": {"content_type": "$content_type", "content_id": "$content_id"},
+            "last": {"$first": "$$ROOT"}
+        }},
+        {"$replaceRoot": {"newRoot": "$last"}},
+        {"$addFields": {"finished": is_finished}},
+        # Un film terminé sort de la reprise; une série passe à l'épisode suivant
+        {"$match": {"$or": [{"finished": False}, {"content_type": "series"}]}},
+        {"$sort": {"watched_at": -1}},
+        {"$limit": limit * 2},
+        _lookup_by_id("movies", "$content_id", {**CONTENT_FIELDS, "video_url": 1}, "movie"),
+        _lookup_by_id("series", "$content_id", CONTENT_FIELDS, "series"),
+        _lookup_by_id("episodes", "$episode_id", EPISODE_FIELDS, "episode"),
+        _next_episode_lookup("$content_id", _order_expr(), "next")
+    ]
+
+    items = []
+    async for row in db.watch_history.aggregate(pipeline):
+        is_movie = row["content_type"] == "movie"
+        content = (row["movie"] if is_movie else row["series"]) or [None]
+        content = content[0]
+        if not content or content.get("available") is False:
+            continue
+
+        item = {
+            "content_type": row["content_type"],
+            "content_id": row["content_id"],
+            "title": content.get("title"),
+            "poster_url": content.get("poster_url"),
+            "backdrop_url": content.get("backdrop_url"),
+            "watched_at": row["watched_at"],
+            "resume": None,
+            "next_episode": None,
+            "prefetch": None
+        }
+        if is_movie:
+            item["resume"] = {"position": row["position"], "duration": row.get("duration")}
+            item["prefetch"] = _prefetch(content.get("video_url"), content.get("backdrop_url"))
+        else:
+            episode = row["episode"][0] if row["episode"] else None
+            next_episode = row["next"][0] if row["next"] else None
+            if not row["finished"] and episode:
+                item["resume"] = {"position": row["position"], "duration": row.get("duration"), "episode": episode}
+                item["next_episode"] = next_episode
+                item["prefetch"] = _prefetch(episode["video_url"], episode.get("still_url"))
+            elif next_episode:
+                # Épisode terminé: reprendre au début du suivant
+                item["next_episode"] = next_episode
+                item["prefetch"] = _prefetch(next_episode["video_url"], next_episode.get("still_url"))
+            else:
+                continue
+
+        items.append(item)
+        if len(items) >= limit:
+            break
+    return items
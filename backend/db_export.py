@@ -0,0 +1,208 @@
+"""
+Export natif de la base de données (sans mongodump)
+Chaque collection est lue via un curseur Motor et écrite en streaming dans une archive ZIP
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import zipfile
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List
+
+import bson
+from bson import json_util
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("bson", "ndjson")
+EXPORT_BATCH_SIZE = 1000  # Documents lus par aller-retour MongoDB
+EXPORT_CONCURRENCY = 4  # Collections lues en parallèle
+EXPORT_QUEUE_BATCHES = 2  # Lots en attente par collection (borne la mémoire)
+
+
+class _StreamSink(io.RawIOBase):
+    """Fichier non-seekable: zipfile y écrit, le générateur vide le tampon vers la réponse"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _encode_batch(docs: List[dict], fmt: str) -> bytes:
+    if fmt == "bson":
+        return b"".join(bson.encode(doc) for doc in docs)
+    return "".join(
+        json_util.dumps(doc, json_options=json_util.CANONICAL_JSON_OPTIONS) + "\n"
+        for doc in docs
+    ).encode("utf-8")
+
+
+def _write_batch(entry, hasher, docs: List[dict], fmt: str) -> int:
+    """Encode, hache et compresse un lot (exécuté hors de la boucle d'événements)"""
+    data = _encode_batch(docs, fmt)
+    hasher.update(data)
+    entry.write(data)
+    return len(data)
+
+
+def _readme(db_name: str, fmt: str, exported_at: datetime) -> str:
+    if fmt == "bson":
+        restore_cmd = f"mongorestore --db={db_name} {db_name}/"
+    else:
+        restore_cmd = f"mongoimport --db={db_name} --collection=<collection> --file={db_name}/<collection>.json"
+    return f"""════════════════════════════════════════════════════════════════
+  STREAMING DB - BASE DE DONNÉES COMPLÈTE
+════════════════════════════════════════════════════════════════
+
+Date d'export: {exported_at.strftime('%d %B %Y %H:%M UTC')}
+Base de données: {db_name}
+Format: {fmt}
+
+✅ CONTENU EXPORTÉ:
+- Films avec genres normalisés
+- Séries avec genres normalisés
+- Épisodes complets
+- Utilisateurs avec rôles corrects
+- Sagas, badges, et configurations
+
+════════════════════════════════════════════════════════════════
+  IMPORT SUR VOTRE SERVEUR
+════════════════════════════════════════════════════════════════
+
+1. Décompressez l'archive:
+   unzip streaming_db_export.zip
+
+2. Vérifiez l'intégrité:
+   sha256sum -c checksums.sha256
+
+3. Importez dans MongoDB:
+   {restore_cmd}
+
+4. Vérifiez:
+   mongosh
+   use {db_name}
+   show collections
+
+════════════════════════════════════════════════════════════════
+"""
+
+
+async def _read_collection(collection, queue: asyncio.Queue, batch_size: int):
+    """Lit une collection par lots et les pousse dans une file bornée (None = fin)"""
+    cancelled = False
+    try:
+        batch = []
+        async for doc in collection.find({}, batch_size=batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                await queue.put(batch)
+                batch = []
+        if batch:
+            await queue.put(batch)
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        # Export abandonné: plus personne ne vide la file, attendre une place bloquerait l'annulation
+        if not cancelled:
+            await queue.put(None)
+
+
+async def stream_database_export(
+    db,
+    collection_names: List[str],
+    fmt: str = "bson",
+    batch_size: int = EXPORT_BATCH_SIZE,
+    concurrency: int = EXPORT_CONCURRENCY,
+) -> AsyncIterator[bytes]:
+    """
+    Génère une archive ZIP de la base, morceau par morceau
+    Les collections sont lues en parallèle (fenêtre glissante de `concurrency`)
+    mais écrites dans l'ordre; chaque file est bornée donc la mémoire reste constante
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu: {fmt}")
+
+    db_name = db.name
+    extension = "bson" if fmt == "bson" else "json"
+    exported_at = datetime.now(timezone.utc)
+    sink = _StreamSink()
+    zf = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+
+    queues: Dict[str, asyncio.Queue] = {}
+    readers: Dict[str, asyncio.Task] = {}
+
+    def start_reader(index: int):
+        if index < len(collection_names):
+            name = collection_names[index]
+            queues[name] = asyncio.Queue(maxsize=EXPORT_QUEUE_BATCHES)
+            readers[name] = asyncio.create_task(_read_collection(db[name], queues[name], batch_size))
+
+    manifest = {
+        "database": db_name,
+        "format": fmt,
+        "exported_at": exported_at.isoformat(),
+        "collections": {},
+    }
+    checksums = []
+
+    try:
+        for i in range(min(concurrency, len(collection_names))):
+            start_reader(i)
+
+        for i, name in enumerate(collection_names):
+            path = f"{db_name}/{name}.{extension}"
+            hasher = hashlib.sha256()
+            documents = 0
+            size = 0
+
+            entry = zf.open(path, mode="w", force_zip64=True)
+            while True:
+                docs = await queues[name].get()
+                if docs is None:
+                    break
+                size += await asyncio.to_thread(_write_batch, entry, hasher, docs, fmt)
+                documents += len(docs)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            await asyncio.to_thread(entry.close)
+            await readers.pop(name)  # Propage une éventuelle erreur de lecture
+            del queues[name]
+            start_reader(i + concurrency)
+
+            indexes = [index async for index in db[name].list_indexes()]
+            metadata = {"indexes": indexes, "collectionName": name, "type": "collection"}
+            zf.writestr(
+                f"{db_name}/{name}.metadata.json",
+                json_util.dumps(metadata, json_options=json_util.CANONICAL_JSON_OPTIONS),
+            )
+
+            digest = hasher.hexdigest()
+            checksums.append(f"{digest}  {path}\n")
+            manifest["collections"][name] = {"documents": documents, "bytes": size, "sha256": digest}
+            logger.info(f"📦 Export {name}: {documents} documents ({size} octets)")
+            yield sink.drain()
+
+        zf.writestr("checksums.sha256", "".join(checksums))
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+        zf.writestr("README_IMPORT.txt", _readme(db_name, fmt, exported_at))
+        zf.close()
+        yield sink.drain()
+    finally:
+        for task in readers.values():
+            task.cancel()
@@ -1,219 +1,250 @@
 """
 Service Discord pour mettre à jour les statistiques de films et séries
 dans les noms des canaux vocaux Discord
+
+Un seul publieur par déploiement (élu parmi les workers via MongoDB) regroupe
+les changements du catalogue et renomme les canaux via l'API REST Discord,
+sans connexion à la gateway
 """
 import os
 import asyncio
-import discord
-from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+import time
+import httpx
+from typing import Dict, Optional, Tuple
 import logging
+from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
 
+from background_jobs import acquire_lease, release_lease
+
 # Charger les variables d'environnement
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 logger = logging.getLogger(__name__)
 
+DISCORD_API_BASE = os.environ.get("DISCORD_API_BASE", "https://discord.com/api/v10")
+PUBLISHER_LOCK = "discord_stats_publisher"
+LEASE_TTL_SECONDS = 60
+TICK_SECONDS = 5
+# Attendre ce silence après le dernier changement avant de publier (imports en masse)
+DEBOUNCE_SECONDS = float(os.environ.get("DISCORD_STATS_DEBOUNCE_SECONDS", "15"))
+# ... sans jamais retarder une publication de plus de MAX_DELAY_SECONDS
+MAX_DELAY_SECONDS = float(os.environ.get("DISCORD_STATS_MAX_DELAY_SECONDS", "120"))
+# Au-delà, on n'attend pas la fin d'une limite Discord: le prochain tick réessaiera
+MAX_RATE_LIMIT_WAIT_SECONDS = 10
 
-async def get_movies_count() -> int:
-    """Compte le nombre total de films dans la base de données"""
-    try:
-        MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-        DB_NAME = os.environ.get("DB_NAME", "streaming_db")
-        
-        client = AsyncIOMotorClient(MONGO_URL)
-        db = client[DB_NAME]
-        count = await db.movies.count_documents({})
-        client.close()
-        return count
-    except Exception as e:
-        logger.error(f"Erreur lors du comptage des films: {e}")
-        return 0
+# MongoDB (sera importé depuis server.py, même pool de connexions)
+_db = None
 
+def init_db(db):
+    """Initialiser la connexion à la base de données"""
+    global _db
+    _db = db
 
-async def get_series_count() -> int:
-    """Compte le nombre total de séries dans la base de données"""
-    try:
-        MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-        DB_NAME = os.environ.get("DB_NAME", "streaming_db")
-        
-        client = AsyncIOMotorClient(MONGO_URL)
-        db = client[DB_NAME]
-        count = await db.series.count_documents({})
-        client.close()
-        return count
-    except Exception as e:
-        logger.error(f"Erreur lors du comptage des séries: {e}")
-        return 0
 
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
 
-async def get_episodes_count() -> int:
-    """Compte le nombre total d'épisodes dans la base de données"""
-    try:
-        MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-        DB_NAME = os.environ.get("DB_NAME", "streaming_db")
-        
-        client = AsyncIOMotorClient(MONGO_URL)
-        db = client[DB_NAME]
-        count = await db.episodes.count_documents({})
-        client.close()
-        return count
-    except Exception as e:
-        logger.error(f"Erreur lors du comptage des épisodes: {e}")
-        return 0
 
+async def get_counts(db) -> Dict[str, int]:
+    """Compte les films, séries et épisodes (métadonnées des collections, O(1))"""
+    movies, series, episodes = await asyncio.gather(
+        db.movies.estimated_document_count(),
+        db.series.estimated_document_count(),
+        db.episodes.estimated_document_count()
+    )
+    return {"movies": movies, "series": series, "episodes": episodes}
 
-async def update_channel_name(channel_id: str, new_name: str, bot_token: str) -> bool:
-    """Met à jour le nom d'un canal Discord"""
-    try:
-        # Créer un client Discord avec les intents nécessaires
-        intents = discord.Intents.default()
-        intents.guilds = True
-        
-        client = discord.Client(intents=intents)
-        
-        # Variable pour stocker le résultat
-        success = False
-        
-        @client.event
-        async def on_ready():
-            nonlocal success
+
+def get_channel_names(counts: Dict[str, int]) -> Dict[str, str]:
+    """Nom attendu de chaque canal configuré"""
+    channels = {
+        os.environ.get("DISCORD_FILMS_CHANNEL_ID"): f"🔊 Films : {counts['movies']}",
+        os.environ.get("DISCORD_SERIES_CHANNEL_ID"): f"🔊 Séries : {counts['series']}",
+        os.environ.get("DISCORD_EPISODES_CHANNEL_ID"): f"🔊 Épisodes : {counts['episodes']}",
+    }
+    return {channel_id: name for channel_id, name in channels.items() if channel_id}
+
+
+class DiscordRESTClient:
+    """
+    Session HTTP persistante vers l'API Discord
+    Respecte les limites par route (en-têtes X-RateLimit-*) et la limite globale
+    """
+
+    def __init__(self, bot_token: str, base_url: str = DISCORD_API_BASE):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={
+                "Authorization": f"Bot {bot_token}",
+                "User-Agent": "DiscordBot (sw-streaming, 1.0)"
+            },
+            timeout=10.0
+        )
+        self._blocked_until: Dict[str, float] = {}  # route -> instant monotonic de fin de limite
+        self._global_blocked_until = 0.0
+
+    def _update_limits(self, route: str, response: httpx.Response):
+        now = time.monotonic()
+        if response.status_code == 429:
             try:
-                channel = client.get_channel(int(channel_id))
-                if channel:
-                    await channel.edit(name=new_name)
-                    logger.info(f"Canal Discord mis à jour: {new_name}")
-                    success = True
-                else:
-                    logger.error(f"Canal Discord non trouvé: {channel_id}")
-                    success = False
-            except Exception as e:
-                logger.error(f"Erreur lors de la mise à jour du canal: {e}")
-                success = False
-            finally:
-                await client.close()
-        
-        # Démarrer le client Discord avec un timeout
-        try:
-            await asyncio.wait_for(client.start(bot_token), timeout=10.0)
-        except asyncio.TimeoutError:
-            logger.error("Timeout lors de la connexion au bot Discord")
-            success = False
-        
-        return success
-        
-    except Exception as e:
-        logger.error(f"Erreur Discord: {e}")
+                body = response.json()
+            except ValueError:
+                body = {}
+            retry_after = float(body.get("retry_after", response.headers.get("Retry-After", 1)))
+            if body.get("global") or response.headers.get("X-RateLimit-Global"):
+                self._global_blocked_until = now + retry_after
+            self._blocked_until[route] = now + retry_after
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            reset_after = float(response.headers.get("X-RateLimit-Reset-After", 0))
+            self._blocked_until[route] = now + reset_after
+
+    def retry_in(self, route: str) -> float:
+        """Secondes avant que la route soit de nouveau utilisable"""
+        blocked_until = max(self._blocked_until.get(route, 0.0), self._global_blocked_until)
+        return max(0.0, blocked_until - time.monotonic())
+
+    async def rename_channel(self, channel_id: str, name: str) -> bool:
+        route = f"PATCH /channels/{channel_id}"
+        for _ in range(3):
+            wait = self.retry_in(route)
+            if wait > MAX_RATE_LIMIT_WAIT_SECONDS:
+                logger.warning(f"Limite Discord sur {route}, nouvel essai dans {wait:.0f}s")
+                return False
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            response = await self._client.patch(f"/channels/{channel_id}", json={"name": name})
+            self._update_limits(route, response)
+            if response.status_code == 429:
+                logger.warning("Rate limit Discord atteint, réessai après la limite")
+                continue
+            if response.is_success:
+                return True
+            logger.error(f"Erreur HTTP Discord {response.status_code} pour le canal {channel_id}: {response.text[:200]}")
+            return False
         return False
 
+    async def close(self):
+        await self._client.aclose()
 
-async def update_discord_stats():
+
+def is_configured() -> bool:
+    """Vérifier que les variables d'environnement principales sont configurées"""
+    return all([
+        os.environ.get("DISCORD_BOT_TOKEN"),
+        os.environ.get("DISCORD_FILMS_CHANNEL_ID"),
+        os.environ.get("DISCORD_SERIES_CHANNEL_ID")
+    ])
+
+
+async def publish_stats(db, rest: DiscordRESTClient, published: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, str], bool]:
     """
-    Met à jour les statistiques Discord (films, séries et épisodes)
-    Cette fonction est appelée après chaque ajout/suppression de contenu
+    Renomme les canaux dont le nom a changé depuis la dernière publication
+    Renvoie les noms effectivement publiés et si tous les canaux sont à jour
     """
-    try:
-        # Lire les variables d'environnement dynamiquement
-        DISCORD_BOT_TOKEN = os.environ.get("DISCORD_BOT_TOKEN")
-        DISCORD_FILMS_CHANNEL_ID = os.environ.get("DISCORD_FILMS_CHANNEL_ID")
-        DISCORD_SERIES_CHANNEL_ID = os.environ.get("DISCORD_SERIES_CHANNEL_ID")
-        DISCORD_EPISODES_CHANNEL_ID = os.environ.get("DISCORD_EPISODES_CHANNEL_ID")
-        
-        # Vérifier que les variables d'environnement principales sont configurées
-        if not all([DISCORD_BOT_TOKEN, DISCORD_FILMS_CHANNEL_ID, DISCORD_SERIES_CHANNEL_ID]):
+    counts = await get_counts(db)
+    logger.info(f"Statistiques: {counts['movies']} films, {counts['series']} séries, {counts['episodes']} épisodes")
+
+    published = dict(published or {})
+    complete = True
+    for channel_id, name in get_channel_names(counts).items():
+        if published.get(channel_id) == name:
+            continue
+        if await rest.rename_channel(channel_id, name):
+            published[channel_id] = name
+            logger.info(f"Canal Discord mis à jour: {name}")
+        else:
+            complete = False
+    return published, complete
+
+
+class DiscordStatsPublisher:
+    """Boucle de fond: le leader publie les statistiques une fois les changements regroupés"""
+
+    def __init__(self):
+        self._wake = asyncio.Event()
+        self._rest: Optional[DiscordRESTClient] = None
+        self._is_leader = False
+
+    def wake(self):
+        self._wake.set()
+
+    async def _tick(self):
+        state = await _db.job_locks.find_one({"_id": PUBLISHER_LOCK}) or {}
+        pending_since = state.get("pending_since")
+        if not pending_since:
+            return
+
+        now = datetime.now(timezone.utc)
+        quiet = (now - _as_utc(state.get("dirty_at", pending_since))).total_seconds()
+        waiting = (now - _as_utc(pending_since)).total_seconds()
+        if quiet < DEBOUNCE_SECONDS and waiting < MAX_DELAY_SECONDS:
+            return
+
+        if not is_configured():
             logger.warning("Configuration Discord incomplète, mise à jour ignorée")
-            return False
-        
-        # Compter les films, séries et épisodes
-        movies_count = await get_movies_count()
-        series_count = await get_series_count()
-        episodes_count = await get_episodes_count()
-        
-        logger.info(f"Statistiques: {movies_count} films, {series_count} séries, {episodes_count} épisodes")
-        
-        # Créer un client Discord avec les intents nécessaires
-        intents = discord.Intents.default()
-        intents.guilds = True
-        
-        client = discord.Client(intents=intents)
-        
-        success = False
-        
-        @client.event
-        async def on_ready():
-            nonlocal success
+            await _db.job_locks.update_one({"_id": PUBLISHER_LOCK}, {"$unset": {"pending_since": ""}})
+            return
+        if self._rest is None:
+            self._rest = DiscordRESTClient(os.environ["DISCORD_BOT_TOKEN"])
+
+        published, complete = await publish_stats(_db, self._rest, state.get("published"))
+        await _db.job_locks.update_one(
+            {"_id": PUBLISHER_LOCK},
+            {"$set": {"published": published, "published_at": now}}
+        )
+        if complete:
+            # Les signaux arrivés pendant la publication restent en attente
+            await _db.job_locks.update_one(
+                {"_id": PUBLISHER_LOCK, "dirty_at": {"$lte": now}},
+                {"$unset": {"pending_since": ""}}
+            )
+
+    async def run(self):
+        while True:
             try:
-                # Mettre à jour le canal Films
-                films_channel = client.get_channel(int(DISCORD_FILMS_CHANNEL_ID))
-                if films_channel:
-                    await films_channel.edit(name=f"🔊 Films : {movies_count}")
-                    logger.info(f"Canal Films mis à jour: {movies_count}")
-                else:
-                    logger.error(f"Canal Films non trouvé: {DISCORD_FILMS_CHANNEL_ID}")
-                
-                # Mettre à jour le canal Séries
-                series_channel = client.get_channel(int(DISCORD_SERIES_CHANNEL_ID))
-                if series_channel:
-                    await series_channel.edit(name=f"🔊 Séries : {series_count}")
-                    logger.info(f"Canal Séries mis à jour: {series_count}")
-                else:
-                    logger.error(f"Canal Séries non trouvé: {DISCORD_SERIES_CHANNEL_ID}")
-                
-                # Mettre à jour le canal Épisodes (si configuré)
-                if DISCORD_EPISODES_CHANNEL_ID:
-                    episodes_channel = client.get_channel(int(DISCORD_EPISODES_CHANNEL_ID))
-                    if episodes_channel:
-                        await episodes_channel.edit(name=f"🔊 Épisodes : {episodes_count}")
-                        logger.info(f"Canal Épisodes mis à jour: {episodes_count}")
-                    else:
-                        logger.error(f"Canal Épisodes non trouvé: {DISCORD_EPISODES_CHANNEL_ID}")
-                
-                success = True
-                
-            except discord.errors.HTTPException as e:
-                if e.status == 429:
-                    logger.warning("Rate limit Discord atteint, réessayez plus tard")
-                else:
-                    logger.error(f"Erreur HTTP Discord: {e}")
-                success = False
+                self._is_leader = await acquire_lease(_db, PUBLISHER_LOCK, LEASE_TTL_SECONDS)
+                if self._is_leader:
+                    await self._tick()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Erreur lors de la mise à jour des canaux: {e}")
-                success = False
-            finally:
-                await client.close()
-        
-        # Démarrer le client Discord avec un timeout
-        try:
-            await asyncio.wait_for(client.start(DISCORD_BOT_TOKEN), timeout=15.0)
-        except asyncio.TimeoutError:
-            logger.error("Timeout lors de la connexion au bot Discord")
-            success = False
-        
-        return success
-        
-    except Exception as e:
-        logger.error(f"Erreur dans update_discord_stats: {e}")
-        return False
+                logger.error(f"Erreur dans le publieur Discord: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=TICK_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
 
+    async def close(self):
+        if self._rest is not None:
+            await self._rest.close()
+            self._rest = None
+        if self._is_leader:
+            await release_lease(_db, PUBLISHER_LOCK)
 
-def sync_update_discord_stats():
+
+discord_publisher = DiscordStatsPublisher()
+
+
+async def update_discord_stats():
     """
-    Version synchrone de update_discord_stats pour être appelée depuis du code synchrone
+    Signale un changement du catalogue (films, séries et épisodes)
+    Cette fonction est appelée après chaque ajout/suppression de contenu;
+    le publieur élu regroupe les signaux de tous les workers
     """
     try:
-        # Créer une nouvelle event loop si nécessaire
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        # Exécuter la mise à jour asynchrone dans un thread séparé
-        asyncio.create_task(update_discord_stats())
-        logger.info("Mise à jour Discord lancée en arrière-plan")
-        
+        now = datetime.now(timezone.utc)
+        await _db.job_locks.update_one(
+            {"_id": PUBLISHER_LOCK},
+            {"$set": {"dirty_at": now}, "$min": {"pending_since": now}},
+            upsert=True
+        )
+        discord_publisher.wake()
+        return True
     except Exception as e:
-        logger.error(f"Erreur dans sync_update_discord_stats: {e}")
+        logger.error(f"Erreur dans update_discord_stats: {e}")
+        return False
@@ -7,6 +7,7 @@ import sys
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
 
 # Charger les variables d'environnement
 ROOT_DIR = Path(__file__).parent
@@ -14,13 +15,24 @@ load_dotenv(ROOT_DIR / '.env')
 
 sys.path.append('/app/backend')
 
-from discord_service import update_discord_stats
+from discord_service import DiscordRESTClient, is_configured, publish_stats
 
 async def main():
     print("🚀 Initialisation des statistiques Discord...")
+    
+    if not is_configured():
+        print("❌ Configuration Discord incomplète (DISCORD_BOT_TOKEN, DISCORD_FILMS_CHANNEL_ID, DISCORD_SERIES_CHANNEL_ID)")
+        return
+    
     print("📊 Comptage des films et séries dans la base de données...")
     
-    success = await update_discord_stats()
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    rest = DiscordRESTClient(os.environ["DISCORD_BOT_TOKEN"])
+    try:
+        _, success = await publish_stats(client[os.environ.get("DB_NAME", "streaming_db")], rest)
+    finally:
+        await rest.close()
+        client.close()
     
     if success:
         print("✅ Statistiques Discord mises à jour avec succès!")
@@ -0,0 +1,219 @@
+"""
+Journalisation asynchrone et structurée
+Les appels logging.* ne font que déposer l'enregistrement dans une file (QueueHandler): le
+formatage JSON et l'écriture sur stderr (et dans ACCESS_LOG_FILE pour les lignes d'accès) ont lieu
+dans le thread du QueueListener, jamais sur la boucle asyncio. Chaque ligne porte l'identifiant de la requête HTTP en cours (en-tête X-Request-ID).
+Les lignes « par élément » des traitements en masse passent par `items_logger`, limité en débit
+"""
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from metrics import LOG_RECORDS_DROPPED
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # json ou text (lecture humaine en développement)
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+LOG_ITEM_LINES_PER_SECOND = float(os.environ.get('LOG_ITEM_LINES_PER_SECOND', '5'))
+# Fichier des lignes d'accès (défaut: stderr avec les autres lignes); gunicorn_conf.py le fixe en production
+ACCESS_LOG_FILE = os.environ.get('ACCESS_LOG_FILE')
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributs standard d'un LogRecord: tout le reste vient de `extra=` et part dans le JSON
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Exécuté dans le thread émetteur: capture la requête en cours avant le passage dans la file"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Au plus `per_second` lignes par seconde (seau à jetons); la ligne suivante signale les omissions"""
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self.tokens = per_second
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.per_second, self.tokens + (now - self.updated) * self.per_second)
+            self.updated = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                return False
+            self.tokens -= 1
+            if self.suppressed:
+                record.suppressed = self.suppressed
+                self.suppressed = 0
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """File bornée: si le thread d'écriture ne suit pas, la ligne est perdue plutôt que la requête ralentie"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Message fusionné et trace d'exception mise en texte ici, le reste du formatage dans le thread d'écriture
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+# Lignes par élément (un titre rafraîchi, un ajout aux récents...): débit borné
+items_logger = logging.getLogger("items")
+items_logger.addFilter(RateLimitFilter(LOG_ITEM_LINES_PER_SECOND))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _output_handlers() -> List[logging.Handler]:
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if ACCESS_LOG_FILE:
+        # WatchedFileHandler: rouvre le fichier après une rotation externe (logrotate)
+        access_handler = logging.handlers.WatchedFileHandler(ACCESS_LOG_FILE, encoding="utf-8")
+        access_handler.addFilter(lambda record: record.name == "access")
+        handlers[0].addFilter(lambda record: record.name != "access")
+        handlers.append(access_handler)
+    for handler in handlers:
+        if LOG_FORMAT == "text":
+            handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'))
+        else:
+            handler.setFormatter(JsonFormatter())
+    return handlers
+
+
+def _start_listener(handler: DroppingQueueHandler):
+    global _listener
+    _listener = logging.handlers.QueueListener(handler.queue, *_output_handlers(), respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork(handler: DroppingQueueHandler):
+    # Le thread d'écriture ne survit pas à un fork et la file a pu être copiée verrouillée: repartir à neuf
+    handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _start_listener(handler)
+
+
+def setup_logging():
+    """Remplace les handlers du root par la file (idempotent); les loggers uvicorn s'y déversent aussi"""
+    root = logging.getLogger()
+    if any(isinstance(handler, DroppingQueueHandler) for handler in root.handlers):
+        return
+    handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    handler.addFilter(RequestIdFilter())
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    # Le journal d'accès est écrit par RequestLogMiddleware (avec l'identifiant de requête)
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _start_listener(handler)
+    # gunicorn --preload: chaque worker relance son propre thread d'écriture
+    os.register_at_fork(after_in_child=lambda: _restart_after_fork(handler))
+
+
+def stop_logging():
+    """Vide la file avant l'arrêt du processus"""
+    if _listener is not None:
+        _listener.stop()
+
+
+class RequestLogMiddleware:
+    """Middleware ASGI: identifiant de requête (reçu ou généré), renvoyé en en-tête, et ligne d'accès JSON"""
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger("access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            client = scope.get("client")
+            self.logger.info(
+                f"{scope['method']} {scope['path']} {status}",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(scope.get("route"), "path", None),
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "client": client[0] if client else None,
+                }
+            )
+            request_id_var.reset(token)
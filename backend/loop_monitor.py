@@ -0,0 +1,89 @@
+"""
+Surveillance du retard de la boucle asyncio
+Une tâche se réveille toutes les LOOP_LAG_INTERVAL secondes: l'écart entre le réveil prévu et le
+réveil réel est le temps pendant lequel la boucle n'a pu servir personne (métrique event_loop_lag_seconds).
+En mode diagnostic (LOOP_DEBUG=1), un thread de garde capture la pile du code qui bloque la boucle
+au-delà de LOOP_BLOCKING_THRESHOLD_MS, pendant le blocage: la ligne fautive apparaît dans les logs
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from metrics import EVENT_LOOP_LAG, EVENT_LOOP_LAG_MAX
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL = 0.5
+LOOP_DEBUG = os.environ.get('LOOP_DEBUG', '') == '1'
+LOOP_BLOCKING_THRESHOLD_MS = float(os.environ.get('LOOP_BLOCKING_THRESHOLD_MS', '100'))
+# Fenêtre de la jauge du retard maximal (remise à zéro après chaque publication)
+LAG_MAX_WINDOW = 15
+
+
+class BlockingWatchdog:
+    """Thread de garde: la boucle signale qu'elle tourne, le thread capture la pile si elle se tait"""
+
+    def __init__(self, threshold_seconds: float):
+        self.threshold = threshold_seconds
+        self.heartbeat = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self.heartbeat
+            blocked = time.monotonic() - beat
+            # Une seule capture par blocage (même battement)
+            if blocked < self.threshold or reported == beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported = beat
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(f"🧱 Boucle asyncio bloquée depuis {blocked * 1000:.0f}ms, pile en cours:\n{stack}")
+
+
+async def monitor_event_loop():
+    """Mesure le retard de la boucle en continu (à lancer comme tâche de fond)"""
+    loop = asyncio.get_running_loop()
+    watchdog = None
+    if LOOP_DEBUG:
+        watchdog = BlockingWatchdog(LOOP_BLOCKING_THRESHOLD_MS / 1000)
+        watchdog.start()
+        # Les battements doivent être plus fréquents que le seuil pour ne pas déclencher à tort
+        interval = min(LOOP_LAG_INTERVAL, LOOP_BLOCKING_THRESHOLD_MS / 4000)
+        logger.info(f"🧱 Détection des blocages de la boucle activée (seuil {LOOP_BLOCKING_THRESHOLD_MS:.0f}ms)")
+    else:
+        interval = LOOP_LAG_INTERVAL
+
+    window_max = 0.0
+    window_started = loop.time()
+    try:
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - expected)
+            if watchdog:
+                watchdog.heartbeat = time.monotonic()
+            EVENT_LOOP_LAG.observe(lag)
+            window_max = max(window_max, lag)
+            if loop.time() - window_started >= LAG_MAX_WINDOW:
+                EVENT_LOOP_LAG_MAX.set(window_max)
+                window_max = 0.0
+                window_started = loop.time()
+    finally:
+        if watchdog:
+            watchdog.stop()
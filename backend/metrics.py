@@ -0,0 +1,127 @@
+"""
+Métriques Prometheus agrégées sur tous les workers Gunicorn
+Avec PROMETHEUS_MULTIPROC_DIR (défini par gunicorn_conf.py), chaque worker écrit ses valeurs
+dans des fichiers mmap et /metrics les additionne; sans cette variable (uvicorn seul),
+le registre du processus est exposé tel quel
+"""
+import os
+import threading
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from pymongo import monitoring
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Latences HTTP: de 5ms à 10s (les exports et imports TMDB dépassent le dernier seuil)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requêtes HTTP traitées", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Durée des requêtes HTTP", ["method", "route"], buckets=LATENCY_BUCKETS)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requêtes HTTP en cours", multiprocess_mode="livesum")
+
+MONGO_CHECKOUT_WAIT = Histogram("mongo_pool_checkout_wait_seconds", "Attente d'une connexion du pool MongoDB", buckets=POOL_BUCKETS)
+MONGO_CHECKOUT_FAILURES = Counter("mongo_pool_checkout_failures_total", "Échecs d'obtention d'une connexion MongoDB", ["reason"])
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "Durée des commandes MongoDB", ["command", "collection"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+TMDB_LATENCY = Histogram("tmdb_request_duration_seconds", "Durée des appels TMDB", ["endpoint"], buckets=LATENCY_BUCKETS)
+TMDB_ERRORS = Counter("tmdb_errors_total", "Appels TMDB en erreur (statut HTTP ou exception)", ["endpoint", "reason"])
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Retard de réveil de la boucle asyncio (code bloquant)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+EVENT_LOOP_LAG_MAX = Gauge("event_loop_lag_max_seconds", "Retard maximal récent de la boucle, par worker", multiprocess_mode="liveall")
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Lectures des caches mémoire", ["cache", "result"])
+
+JOB_RUNS = Counter("background_job_runs_total", "Exécutions des tâches périodiques", ["job", "status"])
+JOB_DURATION = Histogram("background_job_duration_seconds", "Durée des tâches périodiques", ["job"], buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600))
+BATCH_ITEMS = Counter("batch_items_processed_total", "Éléments traités par les tâches par lots", ["job"])
+WRITE_BEHIND_ITEMS = Counter("write_behind_flushed_items_total", "Éléments écrits par les tampons d'écriture différée", ["buffer"])
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Lignes de log perdues (file d'écriture pleine)")
+WRITE_BEHIND_FAILURES = Counter("write_behind_flush_failures_total", "Vidages de tampons échoués", ["buffer"])
+WRITE_BEHIND_DROPPED = Counter("write_behind_dropped_items_total", "Éléments perdus faute de place dans un tampon (base indisponible)", ["buffer"])
+
+
+def record_tmdb_call(endpoint: str, seconds: float, error: str = None):
+    TMDB_LATENCY.labels(endpoint).observe(seconds)
+    if error:
+        TMDB_ERRORS.labels(endpoint, error).inc()
+
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """
+    Temps d'attente des connexions du pool (saturation de maxPoolSize)
+    Motor exécute chaque opération dans un thread: début et fin de l'attente y sont appariés
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        MONGO_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latence et statut par modèle de route (/api/movies/{movie_id}, pas l'URL)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Les URLs sans route restent groupées pour borner le nombre de séries
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_LATENCY.labels(scope["method"], route_path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(scope["method"], route_path, str(status)).inc()
+
+
+def render_metrics() -> bytes:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
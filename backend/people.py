@@ -0,0 +1,149 @@
+"""
+Index des personnes (acteurs, réalisateurs, créateurs) par identifiant TMDB
+- people: une fiche par personne (nom, nom normalisé indexé pour la recherche, photo)
+- person_credits: une ligne par (personne, titre, rôle), indexée par personne et par titre
+Alimenté à l'import TMDB et au rafraîchissement des métadonnées: la filmographie d'une
+personne est une lecture indexée au lieu d'un parcours des tableaux `cast`
+"""
+import re
+import logging
+import unicodedata
+from datetime import datetime, timezone
+from typing import List
+
+from pymongo import ASCENDING, DeleteMany, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+CONTENT_COLLECTIONS = {"movie": "movies", "series": "series"}
+PERSON_FIELDS = {"movie": "director", "series": "creator"}
+CARD_FIELDS = {"_id": 0, "id": 1, "title": 1, "poster_url": 1, "release_year": 1, "rating": 1}
+
+
+def normalize_name(name: str) -> str:
+    """Minuscules sans accents: "Élodie Bouchez" -> "elodie bouchez" """
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+async def ensure_indexes(db):
+    await db.people.create_index("tmdb_id", unique=True)
+    await db.people.create_index("search_name")
+    await db.person_credits.create_index([("person_id", ASCENDING), ("content_type", ASCENDING)])
+    await db.person_credits.create_index([("content_type", ASCENDING), ("content_id", ASCENDING)])
+
+
+def title_people(content_type: str, doc: dict) -> List[dict]:
+    """Personnes identifiées (tmdb_id) d'un titre: réalisateur/créateur puis acteurs"""
+    person_field = PERSON_FIELDS[content_type]
+    people = []
+    if doc.get(f"{person_field}_tmdb_id") and doc.get(person_field):
+        people.append({
+            "tmdb_id": doc[f"{person_field}_tmdb_id"],
+            "name": doc[person_field],
+            "photo": doc.get(f"{person_field}_photo"),
+            "role": person_field,
+            "character": None
+        })
+    for order, actor in enumerate(doc.get("cast") or []):
+        if actor.get("tmdb_id") and actor.get("name"):
+            people.append({
+                "tmdb_id": actor["tmdb_id"],
+                "name": actor["name"],
+                "photo": actor.get("photo"),
+                "role": "cast",
+                "character": actor.get("character"),
+                "order": order
+            })
+    return people
+
+
+async def index_title_people(db, content_type: str, content_id: str, doc: dict):
+    """Remplace les crédits d'un titre et met à jour les fiches des personnes concernées"""
+    people = title_people(content_type, doc)
+    now = datetime.now(timezone.utc).isoformat()
+
+    credit_ops = [DeleteMany({"content_type": content_type, "content_id": content_id})]
+    credit_ops.extend(
+        UpdateOne(
+            {"person_id": person["tmdb_id"], "content_type": content_type, "content_id": content_id, "role": person["role"]},
+            {"$set": {"character": person["character"], "order": person.get("order"), "updated_at": now}},
+            upsert=True
+        )
+        for person in people
+    )
+    # Ordonné: la suppression des anciens crédits passe avant les nouveaux
+    await db.person_credits.bulk_write(credit_ops, ordered=True)
+
+    if people:
+        await db.people.bulk_write([
+            UpdateOne(
+                {"tmdb_id": person["tmdb_id"]},
+                {
+                    "$set": {
+                        "name": person["name"],
+                        "search_name": normalize_name(person["name"]),
+                        # Ne pas effacer une photo connue avec un crédit sans photo
+                        **({"photo": person["photo"]} if person["photo"] else {}),
+                        "updated_at": now
+                    },
+                    "$setOnInsert": {"created_at": now}
+                },
+                upsert=True
+            )
+            for person in people
+        ], ordered=False)
+
+
+async def rebuild_people_index(db) -> int:
+    """Réindexe tous les titres (après une restauration: people/person_credits ne sont pas sauvegardés)"""
+    indexed = 0
+    for content_type, collection in CONTENT_COLLECTIONS.items():
+        person_field = PERSON_FIELDS[content_type]
+        projection = {"_id": 0, "id": 1, "cast": 1, person_field: 1, f"{person_field}_tmdb_id": 1, f"{person_field}_photo": 1}
+        async for doc in db[collection].find({}, projection):
+            await index_title_people(db, content_type, doc["id"], doc)
+            indexed += 1
+    return indexed
+
+
+async def remove_title_people(db, content_type: str, content_id: str):
+    await db.person_credits.delete_many({"content_type": content_type, "content_id": content_id})
+
+
+async def search_people(db, query: str, limit: int = 20) -> List[dict]:
+    """Recherche par début de nom (parcours d'index sur search_name)"""
+    prefix = normalize_name(query)
+    if not prefix:
+        return []
+    return await db.people.find(
+        {"search_name": {"$regex": f"^{re.escape(prefix)}"}},
+        {"_id": 0, "tmdb_id": 1, "name": 1, "photo": 1}
+    ).sort("search_name", 1).limit(limit).to_list(limit)
+
+
+async def get_filmography(db, person_id: int):
+    """Fiche d'une personne et ses titres disponibles; None si la personne est inconnue"""
+    person = await db.people.find_one({"tmdb_id": person_id}, {"_id": 0, "tmdb_id": 1, "name": 1, "photo": 1})
+    if person is None:
+        return None
+
+    credits = await db.person_credits.find(
+        {"person_id": person_id},
+        {"_id": 0, "content_type": 1, "content_id": 1, "role": 1, "character": 1}
+    ).to_list(None)
+
+    filmography = {}
+    for content_type, collection in CONTENT_COLLECTIONS.items():
+        roles = {}
+        for credit in credits:
+            if credit["content_type"] == content_type:
+                roles.setdefault(credit["content_id"], []).append({"role": credit["role"], "character": credit.get("character")})
+        titles = []
+        if roles:
+            async for doc in db[collection].find({"id": {"$in": list(roles)}, "available": {"$ne": False}}, CARD_FIELDS):
+                titles.append({**doc, "roles": roles[doc["id"]]})
+        titles.sort(key=lambda t: t.get("release_year") or 0, reverse=True)
+        filmography[collection] = titles
+
+    return {**person, **filmography}
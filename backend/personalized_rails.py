@@ -0,0 +1,127 @@
+"""
+Rails personnalisés de la page d'accueil
+"Parce que vous avez regardé X" et "Vos genres" sont construits depuis l'historique récent
+de l'utilisateur et l'index de similarité: les candidats viennent des voisins
+précalculés (et des tendances), jamais d'un parcours du catalogue.
+Cache par utilisateur, indexé par la version de user_stats: chaque vidage d'événements
+de visionnage incrémente cette version, ce qui invalide le cache sur tous les workers
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from cache import TTLCache
+from rails import get_rail
+from similarity import CONTENT_COLLECTIONS, similarity_store
+
+logger = logging.getLogger(__name__)
+
+RAILS_CACHE_SECONDS = 600
+RAILS_CACHE_MAX_USERS = 1000
+RECENT_TITLES = 30
+SEED_TITLES = 3
+RAIL_SIZE = 12
+TOP_GENRES = 3
+
+CARD_FIELDS = {"_id": 0, "id": 1, "title": 1, "poster_url": 1, "backdrop_url": 1, "genres": 1, "release_year": 1, "rating": 1, "description": 1}
+
+_rails_cache = TTLCache("personalized_rails", RAILS_CACHE_SECONDS, max_entries=RAILS_CACHE_MAX_USERS)
+
+TitleKey = Tuple[str, str]  # (content_type, content_id)
+
+
+async def _recent_titles(db, user_id: str) -> List[TitleKey]:
+    """Titres distincts les plus récemment regardés (index user_id, watched_at)"""
+    rows = await db.watch_history.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$sort": {"watched_at": -1}},
+        {"$limit": RECENT_TITLES * 10},
+        {"$group": {"_id": {"content_type": "$content_type", "content_id": "$content_id"}, "watched_at": {"$max": "$watched_at"}}},
+        {"$sort": {"watched_at": -1}},
+        {"$limit": RECENT_TITLES}
+    ]).to_list(None)
+    return [(row["_id"]["content_type"], row["_id"]["content_id"]) for row in rows if row["_id"]["content_type"] in CONTENT_COLLECTIONS]
+
+
+async def _fetch_cards(db, keys) -> Dict[TitleKey, dict]:
+    """Une requête $in par type de contenu"""
+    by_type = defaultdict(set)
+    for content_type, content_id in keys:
+        by_type[content_type].add(content_id)
+    cards = {}
+    for content_type, ids in by_type.items():
+        async for doc in db[CONTENT_COLLECTIONS[content_type]].find(
+            {"id": {"$in": list(ids)}, "available": {"$ne": False}}, CARD_FIELDS
+        ):
+            cards[(content_type, doc["id"])] = {**doc, "content_type": content_type}
+    return cards
+
+
+async def build_personalized_rails(db, user_id: str) -> List[dict]:
+    recent = await _recent_titles(db, user_id)
+    if not recent:
+        return []
+
+    stats = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0, "movie_ids": 1, "series_ids": 1}) or {}
+    watched = set(recent)
+    watched.update(("movie", content_id) for content_id in stats.get("movie_ids", []))
+    watched.update(("series", content_id) for content_id in stats.get("series_ids", []))
+
+    # Voisins précalculés des titres récents: une requête par type de contenu
+    similar_by_type = {
+        content_type: await similarity_store.similar_many(db, collection, [content_id for kind, content_id in recent if kind == content_type])
+        for content_type, collection in CONTENT_COLLECTIONS.items()
+    }
+
+    # Voisins de chaque titre récent, pondérés par la récence du titre source
+    neighbours: Dict[TitleKey, List[TitleKey]] = {}
+    affinity: Dict[TitleKey, float] = defaultdict(float)
+    for rank, key in enumerate(recent):
+        similar = [((key[0], similar_id), score) for similar_id, score in similar_by_type[key[0]].get(key[1], [])]
+        neighbours[key] = [candidate for candidate, _ in similar if candidate not in watched]
+        for candidate, score in similar:
+            if candidate not in watched:
+                affinity[candidate] += score / (1 + rank)
+
+    # Les tendances complètent les candidats d'un historique encore court
+    for content_type, collection in CONTENT_COLLECTIONS.items():
+        for item in await get_rail(db, f"trending_{collection}", RAIL_SIZE):
+            affinity.setdefault((content_type, item["id"]), 0.0)
+
+    cards = await _fetch_cards(db, set(recent) | set(affinity))
+
+    rails = []
+    for key in recent[:SEED_TITLES]:
+        seed = cards.get(key)
+        items = [cards[candidate] for candidate in neighbours.get(key, []) if candidate in cards][:RAIL_SIZE]
+        if seed and items:
+            rails.append({
+                "id": f"because_you_watched:{key[1]}",
+                "title": f"Parce que vous avez regardé {seed['title']}",
+                "items": items
+            })
+
+    # Profil de genres: titres récents pondérés par leur récence
+    genre_weights: Dict[str, float] = defaultdict(float)
+    for rank, key in enumerate(recent):
+        for genre in (cards.get(key) or {}).get("genres") or []:
+            genre_weights[genre] += 1 / (1 + rank)
+    top_genres = [genre for genre, _ in sorted(genre_weights.items(), key=lambda g: -g[1])[:TOP_GENRES]]
+    if top_genres:
+        def genre_score(candidate: TitleKey) -> Tuple[float, float]:
+            genres = cards[candidate].get("genres") or []
+            return (sum(genre_weights[g] for g in genres if g in top_genres), affinity[candidate])
+
+        candidates = [c for c in affinity if c in cards and set(cards[c].get("genres") or []) & set(top_genres)]
+        items = [cards[c] for c in sorted(candidates, key=genre_score, reverse=True)[:RAIL_SIZE]]
+        if items:
+            rails.append({"id": "your_genres", "title": f"Vos genres : {', '.join(top_genres)}", "items": items})
+
+    return rails
+
+
+async def get_personalized_rails(db, user_id: str) -> List[dict]:
+    """Une lecture indexée de la version, puis le cache; calcul complet seulement après un visionnage"""
+    stats = await db.user_stats.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+    version = stats.get("version", 0) if stats else 0
+    return await _rails_cache.get((user_id, version), lambda: build_personalized_rails(db, user_id))
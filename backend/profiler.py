@@ -0,0 +1,143 @@
+"""
+Profileur statistique à la demande, dans le worker en cours d'exécution
+Pendant une fenêtre bornée, un thread relève la pile du thread de la boucle asyncio toutes les
+`interval` secondes et compte les piles identiques (format « collapsed » ou speedscope).
+Hors session: aucun thread, aucun hook; le middleware ne fait qu'un test de variable.
+Le filtre de route associe la tâche asyncio en cours d'exécution au scope de sa requête
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_PROFILE_SECONDS = 60
+MIN_INTERVAL_SECONDS = 0.001
+MAX_STACK_DEPTH = 128
+
+Frame = Tuple[str, str, int]  # (fonction, fichier, ligne de définition)
+
+
+class SamplingSession:
+    def __init__(self, loop: asyncio.AbstractEventLoop, seconds: float, interval: float, route: Optional[str]):
+        self.loop = loop
+        self.seconds = seconds
+        self.interval = interval
+        self.route = route
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        # Tâche asyncio -> scope ASGI, alimenté par le middleware seulement si `route` est filtrée
+        self.task_scopes: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+        self._loop_thread_id = threading.get_ident()
+        self._done = threading.Event()
+
+    def _matches_route(self) -> bool:
+        task = asyncio.current_task(self.loop)
+        scope = self.task_scopes.get(task) if task is not None else None
+        return scope is not None and getattr(scope.get("route"), "path", None) == self.route
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        if self.route is not None and not self._matches_route():
+            return
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self):
+        started = time.perf_counter()
+        deadline = started + self.seconds
+        try:
+            while time.perf_counter() < deadline:
+                self._sample()
+                time.sleep(self.interval)
+        except Exception as e:
+            logger.error(f"❌ Profileur interrompu: {e}")
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self._done.set()
+
+    def collapsed(self) -> str:
+        """Une ligne par pile: `racine;...;feuille nombre` (flamegraph.pl, speedscope, inferno)"""
+        lines = [
+            f"{';'.join(f'{name} ({filename}:{line})' for name, filename, line in stack)} {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        frames: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name, "file": filename, "line": line} for name, filename, line in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"worker {self.route or 'toutes routes'}",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }],
+            "activeProfileIndex": 0,
+            "exporter": "streamflex-profiler"
+        }
+
+
+_session: Optional[SamplingSession] = None
+
+
+async def profile(seconds: float, interval: float, route: Optional[str] = None) -> SamplingSession:
+    """Échantillonne la boucle de ce worker pendant `seconds` secondes (une session à la fois)"""
+    global _session
+    if _session is not None:
+        raise RuntimeError("Une session de profilage est déjà en cours sur ce worker")
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    interval = max(interval, MIN_INTERVAL_SECONDS)
+
+    session = SamplingSession(asyncio.get_running_loop(), seconds, interval, route)
+    _session = session
+    thread = threading.Thread(target=session.run, name="sampling-profiler", daemon=True)
+    try:
+        thread.start()
+        # Attendre sans bloquer la boucle: c'est elle que l'on observe
+        while not session._done.is_set():
+            await asyncio.sleep(min(0.1, seconds))
+    finally:
+        _session = None
+    return session
+
+
+class ProfilerMiddleware:
+    """Associe chaque requête à sa tâche, uniquement pendant une session filtrée par route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = _session
+        if session is not None and session.route is not None and scope["type"] == "http":
+            task = asyncio.current_task()
+            session.task_scopes[task] = scope
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                session.task_scopes.pop(task, None)
+            return
+        await self.app(scope, receive, send)
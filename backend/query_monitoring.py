@@ -0,0 +1,126 @@
+"""
+Suivi des commandes MongoDB par requête HTTP
+Un CommandListener pymongo mesure chaque commande (nom, collection, durée, documents renvoyés)
+et l'attribue à la requête en cours via une contextvar: Motor exécute les commandes dans des
+threads, mais copie le contexte de la coroutine appelante.
+- en-tête Server-Timing (temps MongoDB et nombre de requêtes) sur chaque réponse
+- journalisation des commandes lentes et des requêtes HTTP qui en émettent trop (N+1)
+"""
+import contextvars
+import logging
+import os
+import threading
+from collections import Counter as TallyCounter
+from typing import Optional
+
+from pymongo import monitoring
+
+from metrics import MONGO_COMMAND_DURATION
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+MAX_QUERIES_PER_REQUEST = int(os.environ.get('MAX_QUERIES_PER_REQUEST', '20'))
+
+# Commandes internes au pilote (surveillance, sessions): ni comptées ni journalisées
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+
+class RequestQueries:
+    """Compteurs d'une requête HTTP (mis à jour depuis les threads de Motor)"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.count = 0
+        self.duration_ms = 0.0
+        self.docs_returned = 0
+        self.by_command = TallyCounter()
+        self._lock = threading.Lock()
+
+    def add(self, command: str, collection: str, duration_ms: float, docs: int):
+        with self._lock:
+            self.count += 1
+            self.duration_ms += duration_ms
+            self.docs_returned += docs
+            self.by_command[f"{command} {collection}"] += 1
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration_ms:.1f};desc="{self.count} queries"'
+
+
+_current: contextvars.ContextVar[Optional[RequestQueries]] = contextvars.ContextVar("request_queries", default=None)
+
+
+def _docs_returned(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "values" in reply:  # distinct
+        return len(reply["values"])
+    return int(reply.get("n", 0) or 0)
+
+
+class CommandTracker(monitoring.CommandListener):
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        self._pending[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else "-"
+
+    def succeeded(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), None)
+        if collection is None:
+            return
+        self._record(event, collection, _docs_returned(event.reply))
+
+    def failed(self, event):
+        collection = self._pending.pop((event.connection_id, event.request_id), None)
+        if collection is not None:
+            self._record(event, collection, 0)
+
+    def _record(self, event, collection: str, docs: int):
+        duration_ms = event.duration_micros / 1000
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(duration_ms / 1000)
+        queries = _current.get()
+        if queries is not None:
+            queries.add(event.command_name, collection, duration_ms, docs)
+        if duration_ms >= SLOW_QUERY_MS:
+            origin = f"{queries.method} {queries.path}" if queries else "tâche de fond"
+            logger.warning(f"🐢 Commande lente {event.command_name} {collection}: {duration_ms:.0f}ms, {docs} documents ({origin})")
+
+
+class QueryTrackingMiddleware:
+    """Middleware ASGI: ouvre le suivi de la requête et ajoute l'en-tête Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope["method"], scope["path"])
+        token = _current.set(queries)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", queries.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if queries.count > MAX_QUERIES_PER_REQUEST:
+                route = getattr(scope.get("route"), "path", scope["path"])
+                repeated = ", ".join(f"{name} x{count}" for name, count in queries.by_command.most_common(3))
+                logger.warning(f"🔁 {queries.method} {route}: {queries.count} requêtes MongoDB ({queries.duration_ms:.0f}ms) - {repeated}")
@@ -0,0 +1,45 @@
+"""
+Rails précalculés de la page d'accueil (les plus regardés, tendances...)
+Chaque rail est un document de la collection `rails`, recalculé par une tâche de fond
+et servi depuis un cache mémoire par worker
+"""
+from datetime import datetime, timezone
+from typing import List, Sequence, Tuple
+
+from cache import TTLCache
+
+RAIL_CACHE_SECONDS = 60
+
+_rails_cache = TTLCache("rails", RAIL_CACHE_SECONDS)
+
+
+async def save_rail(db, name: str, collection: str, ranked: Sequence[Tuple[str, float]], score_field: str, size: int) -> List[dict]:
+    """
+    Mémorise un rail à partir d'un classement (id, score) déjà trié
+    Les titres masqués ou supprimés sont ignorés: prévoir une marge dans `ranked`
+    """
+    docs = {}
+    if ranked:
+        async for doc in db[collection].find(
+            {"id": {"$in": [content_id for content_id, _ in ranked]}, "available": {"$ne": False}},
+            {"_id": 0}
+        ):
+            docs[doc["id"]] = doc
+    items = [{**docs[content_id], score_field: score} for content_id, score in ranked if content_id in docs][:size]
+
+    await db.rails.replace_one(
+        {"_id": name},
+        {"items": items, "computed_at": datetime.now(timezone.utc).isoformat()},
+        upsert=True
+    )
+    return items
+
+
+async def get_rail(db, name: str, limit: int = 10) -> List[dict]:
+    """Lecture d'un rail précalculé (cache mémoire de RAIL_CACHE_SECONDS par worker)"""
+    async def load():
+        rail = await db.rails.find_one({"_id": name})
+        return rail["items"] if rail else []
+
+    items = await _rails_cache.get(name, load)
+    return items[:limit]
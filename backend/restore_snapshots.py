@@ -0,0 +1,56 @@
+"""
+Script pour restaurer la base de données depuis les snapshots incrémentaux
+Rejoue la chaîne complète (snapshot complet + incrémentaux) puis reconstruit les index
+et les collections dérivées (personnes; statistiques utilisateur recalculées à la première lecture)
+"""
+import argparse
+import asyncio
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Charger les variables d'environnement
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from snapshots import SNAPSHOT_DIR, list_snapshots, resolve_chain, restore_chain
+
+async def main():
+    parser = argparse.ArgumentParser(description="Restauration depuis les snapshots")
+    parser.add_argument("--snapshot", help="Snapshot cible (par défaut: le plus récent)")
+    parser.add_argument("--dir", default=str(SNAPSHOT_DIR), help="Dossier des snapshots")
+    parser.add_argument("--db", default=os.environ.get("DB_NAME", "streaming_db"), help="Base de destination")
+    parser.add_argument("--drop", action="store_true", help="Vider les collections avant la restauration")
+    parser.add_argument("--concurrency", type=int, default=4, help="Lots écrits en parallèle par collection")
+    parser.add_argument("--list", action="store_true", help="Lister les snapshots disponibles")
+    args = parser.parse_args()
+    snapshot_dir = Path(args.dir)
+
+    if args.list:
+        for manifest in list_snapshots(snapshot_dir):
+            total = sum(stats["documents"] for stats in manifest["collections"].values())
+            print(f"{manifest['id']}  {manifest['type']:<11}  {total} documents")
+        return
+
+    chain = resolve_chain(args.snapshot, snapshot_dir)
+    print(f"♻️ Restauration de {len(chain)} snapshot(s) vers la base {args.db}...")
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    try:
+        restored = await restore_chain(
+            client[args.db],
+            target=chain[-1]["id"],
+            drop=args.drop,
+            snapshot_dir=snapshot_dir,
+            concurrency=args.concurrency
+        )
+    finally:
+        client.close()
+
+    for name, count in sorted(restored.items()):
+        print(f"  {name}: {count} documents")
+    print("✅ Restauration terminée")
+
+if __name__ == "__main__":
+    asyncio.run(main())
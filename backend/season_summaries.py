@@ -0,0 +1,106 @@
+"""
+Résumés de saisons matérialisés sur les documents de séries
+Chaque série porte un tableau `seasons` (nombre d'épisodes, épisodes disponibles, dates de
+première/dernière diffusion, vignette du premier épisode) recalculé à chaque écriture d'épisode:
+la page d'une série et les listes d'administration n'ont plus à lire la collection episodes.
+Les recalculs concurrents sont ordonnés par une révision (episodes_rev): un résumé calculé
+avant une écriture plus récente ne peut jamais écraser celui calculé après
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, List
+
+from pymongo import UpdateOne, ReturnDocument
+
+from background_jobs import acquire_lease, release_lease
+from batch_processing import process_cursor
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_LEASE_SECONDS = 3600
+
+
+def _summary_pipeline(series_id: str) -> List[dict]:
+    """Un groupe par saison sur l'index (series_id, episode_order), déjà trié"""
+    return [
+        {"$match": {"series_id": series_id}},
+        {"$sort": {"episode_order": 1}},
+        {"$group": {
+            "_id": "$season_number",
+            "episode_count": {"$sum": 1},
+            # Un épisode sans champ "available" est considéré disponible
+            "available_count": {"$sum": {"$cond": [{"$eq": ["$available", False]}, 0, 1]}},
+            "first_air_date": {"$min": "$air_date"},
+            "last_air_date": {"$max": "$air_date"},
+            "first_episode_id": {"$first": "$id"},
+            "still_url": {"$first": "$still_url"}
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {
+            "_id": 0,
+            "season_number": "$_id",
+            "episode_count": 1,
+            "available_count": 1,
+            "first_air_date": 1,
+            "last_air_date": 1,
+            "first_episode_id": 1,
+            "still_url": 1
+        }}
+    ]
+
+
+async def compute_season_summaries(db, series_id: str) -> List[dict]:
+    return await db.episodes.aggregate(_summary_pipeline(series_id)).to_list(None)
+
+
+async def refresh_season_summary(db, series_id: str):
+    """
+    Recalcule les saisons d'une série après une écriture d'épisode
+    1. réserve une révision, 2. agrège les épisodes, 3. n'écrit que si aucune révision
+    plus récente n'a déjà été écrite (la dernière écriture d'épisode gagne toujours)
+    """
+    series = await db.series.find_one_and_update(
+        {"id": series_id},
+        {"$inc": {"episodes_rev": 1}},
+        projection={"_id": 0, "episodes_rev": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if series is None:
+        return
+    rev = series["episodes_rev"]
+
+    seasons = await compute_season_summaries(db, series_id)
+    await db.series.update_one(
+        {"id": series_id, "$or": [{"seasons_rev": {"$lt": rev}}, {"seasons_rev": {"$exists": False}}]},
+        {"$set": {"seasons": seasons, "seasons_rev": rev, "updated_at": datetime.now(timezone.utc).isoformat()}}
+    )
+
+
+async def refresh_season_summaries(db, series_ids: Iterable[str]):
+    for series_id in set(series_ids):
+        await refresh_season_summary(db, series_id)
+
+
+async def backfill_season_summaries(db) -> dict:
+    """Calcule les résumés des séries créées avant leur introduction (un seul worker)"""
+    if not await acquire_lease(db, "season_summaries_backfill", BACKFILL_LEASE_SECONDS):
+        return {}
+
+    async def summarize(series: dict):
+        seasons = await compute_season_summaries(db, series["id"])
+        # Ne pas écraser un résumé écrit entre-temps par une écriture d'épisode
+        return UpdateOne(
+            {"id": series["id"], "seasons": {"$exists": False}},
+            # updated_at: relevé par les snapshots incrémentaux et le journal du catalogue
+            {"$set": {"seasons": seasons, "seasons_rev": 0, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        )
+
+    try:
+        return await process_cursor(
+            db.series.find({"seasons": {"$exists": False}}, {"_id": 0, "id": 1, "title": 1}),
+            summarize,
+            db.series,
+            "📺 Résumés de saisons"
+        )
+    finally:
+        await release_lease(db, "season_summaries_backfill")
@@ -1,42 +1,85 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
+import asyncio
+import re
+import json
+import time
 from datetime import datetime, timezone, timedelta
 import httpx
 import jwt
 from passlib.context import CryptContext
-import subprocess
-import shutil
-from discord_service import update_discord_stats
+from pymongo import UpdateOne, ReturnDocument
+from prometheus_client import CONTENT_TYPE_LATEST
+from log_config import setup_logging, stop_logging, items_logger, RequestLogMiddleware
+from metrics import MetricsMiddleware, PoolCheckoutListener, record_tmdb_call, render_metrics
+from query_monitoring import CommandTracker, QueryTrackingMiddleware
+from profiler import ProfilerMiddleware, profile as profile_worker
+from loop_monitor import monitor_event_loop
+from discord_service import update_discord_stats, discord_publisher, init_db as init_discord_db
+from db_export import stream_database_export, EXPORT_FORMATS
+from snapshots import create_snapshot, list_snapshots, record_deletions, normalize_updated_at, ensure_indexes as ensure_snapshot_indexes
+from batch_processing import process_cursor
+from catalog_changes import get_catalog_changes, record_catalog_deletions, sequence_changes, CATALOG_COLLECTIONS, CATALOG_SYNC_INTERVAL_SECONDS, ensure_indexes as ensure_catalog_changes_indexes
+from user_stats import get_user_stats_doc, format_last_series, ensure_indexes as ensure_user_stats_indexes
+from background_jobs import run_periodic, start_background_task, stop_background_tasks, worker_id
+from continue_watching import get_continue_watching, get_next_episode, episode_order, backfill_episode_order, ensure_indexes as ensure_continue_watching_indexes
+from rails import get_rail
+from season_summaries import refresh_season_summary, refresh_season_summaries, backfill_season_summaries
+from people import index_title_people, remove_title_people, search_people, get_filmography, ensure_indexes as ensure_people_indexes
+from personalized_rails import get_personalized_rails
+from similarity import get_similar, similarity_store, build_all_indexes as build_similarity_indexes, ensure_indexes as ensure_similarity_indexes, SIMILARITY_INTERVAL_SECONDS
+from trending import compute_trending, TRENDING_INTERVAL_SECONDS
+from view_counters import view_buffer, record_user_view, rollup_views, ROLLUP_INTERVAL_SECONDS, init_db as init_view_counters_db, ensure_indexes as ensure_view_counter_indexes
+from warmup import readiness, warm_up_before_serving, open_connection_pool
+from watch_progress import progress_buffer, record_progress, init_db as init_progress_db, ensure_indexes as ensure_progress_indexes
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Logs en JSON via une file: l'écriture se fait dans un thread dédié, hors de la boucle asyncio
+setup_logging()
+
 # MongoDB connection avec pool de connexions optimisé
 mongo_url = os.environ['MONGO_URL']
+MONGO_MIN_POOL_SIZE = 10
 client = AsyncIOMotorClient(
     mongo_url,
     maxPoolSize=100,  # 100 connexions max dans le pool
-    minPoolSize=10,   # 10 connexions toujours prêtes
+    minPoolSize=MONGO_MIN_POOL_SIZE,   # 10 connexions toujours prêtes (ouvertes dès le préchauffage)
     maxIdleTimeMS=30000,  # Fermer les connexions inactives après 30s
     connectTimeoutMS=5000,  # Timeout de connexion 5s
-    serverSelectionTimeoutMS=5000  # Timeout de sélection serveur 5s
+    serverSelectionTimeoutMS=5000,  # Timeout de sélection serveur 5s
+    event_listeners=[PoolCheckoutListener(), CommandTracker()]  # Attente du pool et commandes par requête
 )
 db = client[os.environ['DB_NAME']]
 
+# Le publieur Discord réutilise le même pool de connexions
+init_discord_db(db)
+init_progress_db(db)
+init_view_counters_db(db)
+
+# Snapshots incrémentaux (0 = désactivés)
+SNAPSHOT_INTERVAL_HOURS = float(os.environ.get('SNAPSHOT_INTERVAL_HOURS', '24'))
+
 # TMDB Configuration
 TMDB_API_KEY = os.environ.get('TMDB_API_KEY', '')
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+# Surchargeable pour pointer vers un faux serveur local (benchmarks/fake_upstreams.py)
+TMDB_BASE_URL = os.environ.get('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
+TMDB_MAX_RETRIES = 3  # Réponses 429: nouvel essai après le délai Retry-After
+TMDB_MAX_RETRY_WAIT_SECONDS = 10
 TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/original"
+TMDB_REQUESTS_PER_SECOND = float(os.environ.get('TMDB_REQUESTS_PER_SECOND', '4'))  # Quota TMDB: 40 requêtes / 10 secondes
 
 # JWT Configuration
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
@@ -47,8 +90,15 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarrage (index, tâches de fond, préchauffage) et arrêt propre du worker"""
+    await start_background_jobs()
+    yield
+    await shutdown_db_client()
+
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # ===== Auth Models =====
@@ -88,11 +138,12 @@ class UserResponse(BaseModel):
     created_at: Optional[str] = None
 
 # ===== Auth Functions =====
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt coûte des dizaines de ms de CPU: calculé hors de la boucle asyncio
+async def hash_password(password: str) -> str:
+    return await asyncio.to_thread(pwd_context.hash, password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -104,8 +155,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+def decode_user_id(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -115,6 +165,14 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expiré")
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide")
+    return user_id
+
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    """Authentification sans lecture en base, pour les routes à fort trafic (battements du lecteur)"""
+    return decode_user_id(credentials.credentials)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    user_id = decode_user_id(credentials.credentials)
     
     user = await db.users.find_one({"id": user_id}, {"_id": 0})
     if user is None:
@@ -163,13 +221,14 @@ async def register(user_data: UserCreate):
     user = User(
         email=user_data.email,
         username=user_data.username,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password(user_data.password),
         role=user_role,
         subscription="gratuit"
     )
     
     doc = user.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_at'] = doc['created_at']
     await db.users.insert_one(doc)
     
     # Create token with user info
@@ -201,7 +260,7 @@ async def login(credentials: UserLogin):
     if not user:
         raise HTTPException(status_code=401, detail="Email ou mot de passe incorrect")
     
-    if not verify_password(credentials.password, user['password_hash']):
+    if not await verify_password(credentials.password, user['password_hash']):
         raise HTTPException(status_code=401, detail="Email ou mot de passe incorrect")
     
     # Vérifier si l'utilisateur a la 2FA activée
@@ -263,7 +322,7 @@ async def update_username(username: str, current_user: User = Depends(get_curren
     if existing:
         raise HTTPException(status_code=400, detail="Ce pseudo est déjà pris")
     
-    result = await db.users.update_one({"id": current_user.id}, {"$set": {"username": username}})
+    result = await db.users.update_one({"id": current_user.id}, {"$set": {"username": username, "updated_at": datetime.now(timezone.utc).isoformat()}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     
@@ -285,6 +344,7 @@ class Movie(BaseModel):
     duration: Optional[int] = None
     rating: Optional[float] = None
     director: Optional[str] = None
+    director_tmdb_id: Optional[int] = None
     director_photo: Optional[str] = None
     cast: List[dict] = []
     available: Optional[bool] = True  # Disponibilité du film
@@ -303,6 +363,7 @@ class MovieCreate(BaseModel):
     duration: Optional[int] = None
     rating: Optional[float] = None
     director: Optional[str] = None
+    director_tmdb_id: Optional[int] = None
     director_photo: Optional[str] = None
     cast: List[dict] = []
 
@@ -317,6 +378,15 @@ class MovieUpdate(BaseModel):
     duration: Optional[int] = None
     rating: Optional[float] = None
 
+class SeasonSummary(BaseModel):
+    season_number: int
+    episode_count: int = 0
+    available_count: int = 0
+    first_air_date: Optional[str] = None
+    last_air_date: Optional[str] = None
+    first_episode_id: Optional[str] = None
+    still_url: Optional[str] = None
+
 class Series(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -330,7 +400,9 @@ class Series(BaseModel):
     release_year: Optional[int] = None
     rating: Optional[float] = None
     total_seasons: Optional[int] = None
+    seasons: List[SeasonSummary] = []  # Résumés maintenus à chaque écriture d'épisode
     creator: Optional[str] = None
+    creator_tmdb_id: Optional[int] = None
     creator_photo: Optional[str] = None
     cast: List[dict] = []
     available: Optional[bool] = True  # Disponibilité de la série
@@ -348,6 +420,7 @@ class SeriesCreate(BaseModel):
     rating: Optional[float] = None
     total_seasons: Optional[int] = None
     creator: Optional[str] = None
+    creator_tmdb_id: Optional[int] = None
     creator_photo: Optional[str] = None
     cast: List[dict] = []
 
@@ -397,6 +470,30 @@ class EpisodeUpdate(BaseModel):
     duration: Optional[int] = None
     air_date: Optional[str] = None
 
+class VideoURLHostPatch(BaseModel):
+    old_host: str
+    new_host: str
+
+class BulkCatalogFilter(BaseModel):
+    search: Optional[str] = None
+    genre: Optional[str] = None  # Films et séries uniquement
+    available: Optional[bool] = None
+    series_id: Optional[str] = None  # Épisodes uniquement
+    season_number: Optional[int] = None  # Épisodes uniquement
+
+class BulkCatalogPatch(BaseModel):
+    available: Optional[bool] = None
+    genres: Optional[List[str]] = None  # Remplace la liste des genres
+    add_genres: List[str] = []
+    remove_genres: List[str] = []
+    video_url_host: Optional[VideoURLHostPatch] = None
+
+class BulkCatalogUpdate(BaseModel):
+    collection: str  # movies, series, episodes
+    ids: Optional[List[str]] = None
+    filter: Optional[BulkCatalogFilter] = None
+    patch: BulkCatalogPatch
+
 class TMDBImportRequest(BaseModel):
     tmdb_id: int
     video_url: str
@@ -439,120 +536,128 @@ class URLMigrationExecuteResponse(BaseModel):
     message: str
 
 # ===== TMDB Integration =====
+# Client partagé (connexions TLS réutilisées), créé dans le worker au préchauffage ou au premier appel
+_tmdb_client: Optional[httpx.AsyncClient] = None
+
+def get_tmdb_client() -> httpx.AsyncClient:
+    global _tmdb_client
+    if _tmdb_client is None:
+        _tmdb_client = httpx.AsyncClient()
+    return _tmdb_client
+
+async def tmdb_get(endpoint: str, path: str, params: dict) -> httpx.Response:
+    """Appel TMDB mesuré: latence par type d'appel, erreurs par statut ou exception"""
+    for attempt in range(TMDB_MAX_RETRIES + 1):
+        started = time.perf_counter()
+        try:
+            response = await get_tmdb_client().get(f"{TMDB_BASE_URL}{path}", params={"api_key": TMDB_API_KEY, **params})
+        except httpx.HTTPError as e:
+            record_tmdb_call(endpoint, time.perf_counter() - started, type(e).__name__)
+            raise
+        record_tmdb_call(endpoint, time.perf_counter() - started, None if response.status_code == 200 else str(response.status_code))
+        if response.status_code != 429 or attempt == TMDB_MAX_RETRIES:
+            return response
+        # Limite de débit TMDB: attendre le délai indiqué (borné) avant de réessayer
+        try:
+            wait = float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            wait = 1.0
+        logging.warning(f"Limite TMDB atteinte ({endpoint}), nouvel essai dans {wait:.1f}s")
+        await asyncio.sleep(min(max(wait, 0.0), TMDB_MAX_RETRY_WAIT_SECONDS))
+
 async def fetch_tmdb_movie(tmdb_id: int):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/movie/{tmdb_id}",
-            params={"api_key": TMDB_API_KEY, "language": "fr-FR"}
-        )
-        if response.status_code == 200:
-            return response.json()
-        raise HTTPException(status_code=404, detail="Film non trouvé sur TMDB")
+    response = await tmdb_get("movie", f"/movie/{tmdb_id}", {"language": "fr-FR"})
+    if response.status_code == 200:
+        return response.json()
+    raise HTTPException(status_code=404, detail="Film non trouvé sur TMDB")
 
 async def fetch_tmdb_logo(tmdb_id: int, media_type: str = "movie"):
     """Récupérer le logo officiel depuis TMDB images"""
-    async with httpx.AsyncClient() as client:
-        endpoint = f"{TMDB_BASE_URL}/{media_type}/{tmdb_id}/images"
-        response = await client.get(
-            endpoint,
-            params={"api_key": TMDB_API_KEY}
-        )
-        if response.status_code == 200:
-            data = response.json()
-            logos = data.get('logos', [])
-            # Prioriser les logos en français, sinon anglais, sinon le premier
-            for logo in logos:
-                if logo.get('iso_639_1') == 'fr':
-                    return f"{TMDB_IMAGE_BASE}{logo['file_path']}"
-            for logo in logos:
-                if logo.get('iso_639_1') == 'en':
-                    return f"{TMDB_IMAGE_BASE}{logo['file_path']}"
-            if logos:
-                return f"{TMDB_IMAGE_BASE}{logos[0]['file_path']}"
-        return None
+    response = await tmdb_get("logo", f"/{media_type}/{tmdb_id}/images", {})
+    if response.status_code == 200:
+        data = response.json()
+        logos = data.get('logos', [])
+        # Prioriser les logos en français, sinon anglais, sinon le premier
+        for logo in logos:
+            if logo.get('iso_639_1') == 'fr':
+                return f"{TMDB_IMAGE_BASE}{logo['file_path']}"
+        for logo in logos:
+            if logo.get('iso_639_1') == 'en':
+                return f"{TMDB_IMAGE_BASE}{logo['file_path']}"
+        if logos:
+            return f"{TMDB_IMAGE_BASE}{logos[0]['file_path']}"
+    return None
 
 async def fetch_tmdb_movie_credits(tmdb_id: int):
     """Récupérer les crédits (réalisateur et acteurs) d'un film depuis TMDB"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/movie/{tmdb_id}/credits",
-            params={"api_key": TMDB_API_KEY, "language": "fr-FR"}
-        )
-        if response.status_code == 200:
-            data = response.json()
-            credits = {
-                "director": None,
-                "director_photo": None,
-                "cast": []
-            }
+    response = await tmdb_get("movie_credits", f"/movie/{tmdb_id}/credits", {"language": "fr-FR"})
+    if response.status_code == 200:
+        data = response.json()
+        credits = {
+            "director": None,
+            "director_tmdb_id": None,
+            "director_photo": None,
+            "cast": []
+        }
             
-            # Récupérer le réalisateur
-            crew = data.get('crew', [])
-            for member in crew:
-                if member.get('job') == 'Director':
-                    credits['director'] = member.get('name')
-                    if member.get('profile_path'):
-                        credits['director_photo'] = f"https://image.tmdb.org/t/p/w185{member['profile_path']}"
-                    break
+        # Récupérer le réalisateur
+        crew = data.get('crew', [])
+        for member in crew:
+            if member.get('job') == 'Director':
+                credits['director'] = member.get('name')
+                credits['director_tmdb_id'] = member.get('id')
+                if member.get('profile_path'):
+                    credits['director_photo'] = f"https://image.tmdb.org/t/p/w185{member['profile_path']}"
+                break
             
-            # Récupérer les acteurs principaux (top 6)
-            cast = data.get('cast', [])
-            for actor in cast[:6]:
-                credits['cast'].append({
-                    'name': actor.get('name', ''),
-                    'character': actor.get('character', ''),
-                    'photo': f"https://image.tmdb.org/t/p/w185{actor['profile_path']}" if actor.get('profile_path') else None
-                })
+        # Récupérer les acteurs principaux (top 6)
+        cast = data.get('cast', [])
+        for actor in cast[:6]:
+            credits['cast'].append({
+                'tmdb_id': actor.get('id'),
+                'name': actor.get('name', ''),
+                'character': actor.get('character', ''),
+                'photo': f"https://image.tmdb.org/t/p/w185{actor['profile_path']}" if actor.get('profile_path') else None
+            })
             
-            return credits
-        return {"director": None, "director_photo": None, "cast": []}
+        return credits
+    return {"director": None, "director_tmdb_id": None, "director_photo": None, "cast": []}
 
 async def fetch_tmdb_series(tmdb_id: int):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/tv/{tmdb_id}",
-            params={"api_key": TMDB_API_KEY, "language": "fr-FR"}
-        )
-        if response.status_code == 200:
-            return response.json()
-        raise HTTPException(status_code=404, detail="Série non trouvée sur TMDB")
+    response = await tmdb_get("series", f"/tv/{tmdb_id}", {"language": "fr-FR"})
+    if response.status_code == 200:
+        return response.json()
+    raise HTTPException(status_code=404, detail="Série non trouvée sur TMDB")
 
 async def fetch_tmdb_series_credits(tmdb_id: int):
     """Récupérer les crédits (créateur et acteurs) d'une série depuis TMDB"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/tv/{tmdb_id}/credits",
-            params={"api_key": TMDB_API_KEY, "language": "fr-FR"}
-        )
-        if response.status_code == 200:
-            data = response.json()
-            credits = {
-                "creator": None,
-                "creator_photo": None,
-                "cast": []
-            }
+    response = await tmdb_get("series_credits", f"/tv/{tmdb_id}/credits", {"language": "fr-FR"})
+    if response.status_code == 200:
+        data = response.json()
+        credits = {
+            "creator": None,
+            "creator_photo": None,
+            "cast": []
+        }
             
-            # Récupérer les acteurs principaux (top 6)
-            cast = data.get('cast', [])
-            for actor in cast[:6]:
-                credits['cast'].append({
-                    'name': actor.get('name', ''),
-                    'character': actor.get('character', ''),
-                    'photo': f"https://image.tmdb.org/t/p/w185{actor['profile_path']}" if actor.get('profile_path') else None
-                })
+        # Récupérer les acteurs principaux (top 6)
+        cast = data.get('cast', [])
+        for actor in cast[:6]:
+            credits['cast'].append({
+                'tmdb_id': actor.get('id'),
+                'name': actor.get('name', ''),
+                'character': actor.get('character', ''),
+                'photo': f"https://image.tmdb.org/t/p/w185{actor['profile_path']}" if actor.get('profile_path') else None
+            })
             
-            return credits
-        return {"creator": None, "creator_photo": None, "cast": []}
+        return credits
+    return {"creator": None, "creator_photo": None, "cast": []}
 
 async def fetch_tmdb_episode(series_id: int, season: int, episode: int):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{TMDB_BASE_URL}/tv/{series_id}/season/{season}/episode/{episode}",
-            params={"api_key": TMDB_API_KEY, "language": "fr-FR"}
-        )
-        if response.status_code == 200:
-            return response.json()
-        raise HTTPException(status_code=404, detail="Épisode non trouvé sur TMDB")
+    response = await tmdb_get("episode", f"/tv/{series_id}/season/{season}/episode/{episode}", {"language": "fr-FR"})
+    if response.status_code == 200:
+        return response.json()
+    raise HTTPException(status_code=404, detail="Épisode non trouvé sur TMDB")
 
 # ===== Movies Routes =====
 @api_router.get("/movies")
@@ -609,6 +714,7 @@ async def create_movie(movie: MovieCreate, background_tasks: BackgroundTasks, cu
     movie_obj = Movie(**movie.model_dump())
     doc = movie_obj.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_at'] = doc['created_at']
     await db.movies.insert_one(doc)
     
     # Ajouter aux films récents
@@ -619,11 +725,18 @@ async def create_movie(movie: MovieCreate, background_tasks: BackgroundTasks, cu
     
     return movie_obj
 
+@api_router.get("/movies/{movie_id}/similar")
+async def get_similar_movies(movie_id: str, limit: int = 12):
+    """Films similaires (genres, acteurs, réalisateur), servis depuis l'index en mémoire"""
+    movies = await get_similar(db, "movie", movie_id, max(1, min(limit, 20)))
+    return {"success": True, "movies": movies, "count": len(movies)}
+
 @api_router.put("/movies/{movie_id}", response_model=Movie)
 async def update_movie(movie_id: str, movie_update: MovieUpdate, current_admin: User = Depends(get_current_admin)):
     update_data = {k: v for k, v in movie_update.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="Aucune donnée à mettre à jour")
+    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     result = await db.movies.update_one({"id": movie_id}, {"$set": update_data})
     if result.matched_count == 0:
@@ -633,9 +746,12 @@ async def update_movie(movie_id: str, movie_update: MovieUpdate, current_admin:
 
 @api_router.delete("/movies/{movie_id}")
 async def delete_movie(movie_id: str, background_tasks: BackgroundTasks, current_super_user: User = Depends(get_current_super_user)):
-    result = await db.movies.delete_one({"id": movie_id})
-    if result.deleted_count == 0:
+    deleted = await db.movies.find_one_and_delete({"id": movie_id}, projection={"_id": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Film non trouvé")
+    await record_deletions(db, "movies", [deleted["_id"]])
+    await record_catalog_deletions(db, "movies", [movie_id])
+    await remove_title_people(db, "movie", movie_id)
     
     # Mettre à jour les statistiques Discord en arrière-plan
     background_tasks.add_task(update_discord_stats)
@@ -645,17 +761,19 @@ async def delete_movie(movie_id: str, background_tasks: BackgroundTasks, current
 @api_router.patch("/movies/{movie_id}/availability")
 async def toggle_movie_availability(movie_id: str, current_admin: User = Depends(get_current_admin)):
     """Toggle la disponibilité d'un film"""
-    movie = await db.movies.find_one({"id": movie_id})
-    if not movie:
-        raise HTTPException(status_code=404, detail="Film non trouvé")
-    
-    # Toggle la disponibilité (par défaut true si le champ n'existe pas)
-    new_availability = not movie.get("available", True)
-    
-    await db.movies.update_one(
+    # Toggle la disponibilité en un seul aller-retour (par défaut true si le champ n'existe pas)
+    movie = await db.movies.find_one_and_update(
         {"id": movie_id},
-        {"$set": {"available": new_availability}}
+        [{"$set": {
+            "available": {"$not": [{"$ifNull": ["$available", True]}]},
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}],
+        projection={"_id": 0, "available": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if not movie:
+        raise HTTPException(status_code=404, detail="Film non trouvé")
+    new_availability = movie["available"]
     
     return {
         "message": f"Film {'rendu disponible' if new_availability else 'masqué'}",
@@ -685,6 +803,7 @@ async def import_movie_from_tmdb(request: TMDBImportRequest, background_tasks: B
         duration=tmdb_data.get('runtime'),
         rating=round(tmdb_data.get('vote_average', 0), 1),
         director=credits.get('director'),
+        director_tmdb_id=credits.get('director_tmdb_id'),
         director_photo=credits.get('director_photo'),
         cast=credits.get('cast', [])
     )
@@ -693,7 +812,9 @@ async def import_movie_from_tmdb(request: TMDBImportRequest, background_tasks: B
     movie_obj = Movie(**movie_data.model_dump())
     doc = movie_obj.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_at'] = doc['created_at']
     await db.movies.insert_one(doc)
+    await index_title_people(db, "movie", movie_obj.id, doc)
     
     # Ajouter aux films récents
     await add_to_recent("movies", movie_obj.id)
@@ -758,6 +879,7 @@ async def create_series(series: SeriesCreate, background_tasks: BackgroundTasks,
     series_obj = Series(**series.model_dump())
     doc = series_obj.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_at'] = doc['created_at']
     await db.series.insert_one(doc)
     
     # Ajouter aux séries récentes
@@ -768,11 +890,18 @@ async def create_series(series: SeriesCreate, background_tasks: BackgroundTasks,
     
     return series_obj
 
+@api_router.get("/series/{series_id}/similar")
+async def get_similar_series(series_id: str, limit: int = 12):
+    """Séries similaires (genres, acteurs, créateur), servies depuis l'index en mémoire"""
+    series = await get_similar(db, "series", series_id, max(1, min(limit, 20)))
+    return {"success": True, "series": series, "count": len(series)}
+
 @api_router.put("/series/{series_id}", response_model=Series)
 async def update_series(series_id: str, series_update: SeriesUpdate, current_admin: User = Depends(get_current_admin)):
     update_data = {k: v for k, v in series_update.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="Aucune donnée à mettre à jour")
+    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     result = await db.series.update_one({"id": series_id}, {"$set": update_data})
     if result.matched_count == 0:
@@ -782,10 +911,17 @@ async def update_series(series_id: str, series_update: SeriesUpdate, current_adm
 
 @api_router.delete("/series/{series_id}")
 async def delete_series(series_id: str, background_tasks: BackgroundTasks, current_super_user: User = Depends(get_current_super_user)):
-    result = await db.series.delete_one({"id": series_id})
-    if result.deleted_count == 0:
+    deleted = await db.series.find_one_and_delete({"id": series_id}, projection={"_id": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Série non trouvée")
+    await record_deletions(db, "series", [deleted["_id"]])
+    await record_catalog_deletions(db, "series", [series_id])
+    await remove_title_people(db, "series", series_id)
+    
+    episodes = await db.episodes.find({"series_id": series_id}, {"_id": 1, "id": 1}).to_list(None)
     await db.episodes.delete_many({"series_id": series_id})
+    await record_deletions(db, "episodes", [episode["_id"] for episode in episodes])
+    await record_catalog_deletions(db, "episodes", [episode["id"] for episode in episodes])
     
     # Mettre à jour les statistiques Discord en arrière-plan
     background_tasks.add_task(update_discord_stats)
@@ -795,17 +931,19 @@ async def delete_series(series_id: str, background_tasks: BackgroundTasks, curre
 @api_router.patch("/series/{series_id}/availability")
 async def toggle_series_availability(series_id: str, current_admin: User = Depends(get_current_admin)):
     """Toggle la disponibilité d'une série"""
-    series = await db.series.find_one({"id": series_id})
-    if not series:
-        raise HTTPException(status_code=404, detail="Série non trouvée")
-    
-    # Toggle la disponibilité
-    new_availability = not series.get("available", True)
-    
-    await db.series.update_one(
+    # Toggle la disponibilité en un seul aller-retour
+    series = await db.series.find_one_and_update(
         {"id": series_id},
-        {"$set": {"available": new_availability}}
+        [{"$set": {
+            "available": {"$not": [{"$ifNull": ["$available", True]}]},
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}],
+        projection={"_id": 0, "available": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if not series:
+        raise HTTPException(status_code=404, detail="Série non trouvée")
+    new_availability = series["available"]
     
     return {
         "message": f"Série {'rendue disponible' if new_availability else 'masquée'}",
@@ -824,9 +962,11 @@ async def import_series_from_tmdb(request: TMDBImportRequest, background_tasks:
     
     # Récupérer le créateur depuis les données de la série
     creator = None
+    creator_tmdb_id = None
     creator_photo = None
     if tmdb_data.get('created_by') and len(tmdb_data['created_by']) > 0:
         creator = tmdb_data['created_by'][0].get('name')
+        creator_tmdb_id = tmdb_data['created_by'][0].get('id')
         if tmdb_data['created_by'][0].get('profile_path'):
             creator_photo = f"https://image.tmdb.org/t/p/w185{tmdb_data['created_by'][0]['profile_path']}"
     
@@ -842,6 +982,7 @@ async def import_series_from_tmdb(request: TMDBImportRequest, background_tasks:
         rating=round(tmdb_data.get('vote_average', 0), 1),
         total_seasons=tmdb_data.get('number_of_seasons'),
         creator=creator,
+        creator_tmdb_id=creator_tmdb_id,
         creator_photo=creator_photo,
         cast=credits.get('cast', [])
     )
@@ -850,7 +991,9 @@ async def import_series_from_tmdb(request: TMDBImportRequest, background_tasks:
     series_obj = Series(**series_data.model_dump())
     doc = series_obj.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_at'] = doc['created_at']
     await db.series.insert_one(doc)
+    await index_title_people(db, "series", series_obj.id, doc)
     
     # Ajouter aux séries récentes
     await add_to_recent("series", series_obj.id)
@@ -860,6 +1003,33 @@ async def import_series_from_tmdb(request: TMDBImportRequest, background_tasks:
     
     return series_obj
 
+# ===== Catalog Sync =====
+@api_router.get("/catalog/changes")
+async def get_catalog_changes_route(since: int = 0, epoch: Optional[str] = None, limit: int = 1000, collections: Optional[str] = None):
+    """
+    Modifications du catalogue depuis la séquence `since` (copie locale des clients)
+    Si `reset` est vrai, le client vide sa copie et reprend à since=0
+    """
+    requested = collections.split(",") if collections else None
+    if requested and any(c not in CATALOG_COLLECTIONS for c in requested):
+        raise HTTPException(status_code=400, detail=f"Collection invalide. Doit être: {', '.join(CATALOG_COLLECTIONS)}")
+    return await get_catalog_changes(db, since, epoch, limit, requested)
+
+# ===== People Routes =====
+@api_router.get("/people")
+async def get_people(search: str, limit: int = 20):
+    """Recherche de personnes (acteurs, réalisateurs, créateurs) par début de nom"""
+    people = await search_people(db, search, max(1, min(limit, 50)))
+    return {"people": people, "count": len(people)}
+
+@api_router.get("/people/{person_id}")
+async def get_person(person_id: int):
+    """Filmographie d'une personne (identifiant TMDB)"""
+    person = await get_filmography(db, person_id)
+    if person is None:
+        raise HTTPException(status_code=404, detail="Personne non trouvée")
+    return person
+
 # ===== Episodes Routes =====
 @api_router.get("/episodes")
 async def get_episodes(
@@ -872,7 +1042,7 @@ async def get_episodes(
     filter_query = {}
     if series_id:
         filter_query["series_id"] = series_id
-    if season:
+    if season is not None:
         filter_query["season_number"] = season
     
     # Compter le total
@@ -917,7 +1087,10 @@ async def create_episode(episode: EpisodeCreate, background_tasks: BackgroundTas
     episode_obj = Episode(**episode.model_dump())
     doc = episode_obj.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_at'] = doc['created_at']
+    doc['episode_order'] = episode_order(doc['season_number'], doc['episode_number'])
     await db.episodes.insert_one(doc)
+    await refresh_season_summary(db, doc['series_id'])
     
     # Mettre à jour les statistiques Discord en arrière-plan
     background_tasks.add_task(update_discord_stats)
@@ -929,18 +1102,27 @@ async def update_episode(episode_id: str, episode_update: EpisodeUpdate, current
     update_data = {k: v for k, v in episode_update.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="Aucune donnée à mettre à jour")
+    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
-    result = await db.episodes.update_one({"id": episode_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    episode = await db.episodes.find_one_and_update(
+        {"id": episode_id},
+        {"$set": update_data},
+        projection={"_id": 0, "series_id": 1}
+    )
+    if not episode:
         raise HTTPException(status_code=404, detail="Épisode non trouvé")
+    await refresh_season_summary(db, episode["series_id"])
     
     return await get_episode(episode_id)
 
 @api_router.delete("/episodes/{episode_id}")
 async def delete_episode(episode_id: str, background_tasks: BackgroundTasks, current_super_user: User = Depends(get_current_super_user)):
-    result = await db.episodes.delete_one({"id": episode_id})
-    if result.deleted_count == 0:
+    deleted = await db.episodes.find_one_and_delete({"id": episode_id}, projection={"_id": 1, "series_id": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Épisode non trouvé")
+    await record_deletions(db, "episodes", [deleted["_id"]])
+    await record_catalog_deletions(db, "episodes", [episode_id])
+    await refresh_season_summary(db, deleted["series_id"])
     
     # Mettre à jour les statistiques Discord en arrière-plan
     background_tasks.add_task(update_discord_stats)
@@ -950,17 +1132,20 @@ async def delete_episode(episode_id: str, background_tasks: BackgroundTasks, cur
 @api_router.patch("/episodes/{episode_id}/availability")
 async def toggle_episode_availability(episode_id: str, current_admin: User = Depends(get_current_admin)):
     """Toggle la disponibilité d'un épisode"""
-    episode = await db.episodes.find_one({"id": episode_id})
-    if not episode:
-        raise HTTPException(status_code=404, detail="Épisode non trouvé")
-    
-    # Toggle la disponibilité
-    new_availability = not episode.get("available", True)
-    
-    await db.episodes.update_one(
+    # Toggle la disponibilité en un seul aller-retour
+    episode = await db.episodes.find_one_and_update(
         {"id": episode_id},
-        {"$set": {"available": new_availability}}
+        [{"$set": {
+            "available": {"$not": [{"$ifNull": ["$available", True]}]},
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}],
+        projection={"_id": 0, "available": 1, "series_id": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if not episode:
+        raise HTTPException(status_code=404, detail="Épisode non trouvé")
+    new_availability = episode["available"]
+    await refresh_season_summary(db, episode["series_id"])
     
     return {
         "message": f"Épisode {'rendu disponible' if new_availability else 'masqué'}",
@@ -971,30 +1156,43 @@ async def toggle_episode_availability(episode_id: str, current_admin: User = Dep
 async def toggle_season_availability(series_id: str, season_number: int, current_admin: User = Depends(get_current_admin)):
     """Toggle la disponibilité d'une saison entière"""
     # Vérifier que la série existe
-    series = await db.series.find_one({"id": series_id})
+    series = await db.series.find_one({"id": series_id}, {"_id": 1})
     if not series:
         raise HTTPException(status_code=404, detail="Série non trouvée")
     
-    # Récupérer tous les épisodes de cette saison
-    episodes = await db.episodes.find({"series_id": series_id, "season_number": season_number}).to_list(None)
-    if not episodes:
+    # Lire uniquement le premier épisode de la saison
+    first_episode = await db.episodes.find_one(
+        {"series_id": series_id, "season_number": season_number},
+        {"_id": 0, "available": 1},
+        sort=[("episode_number", 1)]
+    )
+    if not first_episode:
         raise HTTPException(status_code=404, detail="Aucun épisode trouvé pour cette saison")
     
     # Toggle la disponibilité (basé sur le premier épisode)
-    new_availability = not episodes[0].get("available", True)
+    new_availability = not first_episode.get("available", True)
     
     # Mettre à jour tous les épisodes de la saison
-    await db.episodes.update_many(
+    result = await db.episodes.update_many(
         {"series_id": series_id, "season_number": season_number},
-        {"$set": {"available": new_availability}}
+        {"$set": {"available": new_availability, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    await refresh_season_summary(db, series_id)
     
     return {
         "message": f"Saison {season_number} {'rendue disponible' if new_availability else 'masquée'}",
         "available": new_availability,
-        "episodes_updated": len(episodes)
+        "episodes_updated": result.matched_count
     }
 
+@api_router.get("/episodes/{episode_id}/next")
+async def get_episode_next(episode_id: str):
+    """Épisode suivant (ordre précalculé) avec les URLs à précharger par le lecteur"""
+    result = await get_next_episode(db, episode_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Épisode non trouvé")
+    return result
+
 class EpisodeTMDBImport(BaseModel):
     series_id: str
     tmdb_series_id: int
@@ -1028,13 +1226,130 @@ async def import_episode_from_tmdb(request: EpisodeTMDBImport, background_tasks:
     episode_obj = Episode(**episode_data.model_dump())
     doc = episode_obj.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_at'] = doc['created_at']
+    doc['episode_order'] = episode_order(doc['season_number'], doc['episode_number'])
     await db.episodes.insert_one(doc)
+    await refresh_season_summary(db, doc['series_id'])
     
     # Mettre à jour les statistiques Discord en arrière-plan
     background_tasks.add_task(update_discord_stats)
     
     return episode_obj
 
+# ===== Bulk Catalog Edit =====
+BULK_COLLECTIONS = ("movies", "series", "episodes")
+
+def build_bulk_catalog_query(request: BulkCatalogUpdate) -> dict:
+    """Construit le filtre MongoDB d'une modification groupée (ids et/ou filtre structuré)"""
+    conditions = []
+    if request.ids is not None:
+        conditions.append({"id": {"$in": request.ids}})
+    
+    f = request.filter
+    if f:
+        if f.search:
+            conditions.append({"title": {"$regex": f.search, "$options": "i"}})
+        if f.genre and f.genre != "all":
+            conditions.append({"genres": f.genre})
+        if f.available is not None:
+            # Un contenu sans champ "available" est considéré disponible
+            conditions.append({"available": {"$ne": False}} if f.available else {"available": False})
+        if f.series_id:
+            conditions.append({"series_id": f.series_id})
+        if f.season_number is not None:
+            conditions.append({"season_number": f.season_number})
+    
+    if not conditions:
+        raise HTTPException(status_code=400, detail="Une liste d'ids ou un filtre non vide est requis")
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def build_bulk_catalog_update(collection: str, patch: BulkCatalogPatch) -> List[dict]:
+    """
+    Traduit le patch en pipeline de mise à jour (appliqué par un seul update_many)
+    updated_at ne change que si un champ change: un document déjà dans l'état voulu n'est pas
+    réécrit (modified_count exact, pas d'entrée inutile dans les instantanés et le journal des changements)
+    """
+    stage = {}
+    
+    if patch.available is not None:
+        stage["available"] = patch.available
+    
+    if patch.genres is not None or patch.add_genres or patch.remove_genres:
+        if collection == "episodes":
+            raise HTTPException(status_code=400, detail="Les épisodes n'ont pas de genres")
+        genres = {"$literal": patch.genres} if patch.genres is not None else {"$ifNull": ["$genres", []]}
+        if patch.remove_genres:
+            genres = {"$filter": {"input": genres, "cond": {"$not": [{"$in": ["$$this", {"$literal": patch.remove_genres}]}]}}}
+        if patch.add_genres:
+            # Ajout en fin de liste, sans doublons et sans changer l'ordre existant
+            genres = {"$let": {"vars": {"current": genres}, "in": {"$concatArrays": [
+                "$$current",
+                {"$filter": {"input": {"$literal": patch.add_genres}, "cond": {"$not": [{"$in": ["$$this", "$$current"]}]}}}
+            ]}}}
+        stage["genres"] = genres
+    
+    if patch.video_url_host:
+        if collection == "series":
+            raise HTTPException(status_code=400, detail="Les séries n'ont pas d'URL vidéo")
+        old_host = patch.video_url_host.old_host
+        # $literal: un hôte commençant par "$" serait lu comme un chemin de champ
+        stage["video_url"] = {"$cond": [
+            {"$eq": [{"$indexOfCP": ["$video_url", {"$literal": old_host}]}, 0]},
+            {"$concat": [
+                {"$literal": patch.video_url_host.new_host},
+                {"$substrCP": ["$video_url", len(old_host), {"$strLenCP": "$video_url"}]}
+            ]},
+            "$video_url"
+        ]}
+    
+    if not stage:
+        raise HTTPException(status_code=400, detail="Aucune donnée à mettre à jour")
+    
+    before = {field: f"${field}" for field in stage}
+    unchanged = {"$and": [{"$eq": [f"$_bulk_before.{field}", f"${field}"]} for field in stage]}
+    return [
+        {"$set": {"_bulk_before": before}},
+        {"$set": stage},
+        {"$set": {"updated_at": {"$cond": [unchanged, "$updated_at", datetime.now(timezone.utc).isoformat()]}}},
+        {"$project": {"_bulk_before": 0}}
+    ]
+
+@api_router.post("/admin/catalog/bulk")
+async def bulk_update_catalog(request: BulkCatalogUpdate, current_admin: User = Depends(get_current_admin)):
+    """
+    Modifier en une fois plusieurs films, séries ou épisodes (disponibilité, genres, hôte des URLs vidéo)
+    Une seule requête update_many, quel que soit le nombre de contenus ciblés
+    """
+    if request.collection not in BULK_COLLECTIONS:
+        raise HTTPException(status_code=400, detail=f"Collection invalide. Doit être: {', '.join(BULK_COLLECTIONS)}")
+    
+    query = build_bulk_catalog_query(request)
+    update = build_bulk_catalog_update(request.collection, request.patch)
+    
+    # Si seul l'hôte change, ne cibler que les URLs concernées (compteurs exacts)
+    patch = request.patch
+    if patch.video_url_host and patch.available is None and patch.genres is None and not patch.add_genres and not patch.remove_genres:
+        query = {"$and": [query, {"video_url": {"$regex": f"^{re.escape(patch.video_url_host.old_host)}"}}]}
+    
+    # Les disponibilités d'épisodes alimentent les résumés de saisons des séries touchées.
+    # Séries relevées avant la mise à jour: un filtre sur la disponibilité ne correspond plus ensuite
+    refresh_summaries = request.collection == "episodes" and patch.available is not None
+    series_ids = await db.episodes.distinct("series_id", query) if refresh_summaries else []
+    
+    result = await db[request.collection].update_many(query, update)
+    
+    if refresh_summaries and result.modified_count:
+        await refresh_season_summaries(db, series_ids)
+    
+    logging.info(f"🧺 Modification groupée {request.collection} par {current_admin.email}: {result.matched_count} ciblés, {result.modified_count} modifiés")
+    
+    return {
+        "success": True,
+        "collection": request.collection,
+        "matched_count": result.matched_count,
+        "modified_count": result.modified_count
+    }
+
 # ===== Featured Content =====
 @api_router.get("/featured")
 async def get_featured():
@@ -1216,6 +1531,78 @@ async def get_top_series(limit: int = 10):
         return {"success": False, "series": [], "count": 0}
 
 
+@api_router.get("/most-watched-movies")
+async def get_most_watched_movies(limit: int = 10):
+    """
+    Films les plus regardés sur les 7 derniers jours
+    Rail précalculé par la tâche d'agrégation des vues
+    """
+    try:
+        movies = await get_rail(db, "most_watched_movies", limit)
+        return {"success": True, "movies": movies, "count": len(movies)}
+    except Exception as e:
+        logging.error(f"Erreur get_most_watched_movies: {e}")
+        return {"success": False, "movies": [], "count": 0}
+
+
+@api_router.get("/most-watched-series")
+async def get_most_watched_series(limit: int = 10):
+    """
+    Séries les plus regardées sur les 7 derniers jours
+    Rail précalculé par la tâche d'agrégation des vues
+    """
+    try:
+        series = await get_rail(db, "most_watched_series", limit)
+        return {"success": True, "series": series, "count": len(series)}
+    except Exception as e:
+        logging.error(f"Erreur get_most_watched_series: {e}")
+        return {"success": False, "series": [], "count": 0}
+
+
+@api_router.get("/trending-movies")
+async def get_trending_movies(limit: int = 10):
+    """
+    Films en tendance (vues récentes pondérées par leur âge)
+    Rail précalculé par la tâche des tendances
+    """
+    try:
+        movies = await get_rail(db, "trending_movies", limit)
+        return {"success": True, "movies": movies, "count": len(movies)}
+    except Exception as e:
+        logging.error(f"Erreur get_trending_movies: {e}")
+        return {"success": False, "movies": [], "count": 0}
+
+
+@api_router.get("/trending-series")
+async def get_trending_series(limit: int = 10):
+    """
+    Séries en tendance (vues récentes pondérées par leur âge)
+    Rail précalculé par la tâche des tendances
+    """
+    try:
+        series = await get_rail(db, "trending_series", limit)
+        return {"success": True, "series": series, "count": len(series)}
+    except Exception as e:
+        logging.error(f"Erreur get_trending_series: {e}")
+        return {"success": False, "series": [], "count": 0}
+
+
+class ViewEvent(BaseModel):
+    content_type: str  # "movie" ou "series"
+    content_id: str = Field(max_length=64)
+
+@api_router.post("/views", status_code=status.HTTP_202_ACCEPTED)
+async def record_view_event(event: ViewEvent, user_id: str = Depends(get_current_user_id)):
+    """
+    Début de lecture d'un film ou d'un épisode (compté pour la série), mis en tampon
+    Au plus une vue par utilisateur et par titre sur la fenêtre de déduplication
+    """
+    if event.content_type not in ("movie", "series"):
+        raise HTTPException(status_code=400, detail="Type de contenu invalide (movie ou series)")
+    counted = record_user_view(user_id, event.content_type, event.content_id)
+    return {"status": "accepted", "counted": counted}
+
+
 async def add_to_recent(content_type: str, content_id: str, max_items: int = 10):
     """
     Ajoute un film ou série aux récents
@@ -1253,7 +1640,7 @@ async def add_to_recent(content_type: str, content_id: str, max_items: int = 10)
                 {"$set": {"items": items}}
             )
         
-        logging.info(f"✅ Ajouté {content_id} aux {content_type} récents")
+        items_logger.info(f"✅ Ajouté {content_id} aux {content_type} récents")
     except Exception as e:
         logging.error(f"Erreur add_to_recent: {e}")
 
@@ -1265,11 +1652,11 @@ async def init_recent_content(current_founder: User = Depends(get_current_founde
     """
     try:
         # Récupérer les 10 derniers films (par _id)
-        movies = await db.movies.find({}).sort("_id", -1).limit(10).to_list(10)
+        movies = await db.movies.find({}, {"_id": 0, "id": 1}).sort("_id", -1).limit(10).to_list(10)
         movie_ids = [movie["id"] for movie in movies]
         
         # Récupérer les 10 dernières séries (par _id)
-        series = await db.series.find({}).sort("_id", -1).limit(10).to_list(10)
+        series = await db.series.find({}, {"_id": 0, "id": 1}).sort("_id", -1).limit(10).to_list(10)
         series_ids = [s["id"] for s in series]
         
         # Créer ou remplacer les documents
@@ -1355,7 +1742,7 @@ async def update_user_role(user_id: str, role: str, current_founder: User = Depe
     if role not in allowed_roles:
         raise HTTPException(status_code=400, detail=f"Rôle invalide. Doit être: {', '.join(allowed_roles)}")
     
-    result = await db.users.update_one({"id": user_id}, {"$set": {"role": role}})
+    result = await db.users.update_one({"id": user_id}, {"$set": {"role": role, "updated_at": datetime.now(timezone.utc).isoformat()}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     
@@ -1369,7 +1756,8 @@ async def update_user_subscription(user_id: str, subscription: str, current_supe
     # Enregistrer la date d'attribution de l'abonnement
     update_data = {
         "subscription": subscription,
-        "subscription_date": datetime.now(timezone.utc)
+        "subscription_date": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc).isoformat()
     }
     
     result = await db.users.update_one({"id": user_id}, {"$set": update_data})
@@ -1396,13 +1784,13 @@ async def update_user_password(
         raise HTTPException(status_code=400, detail="Le mot de passe doit contenir au moins 6 caractères")
     
     # Hasher le nouveau mot de passe avec la fonction existante
-    hashed_password = hash_password(new_password)
+    hashed_password = await hash_password(new_password)
     logging.info(f"Mot de passe hashé: {hashed_password[:50]}...")
     
     # Mettre à jour le mot de passe dans le bon champ (password_hash)
     result = await db.users.update_one(
         {"id": user_id}, 
-        {"$set": {"password_hash": hashed_password}}
+        {"$set": {"password_hash": hashed_password, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
     
     logging.info(f"Résultat mise à jour: matched={result.matched_count}, modified={result.modified_count}")
@@ -1440,13 +1828,13 @@ async def force_change_password(
     logging.info(f"✅ Utilisateur trouvé: {user['id']}")
     
     # Hasher le nouveau mot de passe
-    hashed_password = hash_password(new_password)
+    hashed_password = await hash_password(new_password)
     logging.info(f"🔐 Hash généré: {hashed_password[:60]}...")
     
     # Mettre à jour DIRECTEMENT dans MongoDB avec le BON champ: password_hash
     result = await db.users.update_one(
         {"email": email}, 
-        {"$set": {"password_hash": hashed_password}}
+        {"$set": {"password_hash": hashed_password, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
     
     logging.info(f"📝 Résultat MongoDB: matched={result.matched_count}, modified={result.modified_count}")
@@ -1489,6 +1877,8 @@ async def delete_user(
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=500, detail="Échec de la suppression")
+    await record_deletions(db, "users", [user["_id"]])
+    await db.user_stats.delete_one({"user_id": user_id})
     
     logging.info(f"✅ Utilisateur {user['email']} supprimé avec succès")
     
@@ -1499,76 +1889,69 @@ async def delete_user(
 
 # ===== Database Export =====
 @api_router.get("/admin/export-database")
-async def export_database(current_founder: User = Depends(get_current_founder)):
-    """Export complet de la base de données (réservé au fondateur)"""
+async def export_database(format: str = "bson", current_founder: User = Depends(get_current_founder)):
+    """
+    Export complet de la base de données (réservé au fondateur)
+    L'archive est générée en streaming: aucun fichier temporaire, aucun mongodump
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format invalide. Doit être: {', '.join(EXPORT_FORMATS)}")
+    
     try:
-        # Créer un dossier temporaire pour l'export
-        export_dir = Path("/tmp/db_export")
-        if export_dir.exists():
-            shutil.rmtree(export_dir)
-        export_dir.mkdir(parents=True)
-        
-        # Exporter la base avec mongodump
-        db_name = os.environ.get('DB_NAME', 'streaming_db')
-        dump_result = subprocess.run(
-            ['mongodump', '--db', db_name, '--out', str(export_dir)],
-            capture_output=True,
-            text=True
-        )
-        
-        if dump_result.returncode != 0:
-            raise HTTPException(status_code=500, detail=f"Erreur lors de l'export: {dump_result.stderr}")
-        
-        # Créer le fichier README
-        readme_path = export_dir / "README_IMPORT.txt"
-        readme_content = f"""════════════════════════════════════════════════════════════════
-  STREAMING DB - BASE DE DONNÉES COMPLÈTE
-════════════════════════════════════════════════════════════════
-
-Date d'export: {datetime.now(timezone.utc).strftime('%d %B %Y %H:%M UTC')}
-Base de données: {db_name}
-
-✅ CONTENU EXPORTÉ:
-- Films avec genres normalisés
-- Séries avec genres normalisés
-- Épisodes complets
-- Utilisateurs avec rôles corrects
-- Sagas, badges, et configurations
-
-════════════════════════════════════════════════════════════════
-  IMPORT SUR VOTRE SERVEUR
-════════════════════════════════════════════════════════════════
-
-1. Décompressez l'archive:
-   unzip streaming_db_export.zip
-
-2. Importez dans MongoDB:
-   mongorestore --db={db_name} {db_name}/
-
-3. Vérifiez:
-   mongosh
-   use {db_name}
-   show collections
-
-════════════════════════════════════════════════════════════════
-"""
-        readme_path.write_text(readme_content)
-        
-        # Créer l'archive ZIP
-        zip_path = Path("/tmp/streaming_db_export")
-        shutil.make_archive(str(zip_path), 'zip', export_dir)
-        
-        final_zip = Path(f"{zip_path}.zip")
-        
-        # Retourner le fichier
-        return FileResponse(
-            path=str(final_zip),
-            media_type='application/zip',
-            filename=f'streaming_db_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
-        )
-        
+        collection_names = sorted(await db.list_collection_names())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'export: {str(e)}")
+    
+    logging.info(f"📦 Export de la base par {current_founder.email}: {len(collection_names)} collections ({format})")
+    
+    filename = f'streaming_db_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
+    return StreamingResponse(
+        stream_database_export(db, collection_names, fmt=format),
+        media_type='application/zip',
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# ===== Incremental Snapshots =====
+@api_router.get("/admin/snapshots")
+async def get_snapshots(current_founder: User = Depends(get_current_founder)):
+    """Lister les snapshots disponibles (réservé au fondateur)"""
+    manifests = await asyncio.to_thread(list_snapshots)
+    return {
+        "snapshots": [
+            {
+                "id": m["id"],
+                "type": m["type"],
+                "parent": m["parent"],
+                "watermark": m["watermark"],
+                "documents": sum(stats["documents"] for stats in m["collections"].values()),
+                "deletions": m["deletions"]["documents"],
+                "duration_seconds": m["duration_seconds"]
+            }
+            for m in reversed(manifests)
+        ],
+        "interval_hours": SNAPSHOT_INTERVAL_HOURS
+    }
+
+@api_router.post("/admin/snapshots")
+async def trigger_snapshot(full: bool = False, current_founder: User = Depends(get_current_founder)):
+    """
+    Créer un snapshot immédiatement (réservé au fondateur)
+    Incrémental par défaut: seuls les documents modifiés depuis le dernier snapshot sont écrits
+    """
+    try:
+        manifest = await create_snapshot(db, full=full)
+    except Exception as e:
+        logging.error(f"Erreur snapshot: {e}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors du snapshot: {str(e)}")
+    
+    return {
+        "success": True,
+        "id": manifest["id"],
+        "type": manifest["type"],
+        "collections": {name: stats["documents"] for name, stats in manifest["collections"].items()},
+        "deletions": manifest["deletions"]["documents"],
+        "duration_seconds": manifest["duration_seconds"]
+    }
 
 # ===== Settings Management (Fondateur uniquement) =====
 @api_router.get("/admin/settings/series-access")
@@ -1655,26 +2038,30 @@ async def preview_url_migration(
     if not data.old_pattern or not data.new_pattern:
         raise HTTPException(status_code=400, detail="Les patterns ancien et nouveau sont requis")
     
-    # Compter les films affectés
+    url_filter = {"video_url": {"$regex": f"^{data.old_pattern}"}}
+    
+    # Compter les films et épisodes affectés (sans les charger)
+    movies_count = await db.movies.count_documents(url_filter)
+    episodes_count = await db.episodes.count_documents(url_filter)
+    
+    # Échantillon de 3 films et 3 épisodes pour prévisualisation
     movies = await db.movies.find(
-        {"video_url": {"$regex": f"^{data.old_pattern}"}},
+        url_filter,
         {"_id": 0, "id": 1, "title": 1, "video_url": 1}
-    ).to_list(None)
+    ).limit(3).to_list(3)
     
-    # Compter les épisodes affectés
     episodes = await db.episodes.find(
-        {"video_url": {"$regex": f"^{data.old_pattern}"}},
+        url_filter,
         {"_id": 0, "id": 1, "title": 1, "video_url": 1, "season_number": 1, "episode_number": 1}
-    ).to_list(None)
+    ).limit(3).to_list(3)
     
-    # Échantillon de 3 films et 3 épisodes pour prévisualisation
     sample_movies = [
         {
             "title": movie["title"],
             "old_url": movie["video_url"],
             "new_url": movie["video_url"].replace(data.old_pattern, data.new_pattern, 1)
         }
-        for movie in movies[:3]
+        for movie in movies
     ]
     
     sample_episodes = [
@@ -1683,15 +2070,15 @@ async def preview_url_migration(
             "old_url": episode["video_url"],
             "new_url": episode["video_url"].replace(data.old_pattern, data.new_pattern, 1)
         }
-        for episode in episodes[:3]
+        for episode in episodes
     ]
     
-    logging.info(f"👀 Fondateur {current_founder.email} prévisualise migration: {len(movies)} films + {len(episodes)} épisodes")
+    logging.info(f"👀 Fondateur {current_founder.email} prévisualise migration: {movies_count} films + {episodes_count} épisodes")
     
     return {
-        "movies_count": len(movies),
-        "episodes_count": len(episodes),
-        "total_count": len(movies) + len(episodes),
+        "movies_count": movies_count,
+        "episodes_count": episodes_count,
+        "total_count": movies_count + episodes_count,
         "old_pattern": data.old_pattern,
         "new_pattern": data.new_pattern,
         "sample_movies": sample_movies,
@@ -1711,36 +2098,27 @@ async def execute_url_migration(
     if not data.old_pattern or not data.new_pattern:
         raise HTTPException(status_code=400, detail="Les patterns ancien et nouveau sont requis")
     
-    # Migrer les films
-    movies_result = await db.movies.find(
-        {"video_url": {"$regex": f"^{data.old_pattern}"}},
-        {"_id": 0, "id": 1, "video_url": 1}
-    ).to_list(None)
-    
-    movies_updated = 0
-    for movie in movies_result:
-        new_url = movie["video_url"].replace(data.old_pattern, data.new_pattern, 1)
-        await db.movies.update_one(
-            {"id": movie["id"]},
-            {"$set": {"video_url": new_url}}
-        )
-        movies_updated += 1
-    
-    # Migrer les épisodes
-    episodes_result = await db.episodes.find(
-        {"video_url": {"$regex": f"^{data.old_pattern}"}},
-        {"_id": 0, "id": 1, "video_url": 1}
-    ).to_list(None)
-    
-    episodes_updated = 0
-    for episode in episodes_result:
-        new_url = episode["video_url"].replace(data.old_pattern, data.new_pattern, 1)
-        await db.episodes.update_one(
-            {"id": episode["id"]},
-            {"$set": {"video_url": new_url}}
+    url_filter = {"video_url": {"$regex": f"^{data.old_pattern}"}}
+    
+    async def migrate_url(item):
+        new_url = item["video_url"].replace(data.old_pattern, data.new_pattern, 1)
+        return UpdateOne(
+            {"id": item["id"]},
+            {"$set": {"video_url": new_url, "updated_at": datetime.now(timezone.utc).isoformat()}}
         )
-        episodes_updated += 1
     
+    # Migrer les films puis les épisodes, lot par lot
+    movies_stats = await process_cursor(
+        db.movies.find(url_filter, {"_id": 0, "id": 1, "video_url": 1}),
+        migrate_url, db.movies, name="Migration URL films", batch_size=500
+    )
+    episodes_stats = await process_cursor(
+        db.episodes.find(url_filter, {"_id": 0, "id": 1, "video_url": 1}),
+        migrate_url, db.episodes, name="Migration URL épisodes", batch_size=500
+    )
+    
+    movies_updated = movies_stats["written"]
+    episodes_updated = episodes_stats["written"]
     total_updated = movies_updated + episodes_updated
     
     logging.info(f"🔄 MIGRATION URL par {current_founder.email}: {movies_updated} films + {episodes_updated} épisodes | {data.old_pattern} → {data.new_pattern}")
@@ -1764,19 +2142,19 @@ async def fix_missing_created_dates(current_founder: User = Depends(get_current_
     # Fixer les films
     movies_result = await db.movies.update_many(
         {"created_at": {"$exists": False}},
-        {"$set": {"created_at": now}}
+        {"$set": {"created_at": now, "updated_at": now}}
     )
     
     # Fixer les séries
     series_result = await db.series.update_many(
         {"created_at": {"$exists": False}},
-        {"$set": {"created_at": now}}
+        {"$set": {"created_at": now, "updated_at": now}}
     )
     
     # Fixer les épisodes
     episodes_result = await db.episodes.update_many(
         {"created_at": {"$exists": False}},
-        {"$set": {"created_at": now}}
+        {"$set": {"created_at": now, "updated_at": now}}
     )
     
     total_fixed = movies_result.modified_count + series_result.modified_count + episodes_result.modified_count
@@ -1797,77 +2175,68 @@ async def refresh_all_metadata(current_founder: User = Depends(get_current_found
     Rafraîchir les métadonnées (réalisateur, acteurs) de tous les films et séries
     Réservé au FONDATEUR uniquement
     """
-    import asyncio
-    
-    updated_movies = 0
-    updated_series = 0
-    errors = []
+    async def refresh_movie(movie):
+        # Récupérer les crédits
+        credits = await fetch_tmdb_movie_credits(movie['tmdb_id'])
+        await index_title_people(db, "movie", movie['id'], credits)
+        items_logger.info(f"✅ Métadonnées mises à jour pour le film: {movie.get('title')}")
+        return UpdateOne(
+            {"id": movie['id']},
+            {"$set": {
+                "director": credits.get('director'),
+                "director_tmdb_id": credits.get('director_tmdb_id'),
+                "director_photo": credits.get('director_photo'),
+                "cast": credits.get('cast', []),
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }}
+        )
     
-    # Rafraîchir les films
-    movies = await db.movies.find({"tmdb_id": {"$exists": True, "$ne": None}}, {"_id": 0}).to_list(None)
+    async def refresh_series(series):
+        # Récupérer les données de la série pour le créateur
+        tmdb_data = await fetch_tmdb_series(series['tmdb_id'])
+        creator = None
+        creator_tmdb_id = None
+        creator_photo = None
+        
+        if tmdb_data.get('created_by') and len(tmdb_data['created_by']) > 0:
+            creator = tmdb_data['created_by'][0].get('name')
+            creator_tmdb_id = tmdb_data['created_by'][0].get('id')
+            if tmdb_data['created_by'][0].get('profile_path'):
+                creator_photo = f"https://image.tmdb.org/t/p/w185{tmdb_data['created_by'][0]['profile_path']}"
+        
+        # Récupérer les crédits
+        credits = await fetch_tmdb_series_credits(series['tmdb_id'])
+        await index_title_people(db, "series", series['id'], {
+            **credits, "creator": creator, "creator_tmdb_id": creator_tmdb_id, "creator_photo": creator_photo
+        })
+        items_logger.info(f"✅ Métadonnées mises à jour pour la série: {series.get('title')}")
+        return UpdateOne(
+            {"id": series['id']},
+            {"$set": {
+                "creator": creator,
+                "creator_tmdb_id": creator_tmdb_id,
+                "creator_photo": creator_photo,
+                "cast": credits.get('cast', []),
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }}
+        )
     
-    for movie in movies:
-        try:
-            tmdb_id = movie.get('tmdb_id')
-            if tmdb_id:
-                # Récupérer les crédits
-                credits = await fetch_tmdb_movie_credits(tmdb_id)
-                
-                # Mettre à jour en base
-                await db.movies.update_one(
-                    {"id": movie['id']},
-                    {"$set": {
-                        "director": credits.get('director'),
-                        "director_photo": credits.get('director_photo'),
-                        "cast": credits.get('cast', [])
-                    }}
-                )
-                updated_movies += 1
-                logging.info(f"✅ Métadonnées mises à jour pour le film: {movie.get('title')}")
-                
-                # Délai pour éviter le rate limiting TMDB (40 requêtes/10 secondes)
-                await asyncio.sleep(0.3)
-        except Exception as e:
-            errors.append(f"Film {movie.get('title', 'Unknown')}: {str(e)}")
-            logging.error(f"❌ Erreur pour le film {movie.get('title')}: {str(e)}")
+    tmdb_filter = {"tmdb_id": {"$exists": True, "$ne": None}}
+    projection = {"_id": 0, "id": 1, "tmdb_id": 1, "title": 1}
     
-    # Rafraîchir les séries
-    series_list = await db.series.find({"tmdb_id": {"$exists": True, "$ne": None}}, {"_id": 0}).to_list(None)
+    # Limite TMDB: 40 requêtes / 10 secondes (une requête par film, deux par série)
+    movies_stats = await process_cursor(
+        db.movies.find(tmdb_filter, projection), refresh_movie, db.movies,
+        name="Métadonnées films", rate_per_second=TMDB_REQUESTS_PER_SECOND
+    )
+    series_stats = await process_cursor(
+        db.series.find(tmdb_filter, projection), refresh_series, db.series,
+        name="Métadonnées séries", rate_per_second=TMDB_REQUESTS_PER_SECOND / 2
+    )
     
-    for series in series_list:
-        try:
-            tmdb_id = series.get('tmdb_id')
-            if tmdb_id:
-                # Récupérer les données de la série pour le créateur
-                tmdb_data = await fetch_tmdb_series(tmdb_id)
-                creator = None
-                creator_photo = None
-                
-                if tmdb_data.get('created_by') and len(tmdb_data['created_by']) > 0:
-                    creator = tmdb_data['created_by'][0].get('name')
-                    if tmdb_data['created_by'][0].get('profile_path'):
-                        creator_photo = f"https://image.tmdb.org/t/p/w185{tmdb_data['created_by'][0]['profile_path']}"
-                
-                # Récupérer les crédits
-                credits = await fetch_tmdb_series_credits(tmdb_id)
-                
-                # Mettre à jour en base
-                await db.series.update_one(
-                    {"id": series['id']},
-                    {"$set": {
-                        "creator": creator,
-                        "creator_photo": creator_photo,
-                        "cast": credits.get('cast', [])
-                    }}
-                )
-                updated_series += 1
-                logging.info(f"✅ Métadonnées mises à jour pour la série: {series.get('title')}")
-                
-                # Délai pour éviter le rate limiting TMDB
-                await asyncio.sleep(0.3)
-        except Exception as e:
-            errors.append(f"Série {series.get('title', 'Unknown')}: {str(e)}")
-            logging.error(f"❌ Erreur pour la série {series.get('title')}: {str(e)}")
+    updated_movies = movies_stats["processed"] - len(movies_stats["errors"])
+    updated_series = series_stats["processed"] - len(series_stats["errors"])
+    errors = [f"Film {e}" for e in movies_stats["errors"]] + [f"Série {e}" for e in series_stats["errors"]]
     
     logging.info(f"🎬 Rafraîchissement terminé - Films: {updated_movies}, Séries: {updated_series}")
     
@@ -1876,6 +2245,7 @@ async def refresh_all_metadata(current_founder: User = Depends(get_current_found
         "updated_movies": updated_movies,
         "updated_series": updated_series,
         "total_updated": updated_movies + updated_series,
+        "items_per_second": {"movies": movies_stats["items_per_second"], "series": series_stats["items_per_second"]},
         "errors": errors if errors else None
     }
 
@@ -1890,84 +2260,50 @@ async def refresh_all_logos(
     Traitement en arrière-plan pour éviter les timeouts
     Réservé au FONDATEUR uniquement
     """
-    import asyncio
+    tmdb_filter = {"tmdb_id": {"$exists": True, "$ne": None}}
+    projection = {"_id": 0, "id": 1, "tmdb_id": 1, "title": 1}
+    
+    def logo_refresher(media_type: str):
+        async def refresh_logo(item):
+            # Récupérer le logo
+            logo_url = await fetch_tmdb_logo(item['tmdb_id'], media_type)
+            if not logo_url:
+                items_logger.info(f"ℹ️ Pas de logo pour: {item.get('title')}")
+                return None
+            items_logger.info(f"✅ Logo ajouté pour: {item.get('title')}")
+            return UpdateOne(
+                {"id": item['id']},
+                {"$set": {"logo_url": logo_url, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            )
+        return refresh_logo
     
     async def process_logos():
-        updated_movies = 0
-        updated_series = 0
-        errors = []
-        
-        # Rafraîchir les logos des films
-        movies = await db.movies.find({"tmdb_id": {"$exists": True, "$ne": None}}, {"_id": 0}).to_list(None)
-        
-        logging.info(f"🎬 Début du rafraîchissement des logos pour {len(movies)} films...")
-        
-        for i, movie in enumerate(movies):
-            try:
-                tmdb_id = movie.get('tmdb_id')
-                if tmdb_id:
-                    # Récupérer le logo
-                    logo_url = await fetch_tmdb_logo(tmdb_id, "movie")
-                    
-                    if logo_url:
-                        # Mettre à jour en base
-                        await db.movies.update_one(
-                            {"id": movie['id']},
-                            {"$set": {"logo_url": logo_url}}
-                        )
-                        updated_movies += 1
-                        logging.info(f"✅ [{i+1}/{len(movies)}] Logo ajouté pour: {movie.get('title')}")
-                    else:
-                        logging.info(f"ℹ️ [{i+1}/{len(movies)}] Pas de logo pour: {movie.get('title')}")
-                    
-                    # Délai pour éviter le rate limiting TMDB (40 requêtes/10 secondes)
-                    await asyncio.sleep(0.3)
-            except Exception as e:
-                errors.append(f"Film {movie.get('title', 'Unknown')}: {str(e)}")
-                logging.error(f"❌ Erreur pour le film {movie.get('title')}: {str(e)}")
-        
-        # Rafraîchir les logos des séries
-        series_list = await db.series.find({"tmdb_id": {"$exists": True, "$ne": None}}, {"_id": 0}).to_list(None)
-        
-        logging.info(f"📺 Début du rafraîchissement des logos pour {len(series_list)} séries...")
+        logging.info("🎬 Début du rafraîchissement des logos des films...")
+        movies_stats = await process_cursor(
+            db.movies.find(tmdb_filter, projection), logo_refresher("movie"), db.movies,
+            name="Logos films", batch_size=batch_size, rate_per_second=TMDB_REQUESTS_PER_SECOND
+        )
         
-        for i, series in enumerate(series_list):
-            try:
-                tmdb_id = series.get('tmdb_id')
-                if tmdb_id:
-                    # Récupérer le logo
-                    logo_url = await fetch_tmdb_logo(tmdb_id, "tv")
-                    
-                    if logo_url:
-                        # Mettre à jour en base
-                        await db.series.update_one(
-                            {"id": series['id']},
-                            {"$set": {"logo_url": logo_url}}
-                        )
-                        updated_series += 1
-                        logging.info(f"✅ [{i+1}/{len(series_list)}] Logo ajouté pour: {series.get('title')}")
-                    else:
-                        logging.info(f"ℹ️ [{i+1}/{len(series_list)}] Pas de logo pour: {series.get('title')}")
-                    
-                    # Délai pour éviter le rate limiting TMDB
-                    await asyncio.sleep(0.3)
-            except Exception as e:
-                errors.append(f"Série {series.get('title', 'Unknown')}: {str(e)}")
-                logging.error(f"❌ Erreur pour la série {series.get('title')}: {str(e)}")
+        logging.info("📺 Début du rafraîchissement des logos des séries...")
+        series_stats = await process_cursor(
+            db.series.find(tmdb_filter, projection), logo_refresher("tv"), db.series,
+            name="Logos séries", batch_size=batch_size, rate_per_second=TMDB_REQUESTS_PER_SECOND
+        )
         
-        logging.info(f"🎨 Rafraîchissement des logos terminé - Films: {updated_movies}/{len(movies)}, Séries: {updated_series}/{len(series_list)}")
+        logging.info(f"🎨 Rafraîchissement des logos terminé - Films: {movies_stats['written']}/{movies_stats['processed']}, Séries: {series_stats['written']}/{series_stats['processed']}")
         
-        if errors:
-            logging.warning(f"⚠️ {len(errors)} erreurs rencontrées")
+        errors_count = len(movies_stats["errors"]) + len(series_stats["errors"])
+        if errors_count:
+            logging.warning(f"⚠️ {errors_count} erreurs rencontrées")
     
     # Lancer le traitement en arrière-plan
     background_tasks.add_task(process_logos)
     
     # Compter les contenus à traiter
-    movies_count = await db.movies.count_documents({"tmdb_id": {"$exists": True, "$ne": None}})
-    series_count = await db.series.count_documents({"tmdb_id": {"$exists": True, "$ne": None}})
+    movies_count = await db.movies.count_documents(tmdb_filter)
+    series_count = await db.series.count_documents(tmdb_filter)
     total_count = movies_count + series_count
-    estimated_time = total_count * 0.3 / 60  # En minutes
+    estimated_time = total_count / TMDB_REQUESTS_PER_SECOND / 60  # En minutes
     
     return {
         "message": "Rafraîchissement des logos démarré en arrière-plan",
@@ -2073,57 +2409,80 @@ from two_factor_routes import router as two_factor_router, init_db as init_2fa_d
 # Initialiser la DB pour 2FA
 init_2fa_db(db)
 
+# ===== WATCH PROGRESS =====
+class ProgressHeartbeat(BaseModel):
+    content_type: str  # "movie" ou "episode"
+    content_id: str  # id du film ou de l'épisode
+    series_id: Optional[str] = None
+    season_number: Optional[int] = None
+    episode_number: Optional[int] = None
+    position: float = Field(ge=0)  # secondes
+    duration: Optional[float] = Field(default=None, ge=0)
+
+@api_router.post("/me/progress", status_code=status.HTTP_202_ACCEPTED)
+async def save_watch_progress(heartbeat: ProgressHeartbeat, user_id: str = Depends(get_current_user_id)):
+    """
+    Battement de progression du lecteur (toutes les quelques secondes)
+    Mis en tampon en mémoire: les battements d'un même contenu sont fusionnés
+    et écrits en lot dans watch_history
+    """
+    if heartbeat.content_type == "movie":
+        item = {"content_type": "movie", "content_id": heartbeat.content_id, "episode_id": None}
+    elif heartbeat.content_type == "episode":
+        if not heartbeat.series_id:
+            raise HTTPException(status_code=400, detail="series_id requis pour un épisode")
+        item = {
+            "content_type": "series",
+            "content_id": heartbeat.series_id,
+            "episode_id": heartbeat.content_id,
+            "season_number": heartbeat.season_number,
+            "episode_number": heartbeat.episode_number
+        }
+    else:
+        raise HTTPException(status_code=400, detail="Type de contenu invalide (movie ou episode)")
+    
+    record_progress({
+        **item,
+        "user_id": user_id,
+        "position": heartbeat.position,
+        "duration": heartbeat.duration,
+        "watched_at": datetime.now(timezone.utc).isoformat()
+    })
+    return {"status": "accepted"}
+
+@api_router.get("/me/continue-watching")
+async def continue_watching(limit: int = 20, user_id: str = Depends(get_current_user_id)):
+    """Reprise de lecture: position de reprise, épisode suivant et URLs à précharger"""
+    return {"items": await get_continue_watching(db, user_id, max(1, min(limit, 50)))}
+
+@api_router.get("/me/rails")
+async def personalized_rails(user_id: str = Depends(get_current_user_id)):
+    """Rails personnalisés ("Parce que vous avez regardé...", "Vos genres"), mis en cache par utilisateur"""
+    try:
+        return {"success": True, "rails": await get_personalized_rails(db, user_id)}
+    except Exception as e:
+        logging.error(f"Erreur personalized_rails: {e}")
+        return {"success": False, "rails": []}
+
 # ===== USER STATS ENDPOINT =====
 @api_router.get("/auth/profile/stats")
 async def get_user_stats(current_user: User = Depends(get_current_user)):
-    """Obtenir les statistiques de l'utilisateur"""
+    """
+    Obtenir les statistiques de l'utilisateur
+    Lecture du document précalculé user_stats (calculé une seule fois pour un nouvel utilisateur)
+    """
     try:
         user_id = current_user.id
         
-        # Compter les favoris (films + séries)
-        total_favorites = await db.favorites.count_documents({"user_id": user_id})
-        
-        # Compter les films dans l'historique
-        movies_pipeline = [
-            {"$match": {"user_id": user_id, "content_type": "movie"}},
-            {"$group": {"_id": "$content_id"}}
-        ]
-        movies_count = len(await db.watch_history.aggregate(movies_pipeline).to_list(None))
-        
-        # Compter les séries dans l'historique
-        series_pipeline = [
-            {"$match": {"user_id": user_id, "content_type": "series"}},
-            {"$group": {"_id": "$content_id"}}
-        ]
-        series_count = len(await db.watch_history.aggregate(series_pipeline).to_list(None))
-        
-        # Compter le total de vues (nombre d'entrées dans l'historique)
-        total_views = await db.watch_history.count_documents({"user_id": user_id})
-        
-        # Obtenir le dernier film regardé
-        last_movie = await db.watch_history.find_one(
-            {"user_id": user_id, "content_type": "movie"},
-            sort=[("watched_at", -1)]
+        # Statistiques et favoris en parallèle: un seul aller-retour de latence
+        stats, total_favorites = await asyncio.gather(
+            get_user_stats_doc(db, user_id),
+            db.favorites.count_documents({"user_id": user_id})
         )
-        last_movie_title = None
-        if last_movie:
-            movie = await db.movies.find_one({"id": last_movie.get("content_id")})
-            if movie:
-                last_movie_title = movie.get("title")
         
-        # Obtenir la dernière série regardée
-        last_series = await db.watch_history.find_one(
-            {"user_id": user_id, "content_type": "series"},
-            sort=[("watched_at", -1)]
-        )
-        last_series_info = None
-        if last_series:
-            series = await db.series.find_one({"id": last_series.get("content_id")})
-            if series:
-                episode_id = last_series.get("episode_id")
-                season_num = last_series.get("season_number", "?")
-                episode_num = last_series.get("episode_number", "?")
-                last_series_info = f"{series.get('title')} S{season_num}E{episode_num}"
+        movies_count = stats.get("movies_watched", 0)
+        total_views = stats.get("total_views", 0)
+        last_movie = stats.get("last_movie")
         
         # Calculer le temps total de visionnage (estimation)
         # On suppose 90 minutes par film et 45 minutes par épisode en moyenne
@@ -2133,10 +2492,10 @@ async def get_user_stats(current_user: User = Depends(get_current_user)):
         return {
             "total_views": total_views,
             "movies_watched": movies_count,
-            "series_watched": series_count,
+            "series_watched": stats.get("series_watched", 0),
             "total_favorites": total_favorites,
-            "last_movie": last_movie_title,
-            "last_series": last_series_info,
+            "last_movie": last_movie.get("title") if last_movie else None,
+            "last_series": format_last_series(stats.get("last_series")),
             "total_watch_hours": total_watch_hours
         }
     except Exception as e:
@@ -2151,10 +2510,48 @@ async def get_user_stats(current_user: User = Depends(get_current_user)):
             "total_watch_hours": 0
         }
 
+# ===== Profiling =====
+PROFILE_FORMATS = ("collapsed", "speedscope")
+
+@api_router.post("/admin/profile")
+async def profile_current_worker(
+    seconds: float = 10,
+    interval_ms: float = 5,
+    route: Optional[str] = None,
+    format: str = "speedscope",
+    current_founder: User = Depends(get_current_founder)
+):
+    """
+    Profil statistique du worker qui reçoit cette requête (Fondateur uniquement)
+    `route` limite les échantillons à un modèle de route, ex: /api/movies/{movie_id}
+    """
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format invalide. Doit être: {', '.join(PROFILE_FORMATS)}")
+    try:
+        session = await profile_worker(seconds, interval_ms / 1000, route)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    logging.info(f"🔬 Profilage de {worker_id()} par {current_founder.email}: {session.samples} échantillons en {session.elapsed:.1f}s")
+    headers = {"X-Profiled-Worker": worker_id()}
+    if format == "collapsed":
+        return Response(session.collapsed(), media_type="text/plain", headers=headers)
+    return Response(json.dumps(session.speedscope()), media_type="application/json", headers=headers)
+
 # Include routers
 api_router.include_router(two_factor_router, prefix="/auth", tags=["2FA"])
 app.include_router(api_router)
 
+# ===== Metrics =====
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))):
+    """Métriques Prometheus de tous les workers (jeton Bearer exigé si METRICS_TOKEN est défini)"""
+    if METRICS_TOKEN and (credentials is None or credentials.credentials != METRICS_TOKEN):
+        raise HTTPException(status_code=401, detail="Jeton de métriques invalide")
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -2162,13 +2559,111 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(QueryTrackingMiddleware)
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestLogMiddleware)  # Le plus externe: l'identifiant de requête couvre tous les logs
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
+async def ensure_indexes():
+    """Créer les index et champs dérivés nécessaires aux requêtes (idempotent)"""
+    await ensure_user_stats_indexes(db)
+    await ensure_progress_indexes(db)
+    await ensure_continue_watching_indexes(db)
+    await ensure_view_counter_indexes(db)
+    await ensure_people_indexes(db)
+    await ensure_catalog_changes_indexes(db)
+    await ensure_similarity_indexes(db)
+    await ensure_snapshot_indexes(db)
+    await backfill_episode_order(db)
+    await normalize_updated_at(db)
+
+async def warm_models():
+    """Premier passage dans les validateurs et sérialiseurs des modèles les plus servis"""
+    now = datetime.now(timezone.utc).isoformat()
+    samples = [
+        (Movie, {"title": "préchauffage", "video_url": "", "created_at": now}),
+        (Series, {"title": "préchauffage", "created_at": now}),
+        (Episode, {"series_id": "", "season_number": 1, "episode_number": 1, "title": "", "video_url": "", "created_at": now}),
+        (User, {"email": "warmup@example.com", "username": "", "password_hash": "", "created_at": now}),
+    ]
+    for model, data in samples:
+        model.model_validate(data).model_dump(mode="json")
+
+async def warm_caches():
+    """Rails de l'accueil et versions de l'index de similarité chargés en mémoire avant la première requête"""
+    await asyncio.gather(
+        *(get_rail(db, name) for name in ("most_watched_movies", "most_watched_series", "trending_movies", "trending_series")),
+        *(similarity_store.version(db, collection) for collection in ("movies", "series"))
+    )
+
+async def warm_catalog_queries():
+    """Requêtes de la page catalogue et des réglages: plans de requête et cache MongoDB chauds"""
+    await asyncio.gather(
+        db.movies.find({}, {"_id": 0}).limit(20).to_list(20),
+        db.movies.count_documents({}),
+        db.settings.find_one({"id": "app_settings"}, {"_id": 0})
+    )
+
+async def warm_tmdb_client():
+    get_tmdb_client()
+
+async def warm_password_hashing():
+    # passlib choisit et charge le backend bcrypt au premier hash/vérification
+    await asyncio.to_thread(pwd_context.handler("bcrypt").get_backend)
+
+WARMUP_STEPS = [
+    ("mongo_pool", lambda: open_connection_pool(db, MONGO_MIN_POOL_SIZE)),
+    ("tmdb_client", warm_tmdb_client),
+    ("password_hashing", warm_password_hashing),
+    ("models", warm_models),
+    ("home_caches", warm_caches),
+    ("catalog_queries", warm_catalog_queries),
+]
+
+@app.get("/live", include_in_schema=False)
+async def live():
+    """Le processus répond (redémarrer le worker sinon)"""
+    return {"status": "alive"}
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Le worker a terminé son préchauffage (lui envoyer du trafic)"""
+    state = readiness.status()
+    if readiness.ready:
+        return state
+    return JSONResponse(state, status_code=503)
+
+async def start_background_jobs():
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logging.error(f"Erreur création des index: {e}")
+    
+    # Avant le yield du lifespan: uvicorn n'accepte des connexions qu'une fois le worker chaud
+    unfinished_warmup = await warm_up_before_serving(db, WARMUP_STEPS)
+    if unfinished_warmup is not None:
+        start_background_task(unfinished_warmup)
+    start_background_task(monitor_event_loop())
+    start_background_task(discord_publisher.run())
+    start_background_task(progress_buffer.run())
+    start_background_task(view_buffer.run())
+    start_background_task(run_periodic(db, "view_rollup", ROLLUP_INTERVAL_SECONDS, lambda: rollup_views(db)))
+    start_background_task(run_periodic(db, "similarity_index", SIMILARITY_INTERVAL_SECONDS, lambda: build_similarity_indexes(db)))
+    start_background_task(run_periodic(db, "trending", TRENDING_INTERVAL_SECONDS, lambda: compute_trending(db)))
+    start_background_task(backfill_season_summaries(db))
+    start_background_task(run_periodic(db, "catalog_changes", CATALOG_SYNC_INTERVAL_SECONDS, lambda: sequence_changes(db)))
+    if SNAPSHOT_INTERVAL_HOURS > 0:
+        start_background_task(run_periodic(db, "snapshots", SNAPSHOT_INTERVAL_HOURS * 3600, lambda: create_snapshot(db)))
+
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await stop_background_tasks()
+    # Écrire les progressions et vues encore en mémoire avant de fermer la connexion
+    await progress_buffer.close()
+    await view_buffer.close()
+    await discord_publisher.close()
+    if _tmdb_client is not None:
+        await _tmdb_client.aclose()
+    client.close()
+    stop_logging()
\ No newline at end of file
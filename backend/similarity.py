@@ -0,0 +1,349 @@
+"""
+Index "titres similaires" (genres, acteurs, réalisateur/créateur)
+Chaque titre est un vecteur creux TF-IDF de ses caractéristiques; les k plus proches voisins
+(similarité cosinus) sont précalculés par blocs de produits matriciels creux, hors de la boucle
+asyncio (asyncio.to_thread), et stockés à raison d'un document par titre dans similar_titles;
+similarity_index ne garde que la version et les dates de construction par type de contenu.
+Les workers lisent les voisins d'un titre à la demande et les gardent en cache jusqu'au
+changement de version.
+
+Reconstruction incrémentale: seuls les titres modifiés depuis la dernière construction
+(updated_at), les nouveaux titres et les titres dont les voisins changent sont recalculés et réécrits
+"""
+import asyncio
+import os
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import DeleteMany, ReplaceOne
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+NEIGHBOURS = 20
+SIMILARITY_INTERVAL_SECONDS = float(os.environ.get('SIMILARITY_INTERVAL_MINUTES', '10')) * 60
+# Reconstruction complète (IDF à jour) au moins une fois par jour
+FULL_REBUILD_EVERY = timedelta(hours=24)
+# Au-delà de cette proportion de lignes à recalculer, une reconstruction complète est plus simple
+INCREMENTAL_MAX_RATIO = 0.3
+# Taille maximale d'un bloc dense de similarités (lignes x titres, float32)
+BLOCK_BYTES = 64 * 1024 * 1024
+WATERMARK_OVERLAP = timedelta(seconds=60)
+VERSION_CHECK_SECONDS = 60
+WRITE_BATCH_SIZE = 1000
+SIMILAR_TITLES_CACHE_SECONDS = 3600
+SIMILAR_TITLES_CACHE_MAX_ENTRIES = 5000
+# Version du format stocké: un index d'un format antérieur est reconstruit entièrement
+STORAGE_FORMAT = 2
+
+FEATURE_WEIGHTS = {"genre": 1.0, "person": 1.5, "cast": 0.6}
+CONTENT_COLLECTIONS = {"movie": "movies", "series": "series"}
+PERSON_FIELDS = {"movies": "director", "series": "creator"}
+
+
+def title_features(doc: dict, person_field: str) -> List[Tuple[str, float]]:
+    features = [(f"g:{genre}", FEATURE_WEIGHTS["genre"]) for genre in doc.get("genres") or []]
+    if doc.get(person_field):
+        features.append((f"p:{doc[person_field]}", FEATURE_WEIGHTS["person"]))
+    features.extend(
+        (f"c:{actor['name']}", FEATURE_WEIGHTS["cast"])
+        for actor in doc.get("cast") or [] if actor.get("name")
+    )
+    return features
+
+
+def build_matrix(docs: List[dict], person_field: str) -> "sparse.csr_matrix":
+    """Matrice titres x caractéristiques, pondérée par l'IDF et normalisée (norme L2 par ligne)"""
+    # scipy n'est chargé que par le worker qui construit l'index (les autres lisent les tableaux stockés)
+    from scipy import sparse
+
+    if not docs:
+        return sparse.csr_matrix((0, 0), dtype=np.float32)
+    vocabulary: Dict[str, int] = {}
+    rows, cols, values = [], [], []
+    for row, doc in enumerate(docs):
+        for feature, weight in dict(title_features(doc, person_field)).items():
+            rows.append(row)
+            cols.append(vocabulary.setdefault(feature, len(vocabulary)))
+            values.append(weight)
+
+    matrix = sparse.csr_matrix(
+        (np.array(values, dtype=np.float32), (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))),
+        shape=(len(docs), len(vocabulary))
+    )
+    document_frequency = np.bincount(cols, minlength=len(vocabulary)) if cols else np.zeros(0)
+    idf = np.log((1 + len(docs)) / (1 + document_frequency)).astype(np.float32) + 1
+    matrix = matrix @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def top_k_neighbours(matrix: "sparse.csr_matrix", rows: np.ndarray, k: int = NEIGHBOURS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    k plus proches voisins des lignes `rows` (cosinus, soi-même exclu)
+    Voisins absents (similarité nulle): indice -1
+    """
+    n_titles = matrix.shape[0]
+    neighbours = np.full((len(rows), k), -1, dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    if n_titles < 2 or len(rows) == 0:
+        return neighbours, scores
+
+    kept = min(k, n_titles - 1)
+    block_size = max(1, BLOCK_BYTES // (4 * n_titles))
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        similarities = (matrix[block] @ transposed).toarray()
+        similarities[np.arange(len(block)), block] = -1
+        best = np.argpartition(-similarities, kept - 1, axis=1)[:, :kept]
+        best_scores = np.take_along_axis(similarities, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best[best_scores <= 0] = -1
+        neighbours[start:start + len(block), :kept] = best
+        scores[start:start + len(block), :kept] = np.clip(best_scores, 0, None)
+    return neighbours, scores
+
+
+class SimilarityIndex:
+    """Voisins de tous les titres d'un type de contenu, en positions (état de travail de la construction)"""
+
+    def __init__(self, ids: List[str], neighbours: np.ndarray, scores: np.ndarray, version: int = 0,
+                 built_at: Optional[datetime] = None, full_built_at: Optional[datetime] = None):
+        self.ids = ids
+        self.neighbours = neighbours
+        self.scores = scores
+        self.version = version
+        self.built_at = built_at
+        self.full_built_at = full_built_at
+
+    @classmethod
+    def from_neighbour_documents(cls, meta: dict, docs: List[dict]) -> "SimilarityIndex":
+        """Index précédent reconstitué depuis similar_titles (voisin inconnu: -1)"""
+        k = meta["k"]
+        ids = [doc["id"] for doc in docs]
+        positions = {content_id: i for i, content_id in enumerate(ids)}
+        neighbours = np.full((len(ids), k), -1, dtype=np.int32)
+        scores = np.zeros((len(ids), k), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for column, (neighbour_id, score) in enumerate(zip(doc["neighbours"][:k], doc["scores"][:k])):
+                neighbours[row, column] = positions.get(neighbour_id, -1)
+                scores[row, column] = score
+        return cls(ids, neighbours, scores, meta["version"], meta.get("built_at"), meta.get("full_built_at"))
+
+
+def neighbour_document(collection: str, ids: List[str], row: int, neighbours: np.ndarray, scores: np.ndarray) -> dict:
+    kept = neighbours[row] >= 0
+    return {
+        "_id": f"{collection}:{ids[row]}",
+        "collection": collection,
+        "id": ids[row],
+        "neighbours": [ids[neighbour] for neighbour in neighbours[row][kept]],
+        "scores": [round(float(score), 4) for score in scores[row][kept]],
+    }
+
+
+def _rows_to_recompute(previous: SimilarityIndex, ids: List[str], dirty: np.ndarray, matrix: "sparse.csr_matrix") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reprend les voisins de l'index précédent (positions renumérotées) et renvoie les lignes
+    à recalculer: titres modifiés ou nouveaux, voisins supprimés ou modifiés, et titres
+    pour lesquels un titre modifié devient plus proche que leur voisin le moins similaire
+    """
+    n_titles, k = len(ids), previous.neighbours.shape[1]
+    old_to_new = np.full(len(previous.ids) + 1, -1, dtype=np.int32)  # dernière case: voisin absent (-1)
+    new_positions = {content_id: i for i, content_id in enumerate(ids)}
+    for old_position, content_id in enumerate(previous.ids):
+        old_to_new[old_position] = new_positions.get(content_id, -1)
+
+    neighbours = np.full((n_titles, k), -1, dtype=np.int32)
+    scores = np.zeros((n_titles, k), dtype=np.float32)
+    recompute = np.zeros(n_titles, dtype=bool)
+    recompute[dirty] = True
+
+    kept_new = old_to_new[:-1] >= 0
+    previous_rows = old_to_new[:-1][kept_new]
+    remapped = old_to_new[previous.neighbours[kept_new]]
+    neighbours[previous_rows] = remapped
+    scores[previous_rows] = previous.scores[kept_new]
+    recompute[~np.isin(np.arange(n_titles), previous_rows)] = True
+    # Un voisin supprimé (-1 alors qu'il existait) ou modifié invalide la ligne
+    removed = (remapped < 0) & (previous.neighbours[kept_new] >= 0)
+    recompute[previous_rows[removed.any(axis=1)]] = True
+    if len(dirty):
+        dirty_mask = np.zeros(n_titles + 1, dtype=bool)
+        dirty_mask[dirty] = True
+        recompute[previous_rows[dirty_mask[remapped].any(axis=1)]] = True
+
+        # Plus forte similarité de chaque titre avec un titre modifié
+        closest = np.asarray((matrix[dirty] @ matrix.T).max(axis=0).todense()).ravel()
+        weakest = np.where(neighbours[:, -1] >= 0, scores[:, -1], 0)
+        recompute |= closest > weakest
+
+    return neighbours, scores, np.flatnonzero(recompute)
+
+
+def _compute_neighbours(docs: List[dict], person_field: str, previous: Optional[SimilarityIndex],
+                        full: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+    """Partie calcul de build_index (exécutée dans un thread): voisins, lignes recalculées, construction complète ou non"""
+    ids = [doc["id"] for doc in docs]
+    matrix = build_matrix(docs, person_field)
+
+    if not full and ids:
+        watermark = (previous.built_at.replace(tzinfo=timezone.utc) - WATERMARK_OVERLAP).isoformat()
+        dirty = np.array([i for i, doc in enumerate(docs) if (doc.get("updated_at") or "") > watermark], dtype=np.int64)
+        neighbours, scores, rows = _rows_to_recompute(previous, ids, dirty, matrix)
+        if len(rows) <= INCREMENTAL_MAX_RATIO * max(1, len(ids)):
+            if len(rows):
+                neighbours[rows], scores[rows] = top_k_neighbours(matrix, rows)
+            return neighbours, scores, rows, False
+
+    rows = np.arange(len(ids))
+    neighbours, scores = top_k_neighbours(matrix, rows)
+    return neighbours, scores, rows, True
+
+
+async def _load_previous(db, collection: str) -> Optional[SimilarityIndex]:
+    meta = await db.similarity_index.find_one({"_id": collection})
+    if not meta or meta.get("format") != STORAGE_FORMAT or meta.get("k") != NEIGHBOURS or not meta.get("full_built_at"):
+        return None
+    docs = []
+    async for doc in db.similar_titles.find({"collection": collection}, {"_id": 0, "id": 1, "neighbours": 1, "scores": 1}):
+        docs.append(doc)
+    return await asyncio.to_thread(SimilarityIndex.from_neighbour_documents, meta, docs)
+
+
+async def _write_neighbours(db, collection: str, ids: List[str], neighbours: np.ndarray, scores: np.ndarray,
+                            rows: np.ndarray, removed_ids: List[str]):
+    """Réécrit les titres recalculés et supprime ceux qui ont disparu du catalogue, par lots"""
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        batch = [neighbour_document(collection, ids, row, neighbours, scores) for row in rows[start:start + WRITE_BATCH_SIZE]]
+        await db.similar_titles.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch], ordered=False)
+    for start in range(0, len(removed_ids), WRITE_BATCH_SIZE):
+        keys = [f"{collection}:{content_id}" for content_id in removed_ids[start:start + WRITE_BATCH_SIZE]]
+        await db.similar_titles.bulk_write([DeleteMany({"_id": {"$in": keys}})])
+
+
+async def build_index(db, content_type: str, full: bool = False) -> SimilarityIndex:
+    """Construit (ou met à jour) l'index d'un type de contenu et le stocke"""
+    collection = CONTENT_COLLECTIONS[content_type]
+    person_field = PERSON_FIELDS[collection]
+    started = time.monotonic()
+    now = datetime.now(timezone.utc)
+
+    previous = await _load_previous(db, collection)
+    if previous is None:
+        full = True
+    elif now - previous.full_built_at.replace(tzinfo=timezone.utc) > FULL_REBUILD_EVERY:
+        full = True
+
+    docs = []
+    async for doc in db[collection].find({}, {"_id": 0, "id": 1, "genres": 1, "cast.name": 1, person_field: 1, "updated_at": 1}):
+        docs.append(doc)
+    ids = [doc["id"] for doc in docs]
+    # Matrice creuse et kNN: plusieurs secondes de calcul pour un grand catalogue, hors de la boucle
+    neighbours, scores, rows, full = await asyncio.to_thread(_compute_neighbours, docs, person_field, previous, full)
+
+    current = set(ids)
+    if full:
+        # Reconstruction complète: tous les documents sont réécrits, les orphelins supprimés
+        removed_ids = [doc["id"] async for doc in db.similar_titles.find({"collection": collection}, {"_id": 0, "id": 1})
+                       if doc["id"] not in current]
+    else:
+        removed_ids = [content_id for content_id in previous.ids if content_id not in current]
+    await _write_neighbours(db, collection, ids, neighbours, scores, rows, removed_ids)
+
+    index = SimilarityIndex(
+        ids, neighbours, scores,
+        version=(previous.version if previous else 0) + 1,
+        built_at=now,
+        full_built_at=now if full else previous.full_built_at
+    )
+    # Document de métadonnées remplacé en entier: les tableaux de l'ancien format disparaissent
+    await db.similarity_index.replace_one({"_id": collection}, {
+        "format": STORAGE_FORMAT,
+        "k": NEIGHBOURS,
+        "titles": len(ids),
+        "version": index.version,
+        "built_at": index.built_at,
+        "full_built_at": index.full_built_at,
+    }, upsert=True)
+    logger.info(
+        f"🧭 Index de similarité {collection}: {len(ids)} titres, {len(rows)} recalculés "
+        f"({'complet' if full else 'incrémental'}, {(time.monotonic() - started) * 1000:.0f}ms)"
+    )
+    return index
+
+
+async def build_all_indexes(db):
+    for content_type in CONTENT_COLLECTIONS:
+        await build_index(db, content_type)
+
+
+async def ensure_indexes(db):
+    await db.similar_titles.create_index("collection")
+
+
+class SimilarityStore:
+    """Voisins lus par titre et gardés en cache par worker; la version stockée change la clé du cache"""
+
+    def __init__(self):
+        self._versions = TTLCache("similarity_versions", VERSION_CHECK_SECONDS)
+        self._neighbours = TTLCache("similar_titles", SIMILAR_TITLES_CACHE_SECONDS, max_entries=SIMILAR_TITLES_CACHE_MAX_ENTRIES)
+
+    async def version(self, db, collection: str) -> Optional[int]:
+        async def load_version():
+            doc = await db.similarity_index.find_one({"_id": collection}, {"version": 1, "format": 1})
+            return doc["version"] if doc and doc.get("format") == STORAGE_FORMAT else None
+
+        return await self._versions.get(collection, load_version)
+
+    async def similar(self, db, collection: str, content_id: str) -> List[Tuple[str, float]]:
+        version = await self.version(db, collection)
+        if version is None:
+            return []
+
+        async def load_neighbours():
+            doc = await db.similar_titles.find_one({"_id": f"{collection}:{content_id}"}, {"_id": 0, "neighbours": 1, "scores": 1})
+            return list(zip(doc["neighbours"], doc["scores"])) if doc else []
+
+        return await self._neighbours.get((collection, content_id, version), load_neighbours)
+
+    async def similar_many(self, db, collection: str, content_ids: List[str]) -> Dict[str, List[Tuple[str, float]]]:
+        """Voisins de plusieurs titres en une requête $in (hors cache)"""
+        if not content_ids or await self.version(db, collection) is None:
+            return {}
+        keys = [f"{collection}:{content_id}" for content_id in content_ids]
+        return {
+            doc["id"]: list(zip(doc["neighbours"], doc["scores"]))
+            async for doc in db.similar_titles.find({"_id": {"$in": keys}}, {"_id": 0, "id": 1, "neighbours": 1, "scores": 1})
+        }
+
+
+similarity_store = SimilarityStore()
+
+
+async def get_similar(db, content_type: str, content_id: str, limit: int = 12) -> List[dict]:
+    """Titres similaires disponibles, du plus proche au moins proche"""
+    collection = CONTENT_COLLECTIONS[content_type]
+    ranked = (await similarity_store.similar(db, collection, content_id))[:NEIGHBOURS]
+    if not ranked:
+        return []
+
+    docs = {}
+    async for doc in db[collection].find(
+        {"id": {"$in": [similar_id for similar_id, _ in ranked]}, "available": {"$ne": False}},
+        {"_id": 0, "id": 1, "title": 1, "poster_url": 1, "backdrop_url": 1, "genres": 1, "release_year": 1, "rating": 1}
+    ):
+        docs[doc["id"]] = doc
+    return [{**docs[similar_id], "similarity": round(score, 3)} for similar_id, score in ranked if similar_id in docs][:limit]
@@ -0,0 +1,395 @@
+"""
+Sauvegardes incrémentales de la base de données
+Chaque snapshot ne contient que les documents modifiés depuis le précédent (filigrane `updated_at`),
+une chaîne commence toujours par un snapshot complet. Les petites collections non suivies sont
+copiées entièrement à chaque snapshot et remplacent leur état précédent à la restauration
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import bson
+from bson import ObjectId, json_util
+from pymongo import IndexModel, ReplaceOne, DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from people import rebuild_people_index
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+SNAPSHOT_DIR = Path(os.environ.get('SNAPSHOT_DIR', ROOT_DIR / 'snapshots'))
+SNAPSHOT_FULL_EVERY = int(os.environ.get('SNAPSHOT_FULL_EVERY', '7'))  # Snapshot complet tous les N snapshots
+SNAPSHOT_KEEP_CHAINS = int(os.environ.get('SNAPSHOT_KEEP_CHAINS', '2'))  # Nombre de chaînes conservées
+SNAPSHOT_BATCH_SIZE = 1000
+SNAPSHOT_CONCURRENCY = 4
+# Recouvrement entre deux snapshots: couvre les écritures horodatées juste avant le filigrane
+# mais validées après la lecture (les doublons sont sans effet à la restauration)
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+# Stratégie de suivi par collection: "updated_at" (filigrane) ou "_id" (collection en ajout seul)
+# Les autres collections (paramètres, récents...) sont petites et copiées entièrement à chaque fois
+TRACKED_COLLECTIONS = {
+    "movies": "updated_at",
+    "series": "updated_at",
+    "episodes": "updated_at",
+    "users": "updated_at",
+    "watch_history": "updated_at",  # lignes mises à jour par les battements du lecteur
+    "favorites": "_id",
+    # Seule trace des vues passées (les compteurs bruts sont supprimés après agrégation)
+    "view_counts_hourly": "updated_at",
+    "view_counts_daily": "updated_at",
+}
+# Collections dérivées d'autres données: non sauvegardées, vidées puis reconstruites à la restauration
+# (people/person_credits depuis les titres, user_stats recalculé à la première lecture depuis l'historique)
+DERIVED_COLLECTIONS = {"people", "person_credits", "user_stats"}
+# Données transitoires ou recalculées (compteurs non agrégés, rails, index de similarité,
+# journal du catalogue: reconstruit avec une nouvelle époque après une restauration)
+EXCLUDED_COLLECTIONS = DERIVED_COLLECTIONS | {
+    "job_locks", "deleted_documents", "view_counter_shards", "rails", "similarity_index", "similar_titles",
+    "view_dedupe", "catalog_changes", "catalog_sync_state"
+}
+
+
+async def ensure_indexes(db):
+    """Index des filigranes: un snapshot incrémental ne lit que les documents modifiés"""
+    for name, strategy in TRACKED_COLLECTIONS.items():
+        if strategy == "updated_at":
+            await db[name].create_index("updated_at")
+    await db.deleted_documents.create_index("deleted_at")
+
+
+async def normalize_updated_at(db) -> int:
+    """
+    Convertit les updated_at stockés en date BSON (anciennes écritures 2FA) au format ISO des routes:
+    un seul type, donc un seul intervalle sur l'index
+    """
+    converted = 0
+    for name, strategy in TRACKED_COLLECTIONS.items():
+        if strategy != "updated_at":
+            continue
+        # Quelques documents au plus: conversion côté Python, au même format que isoformat()
+        operations = [
+            UpdateOne(
+                {"_id": doc["_id"], "updated_at": doc["updated_at"]},
+                {"$set": {"updated_at": doc["updated_at"].replace(tzinfo=timezone.utc).isoformat()}}
+            )
+            async for doc in db[name].find({"updated_at": {"$type": "date"}}, {"updated_at": 1})
+        ]
+        if operations:
+            converted += (await db[name].bulk_write(operations, ordered=False)).modified_count
+    return converted
+
+
+async def record_deletions(db, collection: str, ids: List[ObjectId]):
+    """Garde une trace des suppressions pour que la restauration les rejoue"""
+    if not ids:
+        return
+    now = datetime.now(timezone.utc)
+    await db.deleted_documents.insert_many(
+        [{"collection": collection, "doc_id": doc_id, "deleted_at": now} for doc_id in ids],
+        ordered=False
+    )
+
+
+def list_snapshots(snapshot_dir: Path = SNAPSHOT_DIR) -> List[dict]:
+    """Manifestes des snapshots terminés, du plus ancien au plus récent"""
+    manifests = []
+    if not snapshot_dir.exists():
+        return manifests
+    for path in sorted(snapshot_dir.iterdir()):
+        manifest_path = path / "manifest.json"
+        if path.is_dir() and manifest_path.exists():
+            manifests.append(json.loads(manifest_path.read_text()))
+    return manifests
+
+
+def _changed_filter(strategy: str, since: datetime) -> dict:
+    if strategy == "_id":
+        return {"_id": {"$gt": ObjectId.from_datetime(since)}}
+    # updated_at est une chaîne ISO UTC (normalize_updated_at): ordre lexicographique = ordre chronologique
+    return {"updated_at": {"$gt": since.isoformat()}}
+
+
+def _write_docs(fh, hasher, docs: List[dict]) -> int:
+    data = b"".join(bson.encode(doc) for doc in docs)
+    hasher.update(data)
+    fh.write(data)
+    return len(data)
+
+
+async def _dump_collection(collection, query: dict, path: Path, batch_size: int) -> dict:
+    hasher = hashlib.sha256()
+    documents = 0
+    size = 0
+    fh = await asyncio.to_thread(gzip.open, path, "wb")
+    try:
+        batch = []
+        async for doc in collection.find(query, batch_size=batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                size += await asyncio.to_thread(_write_docs, fh, hasher, batch)
+                documents += len(batch)
+                batch = []
+        if batch:
+            size += await asyncio.to_thread(_write_docs, fh, hasher, batch)
+            documents += len(batch)
+    finally:
+        await asyncio.to_thread(fh.close)
+    return {"documents": documents, "bytes": size, "sha256": hasher.hexdigest()}
+
+
+def _prune(snapshot_dir: Path, manifests: List[dict], keep_chains: int):
+    """Supprime les chaînes les plus anciennes au-delà de `keep_chains`"""
+    chains = []
+    for manifest in manifests:
+        if manifest["type"] == "full" or not chains:
+            chains.append([])
+        chains[-1].append(manifest["id"])
+    for chain in chains[:-keep_chains] if keep_chains > 0 else []:
+        for snapshot_id in chain:
+            shutil.rmtree(snapshot_dir / snapshot_id, ignore_errors=True)
+            logger.info(f"🗑️ Snapshot {snapshot_id} supprimé (rétention)")
+
+
+async def create_snapshot(
+    db,
+    full: bool = False,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    batch_size: int = SNAPSHOT_BATCH_SIZE,
+    concurrency: int = SNAPSHOT_CONCURRENCY,
+) -> dict:
+    """
+    Crée un snapshot complet ou incrémental et renvoie son manifeste
+    Le coût d'un snapshot incrémental est proportionnel au nombre de documents modifiés
+    """
+    started_at = datetime.now(timezone.utc)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    manifests = list_snapshots(snapshot_dir)
+    parent = manifests[-1] if manifests else None
+
+    # Nouveau snapshot complet si aucune chaîne ou si la chaîne courante est trop longue
+    if parent is None or parent["chain_length"] >= SNAPSHOT_FULL_EVERY:
+        full = True
+    since = None if full else datetime.fromisoformat(parent["watermark"]) - WATERMARK_OVERLAP
+
+    snapshot_id = started_at.strftime("%Y%m%dT%H%M%SZ")
+    tmp_dir = snapshot_dir / f".tmp-{snapshot_id}"
+    tmp_dir.mkdir()
+
+    names = [
+        name for name in await db.list_collection_names()
+        if name not in EXCLUDED_COLLECTIONS and not name.startswith("system.")
+    ]
+    untracked = sorted(name for name in names if name not in TRACKED_COLLECTIONS)
+    if untracked:
+        logger.info(f"💾 Copiées entièrement à chaque snapshot (non suivies): {', '.join(untracked)}")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def dump(name: str):
+        async with semaphore:
+            strategy = TRACKED_COLLECTIONS.get(name)
+            query = _changed_filter(strategy, since) if since and strategy else {}
+            stats = await _dump_collection(db[name], query, tmp_dir / f"{name}.bson.gz", batch_size)
+            stats["mode"] = "changes" if query else "full"
+            stats["indexes"] = json.loads(json_util.dumps(
+                [index async for index in db[name].list_indexes()],
+                json_options=json_util.RELAXED_JSON_OPTIONS
+            ))
+            return name, stats
+
+    try:
+        results = await asyncio.gather(*(dump(name) for name in names))
+
+        deletions = {"documents": 0}
+        if since:
+            deletions = await _dump_collection(
+                db.deleted_documents, {"deleted_at": {"$gt": since}}, tmp_dir / "_deletions.bson.gz", batch_size
+            )
+
+        manifest = {
+            "id": snapshot_id,
+            "type": "full" if full else "incremental",
+            "parent": None if full else parent["id"],
+            "chain_length": 1 if full else parent["chain_length"] + 1,
+            "watermark": started_at.isoformat(),
+            "database": db.name,
+            "collections": dict(results),
+            "deletions": deletions,
+            "duration_seconds": round((datetime.now(timezone.utc) - started_at).total_seconds(), 2),
+        }
+        (tmp_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        tmp_dir.rename(snapshot_dir / snapshot_id)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Les tombes plus anciennes que le début de la chaîne ne servent plus
+    if full:
+        await db.deleted_documents.delete_many({"deleted_at": {"$lt": started_at - WATERMARK_OVERLAP}})
+
+    _prune(snapshot_dir, manifests + [manifest], SNAPSHOT_KEEP_CHAINS)
+
+    total = sum(stats["documents"] for stats in manifest["collections"].values())
+    logger.info(f"💾 Snapshot {manifest['type']} {snapshot_id}: {total} documents en {manifest['duration_seconds']}s")
+    return manifest
+
+
+# ===== Restauration =====
+def resolve_chain(target: Optional[str] = None, snapshot_dir: Path = SNAPSHOT_DIR) -> List[dict]:
+    """Chaîne de manifestes (complet puis incrémentaux) menant au snapshot `target`"""
+    manifests = {m["id"]: m for m in list_snapshots(snapshot_dir)}
+    if not manifests:
+        raise FileNotFoundError(f"Aucun snapshot dans {snapshot_dir}")
+    current = manifests.get(target) if target else manifests[max(manifests)]
+    if current is None:
+        raise FileNotFoundError(f"Snapshot {target} introuvable")
+    chain = [current]
+    while current["parent"]:
+        current = manifests.get(current["parent"])
+        if current is None:
+            raise FileNotFoundError(f"Chaîne incomplète: parent {chain[-1]['parent']} manquant")
+        chain.append(current)
+    return list(reversed(chain))
+
+
+def _read_batches(path: Path, batch_size: int):
+    with gzip.open(path, "rb") as fh:
+        batch = []
+        for doc in bson.decode_file_iter(fh):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+async def _iter_batches(path: Path, batch_size: int):
+    """Itère les lots d'un fichier BSON gzip sans bloquer la boucle d'événements"""
+    iterator = _read_batches(path, batch_size)
+    while True:
+        batch = await asyncio.to_thread(next, iterator, None)
+        if batch is None:
+            return
+        yield batch
+
+
+async def _insert_batch(collection, docs: List[dict]):
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Seules les clés dupliquées sont tolérées (document déjà présent)
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+
+async def _restore_collection(db, name: str, path: Path, upsert: bool, batch_size: int, concurrency: int) -> int:
+    collection = db[name]
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+    restored = 0
+
+    async def apply(docs: List[dict]):
+        async with semaphore:
+            if upsert:
+                await collection.bulk_write(
+                    [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs],
+                    ordered=False
+                )
+            else:
+                await _insert_batch(collection, docs)
+
+    async for docs in _iter_batches(path, batch_size):
+        # Au plus `concurrency` lots en vol: la mémoire reste bornée
+        while len(pending) >= concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        pending.add(asyncio.create_task(apply(docs)))
+        restored += len(docs)
+    if pending:
+        for task in (await asyncio.wait(pending))[0]:
+            task.result()
+    return restored
+
+
+async def restore_chain(
+    db,
+    target: Optional[str] = None,
+    drop: bool = False,
+    snapshot_dir: Path = SNAPSHOT_DIR,
+    batch_size: int = SNAPSHOT_BATCH_SIZE,
+    concurrency: int = SNAPSHOT_CONCURRENCY,
+) -> Dict[str, int]:
+    """
+    Rejoue une chaîne de snapshots dans `db`
+    Les index secondaires sont supprimés pendant le chargement puis reconstruits à la fin,
+    les collections dérivées (DERIVED_COLLECTIONS) sont vidées puis reconstruites
+    """
+    chain = resolve_chain(target, snapshot_dir)
+    last = chain[-1]
+    restored: Dict[str, int] = {}
+
+    for name in last["collections"]:
+        if drop:
+            await db[name].drop()
+        else:
+            await db[name].drop_indexes()
+
+    for position, manifest in enumerate(chain):
+        path = snapshot_dir / manifest["id"]
+        # Une collection non suivie est copiée entièrement dans chaque snapshot, sans trace de ses
+        # suppressions: sa copie remplace l'état précédent au lieu de s'y ajouter
+        replaced = {
+            name for name, stats in manifest["collections"].items()
+            if position > 0 and stats.get("mode") == "full"
+        }
+        for name in replaced:
+            await db[name].delete_many({})
+        # Base vide: insert_many non ordonné; ensuite upserts non ordonnés
+        upsert = position > 0 or not drop
+        counts = await asyncio.gather(*(
+            _restore_collection(db, name, path / f"{name}.bson.gz", upsert and name not in replaced, batch_size, concurrency)
+            for name in manifest["collections"]
+        ))
+        for name, count in zip(manifest["collections"], counts):
+            restored[name] = restored.get(name, 0) + count
+
+        deletions_path = path / "_deletions.bson.gz"
+        if deletions_path.exists():
+            async for tombstones in _iter_batches(deletions_path, batch_size):
+                by_collection: Dict[str, list] = {}
+                for tombstone in tombstones:
+                    by_collection.setdefault(tombstone["collection"], []).append(DeleteOne({"_id": tombstone["doc_id"]}))
+                for name, operations in by_collection.items():
+                    await db[name].bulk_write(operations, ordered=False)
+        logger.info(f"♻️ Snapshot {manifest['id']} ({manifest['type']}) rejoué")
+
+    for name, stats in last["collections"].items():
+        indexes = [
+            IndexModel(
+                list(index["key"].items()),
+                **{k: v for k, v in index.items() if k not in ("key", "v", "ns")}
+            )
+            for index in stats.get("indexes", [])
+            if index["name"] != "_id_"
+        ]
+        if indexes:
+            await db[name].create_indexes(indexes)
+
+    # Les collections dérivées ne correspondent plus aux données restaurées
+    for name in DERIVED_COLLECTIONS:
+        await db[name].delete_many({})
+    people_count = await rebuild_people_index(db)
+    logger.info(f"🎭 Index des personnes reconstruit depuis {people_count} titres")
+
+    logger.info(f"✅ Restauration terminée jusqu'à {last['id']}: {sum(restored.values())} documents rejoués")
+    return restored
@@ -0,0 +1,30 @@
+"""
+Tests unitaires du backend (depuis backend/): python -m pytest tests
+Dépendances: pip install -r requirements-test.txt
+Les tests qui touchent la base utilisent une base MongoDB en mémoire (mongomock_motor)
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Lus par server.py à l'import; aucune connexion n'est ouverte
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "streamflex_tests")
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["streamflex_tests"]
+
+
+@pytest.fixture
+def server_db(db, monkeypatch):
+    """Base en mémoire à la place de server.db pour appeler les routes directement"""
+    import server
+    monkeypatch.setattr(server, "db", db)
+    return db
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from server import BulkCatalogFilter, BulkCatalogPatch, BulkCatalogUpdate, User, VideoURLHostPatch, build_bulk_catalog_query, build_bulk_catalog_update, bulk_update_catalog
+
+ADMIN = User(email="admin@example.com", username="admin", password_hash="", role="admin")
+
+
+def test_availability_filter_refreshes_season_summaries(server_db):
+    async def scenario():
+        # episodes_rev présent: mongomock prend une projection vide pour un document absent
+        await server_db.series.insert_one({"id": "s1", "title": "Série", "episodes_rev": 0})
+        await server_db.episodes.insert_many([
+            {"id": f"e{n}", "series_id": "s1", "season_number": 1, "episode_number": n, "episode_order": n, "available": True}
+            for n in (1, 2)
+        ])
+        # Le filtre porte sur la disponibilité modifiée: après la mise à jour, plus aucun épisode n'y correspond
+        request = BulkCatalogUpdate(collection="episodes", filter=BulkCatalogFilter(available=True), patch=BulkCatalogPatch(available=False))
+        result = await bulk_update_catalog(request, current_admin=ADMIN)
+        return result, await server_db.series.find_one({"id": "s1"})
+
+    result, series = asyncio.run(scenario())
+    assert result["modified_count"] == 2
+    assert series["seasons"][0]["available_count"] == 0
+    assert series["seasons"][0]["episode_count"] == 2
+
+
+def test_noop_bulk_edit_leaves_documents_untouched(server_db):
+    async def scenario():
+        await server_db.movies.insert_many([
+            {"id": "m1", "title": "A", "genres": ["Action"], "available": False, "updated_at": "2026-01-01T00:00:00+00:00"},
+            {"id": "m2", "title": "B", "genres": ["Drame"], "available": True, "updated_at": "2026-01-01T00:00:00+00:00"},
+        ])
+        request = BulkCatalogUpdate(collection="movies", ids=["m1", "m2"], patch=BulkCatalogPatch(available=False))
+        result = await bulk_update_catalog(request, current_admin=ADMIN)
+        docs = {doc["id"]: doc async for doc in server_db.movies.find({}, {"_id": 0})}
+        return result, docs
+
+    result, docs = asyncio.run(scenario())
+    assert (result["matched_count"], result["modified_count"]) == (2, 1)
+    assert docs["m1"]["updated_at"] == "2026-01-01T00:00:00+00:00"
+    assert docs["m2"]["updated_at"] > "2026-01-01T00:00:00+00:00"
+    assert "_bulk_before" not in docs["m1"] and "_bulk_before" not in docs["m2"]
+
+
+def test_video_url_hosts_are_literals():
+    patch = BulkCatalogPatch(video_url_host=VideoURLHostPatch(old_host="$old", new_host="$new"))
+    video_url = build_bulk_catalog_update("episodes", patch)[1]["$set"]["video_url"]
+    matches_old_host, replaced, _ = video_url["$cond"]
+    assert matches_old_host["$eq"][0]["$indexOfCP"][1] == {"$literal": "$old"}
+    assert replaced["$concat"][0] == {"$literal": "$new"}
+
+
+def test_bulk_query_combines_ids_and_filter():
+    request = BulkCatalogUpdate(
+        collection="episodes", ids=["e1", "e2"],
+        filter=BulkCatalogFilter(series_id="s1", season_number=0, available=True), patch=BulkCatalogPatch()
+    )
+    assert build_bulk_catalog_query(request) == {"$and": [
+        {"id": {"$in": ["e1", "e2"]}},
+        {"available": {"$ne": False}},
+        {"series_id": "s1"},
+        {"season_number": 0},
+    ]}
+
+
+def test_bulk_query_single_condition_and_ignored_values():
+    request = BulkCatalogUpdate(collection="movies", filter=BulkCatalogFilter(genre="all", available=False), patch=BulkCatalogPatch())
+    assert build_bulk_catalog_query(request) == {"available": False}
+
+
+def test_bulk_query_requires_ids_or_filter():
+    # Une liste d'ids vide reste une condition (ne modifie rien) plutôt qu'un filtre « tout le catalogue »
+    assert build_bulk_catalog_query(BulkCatalogUpdate(collection="movies", ids=[], patch=BulkCatalogPatch())) == {"id": {"$in": []}}
+    with pytest.raises(HTTPException) as error:
+        build_bulk_catalog_query(BulkCatalogUpdate(collection="movies", filter=BulkCatalogFilter(genre="all"), patch=BulkCatalogPatch()))
+    assert error.value.status_code == 400
@@ -0,0 +1,22 @@
+import asyncio
+
+from continue_watching import backfill_episode_order, episode_order
+
+
+def test_episode_order_sorts_by_season_then_episode():
+    episodes = [(2, 1), (1, 10), (1, 2), (10, 1), (1, 1)]
+    assert sorted(episodes, key=lambda e: episode_order(*e)) == [(1, 1), (1, 2), (1, 10), (2, 1), (10, 1)]
+    # Une saison longue ne déborde pas sur la suivante
+    assert episode_order(1, 999) < episode_order(2, 0)
+
+
+def test_backfill_matches_episode_order(db):
+    async def scenario():
+        await db.episodes.insert_many([
+            {"id": "e1", "season_number": 3, "episode_number": 12},
+            {"id": "e2", "season_number": 1, "episode_number": 4, "episode_order": episode_order(1, 4)},
+        ])
+        await backfill_episode_order(db)
+        return {e["id"]: e["episode_order"] for e in await db.episodes.find().to_list(None)}
+
+    assert asyncio.run(scenario()) == {"e1": episode_order(3, 12), "e2": episode_order(1, 4)}
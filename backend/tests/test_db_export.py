@@ -0,0 +1,31 @@
+import asyncio
+
+from db_export import _read_collection
+
+
+def test_reader_cancellation_does_not_wait_for_full_queue(db):
+    async def scenario():
+        await db.movies.insert_many([{"id": str(i)} for i in range(3)])
+        queue = asyncio.Queue(maxsize=1)
+        reader = asyncio.create_task(_read_collection(db.movies, queue, batch_size=1))
+        while not queue.full():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)  # le lecteur attend une place pour le lot suivant
+
+        reader.cancel()
+        done, _ = await asyncio.wait({reader}, timeout=1)
+        assert reader in done and reader.cancelled()
+
+    asyncio.run(scenario())
+
+
+def test_reader_ends_with_sentinel(db):
+    async def scenario():
+        await db.movies.insert_many([{"id": str(i)} for i in range(3)])
+        queue = asyncio.Queue()
+        await _read_collection(db.movies, queue, batch_size=2)
+        batches = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert [len(batch) for batch in batches[:-1]] == [2, 1]
+        assert batches[-1] is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI
+
+import server
+from profiler import ProfilerMiddleware, profile
+
+FOUNDER = server.User(email="founder@example.com", username="founder", password_hash="", role="fondateur")
+
+
+async def post_profile(params: dict) -> httpx.Response:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/api/admin/profile", params=params)
+
+
+def test_profile_endpoint_is_registered_and_founder_only():
+    response = asyncio.run(post_profile({"seconds": 0.1}))
+    # Route enregistrée (pas 404): refusée faute de jeton
+    assert response.status_code in (401, 403)
+
+
+def test_profile_endpoint_returns_speedscope_profile(monkeypatch):
+    monkeypatch.setitem(server.app.dependency_overrides, server.get_current_founder, lambda: FOUNDER)
+    response = asyncio.run(post_profile({"seconds": 0.2, "interval_ms": 1}))
+    assert response.status_code == 200
+    assert response.headers["X-Profiled-Worker"]
+    document = json.loads(response.content)
+    assert document["profiles"][0]["type"] == "sampled"
+    assert document["profiles"][0]["samples"]
+
+
+def test_profile_endpoint_rejects_unknown_format(monkeypatch):
+    monkeypatch.setitem(server.app.dependency_overrides, server.get_current_founder, lambda: FOUNDER)
+    assert asyncio.run(post_profile({"seconds": 0.1, "format": "pprof"})).status_code == 400
+
+
+def test_route_filter_keeps_only_samples_of_that_route():
+    app = FastAPI()
+
+    @app.get("/slow/{item_id}")
+    async def slow(item_id: str):
+        time.sleep(0.05)  # Bloque la boucle: c'est la requête en cours qui est échantillonnée
+        return {"id": item_id}
+
+    @app.get("/fast")
+    async def fast():
+        time.sleep(0.05)
+        return {}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=ProfilerMiddleware(app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def traffic():
+                await asyncio.sleep(0.05)
+                for _ in range(3):
+                    await client.get("/slow/1")
+                    await client.get("/fast")
+
+            session, _ = await asyncio.gather(profile(1, 0.002, route="/slow/{item_id}"), traffic())
+        return session
+
+    session = asyncio.run(scenario())
+    collapsed = session.collapsed()
+    assert session.samples > 0
+    assert "slow (" in collapsed
+    assert "fast (" not in collapsed
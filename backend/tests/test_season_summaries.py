@@ -0,0 +1,18 @@
+import asyncio
+
+from season_summaries import backfill_season_summaries
+
+
+def test_backfill_stamps_updated_at(db):
+    async def scenario():
+        await db.series.insert_one({"id": "s1", "title": "Série", "updated_at": "2020-01-01T00:00:00+00:00"})
+        await db.episodes.insert_many([
+            {"id": f"e{n}", "series_id": "s1", "season_number": 1, "episode_number": n, "episode_order": n, "available": True}
+            for n in (1, 2)
+        ])
+        await backfill_season_summaries(db)
+        return await db.series.find_one({"id": "s1"})
+
+    series = asyncio.run(scenario())
+    assert series["seasons"][0]["episode_count"] == 2
+    assert series["updated_at"] > "2020-01-01T00:00:00+00:00"
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from snapshots import _changed_filter, create_snapshot, ensure_indexes, normalize_updated_at, restore_chain
+
+
+def test_derived_collections_are_rebuilt_not_saved(db, tmp_path):
+    async def scenario():
+        await db.movies.insert_one({
+            "id": "m1", "title": "Film", "director": "Agnès Varda", "director_tmdb_id": 7,
+            "cast": [{"tmdb_id": 8, "name": "Sandrine Bonnaire", "character": "Mona"}],
+            "updated_at": "2026-01-01T00:00:00+00:00"
+        })
+        await db.view_counts_daily.insert_one({"_id": "movie:m1:2026-01-01", "count": 3, "updated_at": "2026-01-01T00:00:00+00:00"})
+        await db.user_stats.insert_one({"user_id": "u1", "version": 4})
+        manifest = await create_snapshot(db, snapshot_dir=tmp_path)
+        assert "view_counts_daily" in manifest["collections"]
+        assert "user_stats" not in manifest["collections"]
+
+        target = AsyncMongoMockClient()["streamflex_restore"]
+        await target.user_stats.insert_one({"user_id": "u1", "version": 9})
+        await target.people.insert_one({"tmdb_id": 99, "name": "Obsolète"})
+        await restore_chain(target, drop=True, snapshot_dir=tmp_path)
+
+        assert await target.user_stats.count_documents({}) == 0
+        assert sorted(p["tmdb_id"] for p in await target.people.find().to_list(None)) == [7, 8]
+        assert await target.person_credits.count_documents({"content_id": "m1"}) == 2
+        assert await target.view_counts_daily.count_documents({}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_updated_at_is_normalized_to_iso_strings(db):
+    async def scenario():
+        await db.users.insert_many([
+            {"id": "u1", "updated_at": datetime(2026, 1, 1, 10, 0, 0, 123000)},
+            {"id": "u2", "updated_at": "2026-01-02T10:00:00+00:00"},
+        ])
+        converted = await normalize_updated_at(db)
+        await ensure_indexes(db)
+        since = datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+        changed = await db.users.find(_changed_filter("updated_at", since)).to_list(None)
+        return converted, changed, await db.users.index_information()
+
+    converted, changed, indexes = asyncio.run(scenario())
+    assert converted == 1
+    assert sorted((doc["id"], doc["updated_at"]) for doc in changed) == [
+        ("u1", "2026-01-01T10:00:00.123000+00:00"), ("u2", "2026-01-02T10:00:00+00:00")
+    ]
+    assert any(index["key"] == [("updated_at", 1)] for index in indexes.values())
+
+
+def test_untracked_collection_deletions_survive_restore(db, tmp_path):
+    async def scenario():
+        await db.settings.insert_many([{"id": "a"}, {"id": "b"}])
+        await create_snapshot(db, snapshot_dir=tmp_path)
+        await db.settings.delete_one({"id": "b"})
+        time.sleep(1.1)  # identifiant de snapshot à la seconde
+        manifest = await create_snapshot(db, snapshot_dir=tmp_path)
+        assert manifest["type"] == "incremental"
+
+        target = AsyncMongoMockClient()["streamflex_restore"]
+        await restore_chain(target, drop=True, snapshot_dir=tmp_path)
+        return [doc["id"] for doc in await target.settings.find().to_list(None)]
+
+    assert asyncio.run(scenario()) == ["a"]
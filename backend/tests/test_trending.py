@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from trending import BucketArrays, build_arrays, decayed_scores, rank_titles, top_n
+
+NOW = datetime(2026, 1, 2, 12, 30, tzinfo=timezone.utc)
+
+
+def bucket(content_type: str, content_id: str, hour: str, count: int) -> dict:
+    return {"content_type": content_type, "content_id": content_id, "hour": hour, "count": count}
+
+
+def test_build_arrays_indexes_titles_and_ages():
+    titles, title_index, age_hours, counts = build_arrays([
+        bucket("movie", "m1", "2026-01-02T12", 3),
+        bucket("movie", "m2", "2026-01-02T11", 1),
+        bucket("movie", "m1", "2026-01-01T12", 2),
+    ], NOW)
+    assert titles == [("movie", "m1"), ("movie", "m2")]
+    assert title_index.tolist() == [0, 1, 0]
+    # Milieu de l'heure: la tranche en cours a 0h, celle d'hier 24h
+    assert age_hours.tolist() == [0.0, 1.0, 24.0]
+    assert counts.tolist() == [3, 1, 2]
+
+
+def test_batched_add_matches_single_pass():
+    rows = [bucket("movie", f"m{i % 7}", f"2026-01-0{1 + i % 2}T{i % 24:02d}", i) for i in range(50)]
+    arrays = BucketArrays(NOW)
+    for start in range(0, len(rows), 8):
+        arrays.add(rows[start:start + 8])
+    batched = arrays.result()
+    single = build_arrays(rows, NOW)
+    assert batched[0] == single[0]
+    for left, right in zip(batched[1:], single[1:]):
+        np.testing.assert_array_equal(left, right)
+
+
+def test_scores_halve_every_half_life():
+    scores = decayed_scores(np.array([0, 1, 1]), np.array([0.0, 24.0, 48.0]), np.array([4.0, 4.0, 4.0]), 2, half_life_hours=24)
+    np.testing.assert_allclose(scores, [4.0, 2.0 + 1.0])
+
+
+def test_top_n_is_sorted_and_bounded():
+    scores = np.array([1.0, 5.0, 3.0, 4.0])
+    assert top_n(scores, 2).tolist() == [1, 3]
+    assert top_n(scores, 10).tolist() == [1, 3, 2, 0]
+    assert top_n(scores, 0).tolist() == []
+
+
+def test_rank_titles_separates_content_types():
+    arrays = BucketArrays(NOW)
+    arrays.add([
+        bucket("movie", "m1", "2026-01-02T12", 1),
+        bucket("movie", "m2", "2026-01-02T12", 5),
+        bucket("series", "s1", "2026-01-02T12", 2),
+    ])
+    ranked = rank_titles(arrays, 1)
+    assert [content_id for content_id, _ in ranked["movie"]] == ["m2", "m1"]
+    assert ranked["series"] == [("s1", 2.0)]
+
+
+def test_rank_titles_without_views():
+    assert rank_titles(BucketArrays(NOW), 10) == {"movie": [], "series": []}
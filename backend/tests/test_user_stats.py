@@ -0,0 +1,51 @@
+import asyncio
+
+from user_stats import build_stats_update, record_watch_events
+
+
+def event(user_id: str, content_id: str, watched_at: str, new_view: bool = True) -> dict:
+    return {"user_id": user_id, "content_type": "movie", "content_id": content_id, "title": content_id,
+            "watched_at": watched_at, "new_view": new_view}
+
+
+def test_first_watch_event_creates_stats_document(db):
+    async def scenario():
+        # Le lot est déjà écrit dans watch_history quand les statistiques sont mises à jour
+        await db.watch_history.insert_one({"user_id": "u1", "content_type": "movie", "content_id": "m1", "watched_at": "2026-01-01T10:00:00"})
+        await record_watch_events(db, [event("u1", "m1", "2026-01-01T10:00:00")])
+        first = await db.user_stats.find_one({"user_id": "u1"})
+
+        await db.watch_history.insert_one({"user_id": "u1", "content_type": "movie", "content_id": "m2", "watched_at": "2026-01-02T10:00:00"})
+        await record_watch_events(db, [event("u1", "m2", "2026-01-02T10:00:00")])
+        second = await db.user_stats.find_one({"user_id": "u1"})
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["total_views"] == 1
+    assert first["movie_ids"] == ["m1"]
+    assert second["total_views"] == 2
+    assert sorted(second["movie_ids"]) == ["m1", "m2"]
+    assert second["last_movie"]["content_id"] == "m2"
+    assert second["version"] > first["version"]
+
+
+def test_stats_update_is_idempotent_for_distinct_titles(db):
+    async def scenario():
+        await db.user_stats.insert_one({"user_id": "u1", "movie_ids": ["m1"], "total_views": 1, "version": 1})
+        replayed = event("u1", "m1", "2026-01-01T10:00:00", new_view=False)
+        await db.user_stats.bulk_write([build_stats_update(replayed), build_stats_update(replayed)])
+        return await db.user_stats.find_one({"user_id": "u1"})
+
+    stats = asyncio.run(scenario())
+    assert stats["movie_ids"] == ["m1"]
+    assert stats["total_views"] == 1
+    assert stats["version"] == 3
+
+
+def test_older_event_does_not_replace_last_movie(db):
+    async def scenario():
+        await db.user_stats.insert_one({"user_id": "u1", "version": 1, "last_movie": {"content_id": "m2", "watched_at": "2026-01-02T10:00:00"}})
+        await db.user_stats.bulk_write([build_stats_update(event("u1", "m1", "2026-01-01T10:00:00"))])
+        return await db.user_stats.find_one({"user_id": "u1"})
+
+    assert asyncio.run(scenario())["last_movie"]["content_id"] == "m2"
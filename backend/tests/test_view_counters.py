@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import view_counters
+from view_counters import VIEW_DEDUPE_SECONDS, RecentViews, flush_views, record_user_view, view_dedupe_key
+from write_behind import WriteBehindBuffer
+
+
+@pytest.fixture
+def views(db, monkeypatch):
+    """Tampon et mémoire de fenêtre neufs, vidés dans la base en mémoire"""
+    monkeypatch.setattr(view_counters, "_db", db)
+    monkeypatch.setattr(view_counters, "recent_views", RecentViews())
+    buffer = WriteBehindBuffer("test_views", flush_views, interval_seconds=60, merge=view_counters.view_buffer._merge)
+    monkeypatch.setattr(view_counters, "view_buffer", buffer)
+    return buffer
+
+
+async def shard_counts(db) -> dict:
+    counts = {}
+    async for shard in db.view_counter_shards.find():
+        key = (shard["content_type"], shard["content_id"])
+        counts[key] = counts.get(key, 0) + shard["count"]
+    return counts
+
+
+def test_view_counted_once_per_user_and_window(db, views):
+    accepted = [
+        record_user_view("u1", "movie", "m1"),
+        record_user_view("u1", "movie", "m1"),
+        record_user_view("u2", "movie", "m1"),
+        record_user_view("u1", "series", "m1"),
+    ]
+    assert accepted == [True, False, True, True]
+
+    async def scenario():
+        await views.flush()
+        return await shard_counts(db), await db.view_dedupe.count_documents({})
+
+    counts, keys = asyncio.run(scenario())
+    assert counts == {("movie", "m1"): 2, ("series", "m1"): 1}
+    assert keys == 3
+
+
+def test_view_already_counted_by_another_worker_is_dropped_at_flush(db, views):
+    async def scenario():
+        # Vue du même utilisateur déjà comptée par un autre worker
+        now = datetime.now(timezone.utc)
+        await db.view_dedupe.insert_one({"_id": view_dedupe_key("u1", "movie", "m1", now), "created_at": now})
+        record_user_view("u1", "movie", "m1")
+        record_user_view("u2", "movie", "m1")
+        await views.flush()
+        return await shard_counts(db)
+
+    assert asyncio.run(scenario()) == {("movie", "m1"): 1}
+
+
+def test_recent_views_forget_previous_window_and_stay_bounded():
+    recent = RecentViews(max_keys=2)
+    assert recent.add("a", window=1)
+    assert not recent.add("a", window=1)
+    assert recent.add("a", window=2)
+    recent.add("b", window=2)
+    # Mémoire pleine: repartir de zéro, view_dedupe reste la référence
+    assert recent.add("c", window=2)
+    assert len(recent.keys) == 1
+
+
+def test_dedupe_key_changes_with_window():
+    moment = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    key = view_dedupe_key("u1", "movie", "m1", moment)
+    assert view_dedupe_key("u1", "movie", "m1", moment + timedelta(seconds=VIEW_DEDUPE_SECONDS)) != key
+    assert view_dedupe_key("u2", "movie", "m1", moment) != key
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import watch_progress
+from watch_progress import flush_progress, history_key, merge_progress
+from write_behind import WriteBehindBuffer
+
+
+def test_history_key_is_one_row_per_movie():
+    heartbeat = {"user_id": "u1", "content_type": "movie", "content_id": "m1", "position": 120, "watched_at": "2026-01-01T10:00:00"}
+    assert history_key(heartbeat) == {"user_id": "u1", "content_type": "movie", "content_id": "m1", "episode_id": None}
+
+
+def test_history_key_is_one_row_per_episode():
+    first = {"user_id": "u1", "content_type": "series", "content_id": "s1", "episode_id": "e1", "position": 30}
+    second = {**first, "episode_id": "e2"}
+    assert history_key(first)["episode_id"] == "e1"
+    assert history_key(first) != history_key(second)
+    # La position ne fait pas partie de la clé: les battements d'un même épisode sont fusionnés
+    assert history_key(first) == history_key({**first, "position": 900})
+
+
+def heartbeat(position: int) -> dict:
+    return {"user_id": "u1", "content_type": "movie", "content_id": "m1", "position": position, "watched_at": f"2026-01-01T10:00:{position:02d}"}
+
+
+def test_new_view_survives_a_failed_flush_and_a_newer_heartbeat(db, monkeypatch):
+    events = []
+    attempts = 0
+
+    async def flaky_record_watch_events(db, batch):
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise ConnectionError("MongoDB indisponible")
+        events.extend(batch)
+
+    monkeypatch.setattr(watch_progress, "_db", db)
+    monkeypatch.setattr(watch_progress, "record_watch_events", flaky_record_watch_events)
+
+    async def scenario():
+        buffer = WriteBehindBuffer("test_progress", flush_progress, interval_seconds=60, merge=merge_progress)
+        key = tuple(history_key(heartbeat(0)).values())
+        buffer.add(key, heartbeat(5))
+        assert await buffer.flush() == 0  # ligne créée, statistiques en échec
+        buffer.add(key, heartbeat(10))
+        assert await buffer.flush() == 1
+        return await db.watch_history.count_documents({})
+
+    assert asyncio.run(scenario()) == 1
+    assert [(event["position"], event["new_view"]) for event in events] == [(10, True)]
+
+
+@pytest.mark.parametrize("old, new, expected", [
+    ({"position": 1, "new_view": True}, {"position": 2}, {"position": 2, "new_view": True}),
+    ({"position": 1}, {"position": 2}, {"position": 2}),
+])
+def test_merge_progress_keeps_latest_heartbeat_and_new_view(old, new, expected):
+    assert merge_progress(old, new) == expected
@@ -0,0 +1,107 @@
+import asyncio
+
+from write_behind import WriteBehindBuffer
+
+
+async def _append(written: list, items: list):
+    written.append(items)
+
+
+def add_counts(old: dict, new: dict) -> dict:
+    return {**old, "count": old["count"] + new["count"]}
+
+
+def test_add_merges_values_for_the_same_key():
+    async def scenario():
+        written = []
+        buffer = WriteBehindBuffer("test", lambda items: _append(written, items), interval_seconds=60, merge=add_counts)
+        buffer.add("a", {"id": "a", "count": 1})
+        buffer.add("a", {"id": "a", "count": 2})
+        buffer.add("b", {"id": "b", "count": 1})
+        assert len(buffer) == 2
+        assert await buffer.flush() == 2
+        assert len(buffer) == 0
+        assert await buffer.flush() == 0
+        return written
+
+    assert asyncio.run(scenario()) == [[{"id": "a", "count": 3}, {"id": "b", "count": 1}]]
+
+
+def test_default_merge_keeps_the_latest_value():
+    async def scenario():
+        written = []
+        buffer = WriteBehindBuffer("test", lambda items: _append(written, items), interval_seconds=60)
+        buffer.add("a", {"position": 10})
+        buffer.add("a", {"position": 42})
+        await buffer.flush()
+        return written
+
+    assert asyncio.run(scenario()) == [[{"position": 42}]]
+
+
+def test_failed_flush_requeues_items_under_newer_writes():
+    async def scenario():
+        written = []
+        attempts = 0
+
+        async def flaky_flush(items):
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                # Écriture arrivée pendant le vidage, puis échec de MongoDB
+                buffer.add("a", {"id": "a", "count": 5})
+                raise ConnectionError("MongoDB indisponible")
+            written.append(items)
+
+        buffer = WriteBehindBuffer("test", flaky_flush, interval_seconds=60, merge=add_counts)
+        buffer.add("a", {"id": "a", "count": 1})
+        buffer.add("b", {"id": "b", "count": 2})
+        assert await buffer.flush() == 0
+        assert len(buffer) == 2
+        assert await buffer.flush() == 2
+        return written
+
+    (items,) = asyncio.run(scenario())
+    assert sorted(items, key=lambda item: item["id"]) == [{"id": "a", "count": 6}, {"id": "b", "count": 2}]
+
+
+def test_reaching_max_items_wakes_the_flush_loop():
+    async def scenario():
+        written = []
+        buffer = WriteBehindBuffer("test", lambda items: _append(written, items), interval_seconds=60, max_items=2)
+        runner = asyncio.create_task(buffer.run())
+        buffer.add("a", {})
+        buffer.add("b", {})
+        for _ in range(10):
+            await asyncio.sleep(0)
+        runner.cancel()
+        return written
+
+    assert len(asyncio.run(scenario())) == 1
+
+
+def test_pending_items_are_capped_while_flushes_fail():
+    async def scenario():
+        async def failing_flush(items):
+            raise ConnectionError("MongoDB indisponible")
+
+        buffer = WriteBehindBuffer("test", failing_flush, interval_seconds=60, max_items=2, max_pending=3)
+        for key in "abc":
+            buffer.add(key, {"id": key})
+        buffer.add("d", {"id": "d"})  # tampon plein: perdu
+        buffer.add("a", {"id": "a", "v": 2})  # clé connue: fusionnée
+        assert len(buffer) == 3
+
+        # Pendant le vidage en échec, de nouvelles clés occupent la place libérée
+        original = buffer._flush
+
+        async def flush_then_refill(items):
+            for key in "xyz":
+                buffer.add(key, {"id": key})
+            await original(items)
+
+        buffer._flush = flush_then_refill
+        assert await buffer.flush() == 0
+        return sorted(buffer._pending)
+
+    assert asyncio.run(scenario()) == ["x", "y", "z"]
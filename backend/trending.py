@@ -0,0 +1,138 @@
+"""
+Tendances: scores de vues à décroissance exponentielle
+Les tranches horaires de vues (agrégées et pas encore agrégées) sont lues par lots et
+converties en tableaux NumPy hors de la boucle asyncio, puis tous les titres sont notés d'un coup:
+    score = somme(vues * 2^(-âge / demi-vie))
+"""
+import asyncio
+import os
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from rails import save_rail
+
+logger = logging.getLogger(__name__)
+
+HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_INTERVAL_SECONDS = float(os.environ.get('TRENDING_INTERVAL_MINUTES', '15')) * 60
+# Au-delà de 7 demi-vies, une vue pèse moins de 1% d'une vue récente
+WINDOW_HOURS = int(HALF_LIFE_HOURS * 7)
+TRENDING_SIZE = 20
+LOAD_BATCH_SIZE = 10000
+
+CONTENT_COLLECTIONS = {"movie": "movies", "series": "series"}
+BUCKET_FIELDS = {"_id": 0, "content_type": 1, "content_id": 1, "hour": 1, "count": 1}
+
+
+class BucketArrays:
+    """
+    Accumule les tranches (content_type, content_id, hour, count) par lots en tableaux alignés:
+    titres distincts et, par tranche, indice du titre, âge en heures et nombre de vues.
+    add() est une boucle Python: compute_trending l'exécute dans un thread, lot par lot
+    """
+
+    def __init__(self, now: datetime):
+        self.now = now
+        self.titles: Dict[Tuple[str, str], int] = {}
+        self._ages: Dict[str, float] = {}
+        self._title_index: List[int] = []
+        self._age_hours: List[float] = []
+        self._counts: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, rows: Iterable[dict]):
+        titles, ages = self.titles, self._ages
+        for row in rows:
+            key = (row["content_type"], row["content_id"])
+            index = titles.get(key)
+            if index is None:
+                index = titles[key] = len(titles)
+            age = ages.get(row["hour"])
+            if age is None:
+                # Milieu de l'heure: une tranche en cours n'a pas un âge négatif
+                hour = datetime.strptime(row["hour"], "%Y-%m-%dT%H").replace(tzinfo=timezone.utc)
+                age = ages[row["hour"]] = max(0.0, (self.now - hour).total_seconds() / 3600 - 0.5)
+            self._title_index.append(index)
+            self._age_hours.append(age)
+            self._counts.append(row["count"])
+
+    def result(self) -> Tuple[List[Tuple[str, str]], np.ndarray, np.ndarray, np.ndarray]:
+        return (
+            list(self.titles),
+            np.array(self._title_index, dtype=np.int64),
+            np.array(self._age_hours, dtype=np.float64),
+            np.array(self._counts, dtype=np.float64),
+        )
+
+
+def build_arrays(rows: Iterable[dict], now: datetime) -> Tuple[List[Tuple[str, str]], np.ndarray, np.ndarray, np.ndarray]:
+    """Titres distincts et, par tranche: indice du titre, âge en heures, nombre de vues"""
+    arrays = BucketArrays(now)
+    arrays.add(rows)
+    return arrays.result()
+
+
+def decayed_scores(title_index: np.ndarray, age_hours: np.ndarray, counts: np.ndarray, n_titles: int, half_life_hours: float = HALF_LIFE_HOURS) -> np.ndarray:
+    """Score de chaque titre: somme de ses tranches pondérées par leur âge"""
+    weights = counts * np.exp2(-age_hours / half_life_hours)
+    return np.bincount(title_index, weights=weights, minlength=n_titles)
+
+
+def top_n(scores: np.ndarray, n: int) -> np.ndarray:
+    """Indices des n meilleurs scores, triés par score décroissant (O(len) + O(n log n))"""
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, n - 1)[:n]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def rank_titles(arrays: BucketArrays, size: int) -> Dict[str, List[Tuple[str, float]]]:
+    """Scores et meilleurs titres de chaque type (marge pour les titres masqués ou supprimés depuis)"""
+    titles, title_index, age_hours, counts = arrays.result()
+    scores = decayed_scores(title_index, age_hours, counts, len(titles))
+    content_types = np.array([content_type for content_type, _ in titles])
+    ranked = {}
+    for content_type in CONTENT_COLLECTIONS:
+        candidates = np.flatnonzero(content_types == content_type) if titles else np.empty(0, dtype=np.int64)
+        best = candidates[top_n(scores[candidates], size * 2)]
+        ranked[content_type] = [(titles[i][1], round(float(scores[i]), 3)) for i in best if scores[i] > 0]
+    return ranked
+
+
+async def load_buckets(db, now: datetime) -> BucketArrays:
+    """Lit les tranches par lots (index hour) et les ajoute aux tableaux dans un thread, sans tout garder en mémoire"""
+    since = (now - timedelta(hours=WINDOW_HOURS)).strftime("%Y-%m-%dT%H")
+    arrays = BucketArrays(now)
+    # Tranches agrégées + compteurs de l'heure en cours pas encore agrégés
+    for collection in (db.view_counts_hourly, db.view_counter_shards):
+        cursor = collection.find({"hour": {"$gte": since}}, BUCKET_FIELDS).batch_size(LOAD_BATCH_SIZE)
+        while rows := await cursor.to_list(LOAD_BATCH_SIZE):
+            await asyncio.to_thread(arrays.add, rows)
+    return arrays
+
+
+async def compute_trending(db, size: int = TRENDING_SIZE) -> Dict[str, List[dict]]:
+    """Recalcule les rails tendances des films et des séries"""
+    now = datetime.now(timezone.utc)
+    started = time.monotonic()
+    arrays = await load_buckets(db, now)
+    loaded = time.monotonic()
+    ranked = await asyncio.to_thread(rank_titles, arrays, size)
+    computed = time.monotonic()
+
+    rails = {}
+    for content_type, collection in CONTENT_COLLECTIONS.items():
+        rails[collection] = await save_rail(db, f"trending_{collection}", collection, ranked[content_type], "trending_score", size)
+
+    logger.info(
+        f"🔥 Tendances: {len(arrays.titles)} titres, {len(arrays)} tranches "
+        f"(chargement {(loaded - started) * 1000:.0f}ms, calcul {(computed - loaded) * 1000:.0f}ms)"
+    )
+    return rails
@@ -3,10 +3,10 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional
 import pyotp
-import qrcode
 import io
 import base64
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
 import jwt
 import os
 
@@ -63,6 +63,23 @@ async def get_2fa_status(current_user: dict = Depends(get_current_user)):
         "enabled": current_user.get("two_factor_enabled", False)
     }
 
+def render_qr_code(data: str) -> str:
+    """QR code PNG encodé en data URL (CPU uniquement)"""
+    # qrcode charge Pillow: importé à la première activation de la 2FA, pas au démarrage du worker
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    img = qr.make_image(fill_color="black", back_color="white")
+    
+    # Convertir en base64
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/png;base64,{qr_code_base64}"
+
 @router.post("/2fa/enable", response_model=Enable2FAResponse)
 async def enable_2fa(current_user: dict = Depends(get_current_user)):
     """Générer un secret et un QR code pour activer la 2FA"""
@@ -80,18 +97,8 @@ async def enable_2fa(current_user: dict = Depends(get_current_user)):
         issuer_name="SW STREAMING"
     )
     
-    # Générer le QR code
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(totp_uri)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convertir en base64
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
-    qr_code_data_url = f"data:image/png;base64,{qr_code_base64}"
+    # Générer le QR code (rendu PNG hors de la boucle asyncio)
+    qr_code_data_url = await asyncio.to_thread(render_qr_code, totp_uri)
     
     # Sauvegarder temporairement le secret (non activé)
     await users_collection.update_one(
@@ -100,7 +107,7 @@ async def enable_2fa(current_user: dict = Depends(get_current_user)):
             "$set": {
                 "two_factor_secret": secret,
                 "two_factor_enabled": False,
-                "updated_at": datetime.utcnow()
+                "updated_at": datetime.now(timezone.utc).isoformat()
             }
         }
     )
@@ -133,7 +140,7 @@ async def verify_2fa(
         {
             "$set": {
                 "two_factor_enabled": True,
-                "updated_at": datetime.utcnow()
+                "updated_at": datetime.now(timezone.utc).isoformat()
             }
         }
     )
@@ -156,7 +163,7 @@ async def disable_2fa(current_user: dict = Depends(get_current_user)):
         {
             "$set": {
                 "two_factor_enabled": False,
-                "updated_at": datetime.utcnow()
+                "updated_at": datetime.now(timezone.utc).isoformat()
             },
             "$unset": {
                 "two_factor_secret": ""
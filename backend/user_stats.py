@@ -0,0 +1,170 @@
+"""
+Statistiques de profil précalculées
+Un document par utilisateur dans user_stats, mis à jour à chaque événement de visionnage;
+les utilisateurs sans document sont calculés une fois depuis watch_history ($facet), à leur
+premier événement ou à la première lecture de leurs statistiques
+"""
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Les compteurs distincts sont dérivés de la taille des listes d'ids (bornées par le catalogue)
+STATS_PROJECTION = {
+    "_id": 0,
+    "total_views": 1,
+    "movies_watched": {"$size": {"$ifNull": ["$movie_ids", []]}},
+    "series_watched": {"$size": {"$ifNull": ["$series_ids", []]}},
+    "last_movie": 1,
+    "last_series": 1,
+    "version": 1,
+}
+
+
+async def ensure_indexes(db):
+    await db.user_stats.create_index("user_id", unique=True)
+    await db.watch_history.create_index([("user_id", ASCENDING), ("content_type", ASCENDING), ("watched_at", DESCENDING)])
+    await db.favorites.create_index("user_id")
+
+
+def _last_item(event: dict) -> dict:
+    item = {"content_id": event["content_id"], "title": event.get("title"), "watched_at": event["watched_at"]}
+    if event["content_type"] == "series":
+        item["season_number"] = event.get("season_number")
+        item["episode_number"] = event.get("episode_number")
+    return item
+
+
+def build_stats_update(event: dict) -> UpdateOne:
+    """
+    Opération idempotente pour les compteurs distincts et indépendante de l'ordre
+    pour les derniers contenus vus (comparaison sur watched_at)
+    Pas d'upsert: le document d'un nouvel utilisateur est calculé depuis l'historique (record_watch_events)
+    """
+    is_movie = event["content_type"] == "movie"
+    ids_field = "movie_ids" if is_movie else "series_ids"
+    last_field = "last_movie" if is_movie else "last_series"
+    return UpdateOne(
+        {"user_id": event["user_id"]},
+        [{"$set": {
+            "total_views": {"$add": [{"$ifNull": ["$total_views", 0]}, 1 if event.get("new_view") else 0]},
+            ids_field: {"$setUnion": [{"$ifNull": [f"${ids_field}", []]}, [event["content_id"]]]},
+            last_field: {"$cond": [
+                {"$gt": [event["watched_at"], {"$ifNull": [f"${last_field}.watched_at", ""]}]},
+                {"$literal": _last_item(event)},
+                f"${last_field}"
+            ]},
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}]
+    )
+
+
+async def record_watch_events(db, events: List[dict]):
+    """
+    Applique un lot d'événements de visionnage aux statistiques (un seul bulk_write)
+    Chaque événement: user_id, content_type ("movie"/"series"), content_id, title,
+    watched_at (ISO), new_view, et season_number/episode_number pour les séries
+    Appelé après l'écriture du lot dans watch_history: le document d'un utilisateur qui n'en a
+    pas encore est calculé depuis l'historique, qui contient déjà ses événements du lot. Sa
+    version change ainsi dès le premier visionnage (clé des caches par utilisateur)
+    """
+    if not events:
+        return
+    user_ids = {event["user_id"] for event in events}
+    known = set(await db.user_stats.distinct("user_id", {"user_id": {"$in": list(user_ids)}}))
+    seeded = set()
+    for user_id in user_ids - known:
+        result = await db.user_stats.update_one(
+            {"user_id": user_id}, {"$setOnInsert": await _stats_from_history(db, user_id)}, upsert=True
+        )
+        # Document créé entre-temps par un autre worker: appliquer les événements comme d'habitude
+        if result.upserted_id is not None:
+            seeded.add(user_id)
+
+    operations = [build_stats_update(event) for event in events if event["user_id"] not in seeded]
+    if operations:
+        await db.user_stats.bulk_write(operations, ordered=False)
+
+
+async def _stats_from_history(db, user_id: str) -> dict:
+    """Document user_stats complet calculé depuis watch_history en une seule agrégation"""
+    def last_of(content_type: str, collection: str) -> list:
+        return [
+            {"$match": {"content_type": content_type}},
+            {"$limit": 1},
+            {"$lookup": {"from": collection, "localField": "content_id", "foreignField": "id", "as": "content"}},
+            {"$project": {
+                "_id": 0,
+                "content_id": 1,
+                "watched_at": 1,
+                "season_number": 1,
+                "episode_number": 1,
+                "title": {"$arrayElemAt": ["$content.title", 0]}
+            }}
+        ]
+
+    def distinct_ids(content_type: str) -> list:
+        return [
+            {"$match": {"content_type": content_type}},
+            {"$group": {"_id": None, "ids": {"$addToSet": "$content_id"}}}
+        ]
+
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$sort": {"watched_at": -1}},
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            "movie_ids": distinct_ids("movie"),
+            "series_ids": distinct_ids("series"),
+            "last_movie": last_of("movie", "movies"),
+            "last_series": last_of("series", "series"),
+        }}
+    ]
+    result = (await db.watch_history.aggregate(pipeline).to_list(1))[0]
+
+    last_movie = result["last_movie"][0] if result["last_movie"] else None
+    if last_movie:
+        last_movie.pop("season_number", None)
+        last_movie.pop("episode_number", None)
+    return {
+        "user_id": user_id,
+        "total_views": result["total"][0]["n"] if result["total"] else 0,
+        "movie_ids": result["movie_ids"][0]["ids"] if result["movie_ids"] else [],
+        "series_ids": result["series_ids"][0]["ids"] if result["series_ids"] else [],
+        "last_movie": last_movie,
+        "last_series": result["last_series"][0] if result["last_series"] else None,
+        "version": 1,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+
+
+async def compute_user_stats(db, user_id: str) -> dict:
+    """Calcul complet depuis watch_history, puis mémorisation"""
+    doc = await _stats_from_history(db, user_id)
+    # $setOnInsert: ne jamais écraser un document créé entre-temps
+    await db.user_stats.update_one({"user_id": user_id}, {"$setOnInsert": doc}, upsert=True)
+    logger.info(f"📊 Statistiques calculées pour l'utilisateur {user_id}")
+
+    doc["movies_watched"] = len(doc.pop("movie_ids"))
+    doc["series_watched"] = len(doc.pop("series_ids"))
+    return doc
+
+
+async def get_user_stats_doc(db, user_id: str) -> dict:
+    """Une lecture indexée; calcul complet uniquement pour un utilisateur sans document"""
+    stats = await db.user_stats.find_one({"user_id": user_id}, STATS_PROJECTION)
+    if stats is None:
+        stats = await compute_user_stats(db, user_id)
+    return stats
+
+
+def format_last_series(last_series: Optional[dict]) -> Optional[str]:
+    if not last_series or not last_series.get("title"):
+        return None
+    season_num = last_series.get("season_number", "?")
+    episode_num = last_series.get("episode_number", "?")
+    return f"{last_series['title']} S{season_num}E{episode_num}"
@@ -0,0 +1,227 @@
+"""
+Compteurs de vues et rails "les plus regardés"
+Les vues sont regroupées en mémoire par titre puis ajoutées à un compteur pris au hasard
+parmi VIEW_COUNTER_SHARDS documents: un titre très regardé ne concentre pas les écritures
+sur un seul document. Une tâche périodique agrège les compteurs en tranches horaires et
+journalières, puis recalcule les rails "les plus regardés" (voir rails.py).
+Une vue n'est comptée qu'une fois par utilisateur, titre et fenêtre de VIEW_DEDUPE_HOURS: chaque
+worker écarte en mémoire les vues qu'il a déjà reçues, puis le vidage insère les clés de fenêtre
+du lot dans view_dedupe (clé unique, expirée par un index TTL) en une seule écriture et ne compte
+que les clés nouvelles (un utilisateur servi par plusieurs workers)
+"""
+import os
+import random
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from rails import save_rail
+from write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+VIEW_COUNTER_SHARDS = int(os.environ.get('VIEW_COUNTER_SHARDS', '8'))
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('VIEW_COUNTER_FLUSH_SECONDS', '10'))
+ROLLUP_INTERVAL_SECONDS = float(os.environ.get('VIEW_ROLLUP_MINUTES', '15')) * 60
+# Une heure n'est agrégée qu'une fois close depuis ce délai (vidages tardifs des workers)
+ROLLUP_GRACE = timedelta(minutes=10)
+HOURLY_RETENTION_DAYS = 8
+DAILY_RETENTION_DAYS = 90
+RAIL_DAYS = 7
+RAIL_SIZE = 20
+VIEW_DEDUPE_SECONDS = float(os.environ.get('VIEW_DEDUPE_HOURS', '6')) * 3600
+# Clés de la fenêtre en cours gardées par worker (au-delà, seul view_dedupe déduplique)
+VIEW_DEDUPE_MAX_KEYS = int(os.environ.get('VIEW_DEDUPE_MAX_KEYS', '200000'))
+
+CONTENT_COLLECTIONS = {"movie": "movies", "series": "series"}
+
+# MongoDB (sera importé depuis server.py)
+_db = None
+
+def init_db(db):
+    """Initialiser la connexion à la base de données"""
+    global _db
+    _db = db
+
+
+def _hour_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H")
+
+
+def _day_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+
+async def ensure_indexes(db):
+    await db.view_counter_shards.create_index("hour")
+    await db.view_counts_hourly.create_index("day")
+    # Fenêtre des tendances (trending.load_buckets)
+    await db.view_counts_hourly.create_index("hour")
+    await db.view_counts_daily.create_index([("content_type", ASCENDING), ("day", ASCENDING)])
+    # Une clé de fenêtre n'est plus utile une fois la fenêtre suivante commencée
+    await db.view_dedupe.create_index("created_at", expireAfterSeconds=int(2 * VIEW_DEDUPE_SECONDS))
+
+
+async def _new_dedupe_keys(keys: List[str], now: datetime) -> set:
+    """Insère les clés de fenêtre (non ordonné) et renvoie celles qui n'existaient pas encore"""
+    if not keys:
+        return set()
+    try:
+        await _db.view_dedupe.insert_many([{"_id": key, "created_at": now} for key in keys], ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        duplicates = {error["index"] for error in errors}
+        return {key for index, key in enumerate(keys) if index not in duplicates}
+    return set(keys)
+
+
+async def flush_views(items: List[dict]):
+    """Déduplique les vues du lot puis fait un $inc par titre sur un compteur aléatoire de l'heure en cours"""
+    now = datetime.now(timezone.utc)
+    # Si l'écriture des compteurs échoue ensuite, les vues remises en tampon sont déjà marquées:
+    # elles sont perdues, comme le serait un intervalle de vidage en cas d'arrêt brutal
+    new_keys = await _new_dedupe_keys([key for item in items for key in item["dedupe_keys"]], now)
+    items = [
+        {**item, "count": sum(1 for key in item["dedupe_keys"] if key in new_keys)}
+        for item in items
+    ]
+    hour = _hour_key(now)
+    operations = [
+        UpdateOne(
+            {"_id": f"{item['content_type']}:{item['content_id']}:{hour}:{random.randrange(VIEW_COUNTER_SHARDS)}"},
+            {
+                "$inc": {"count": item["count"]},
+                "$setOnInsert": {"content_type": item["content_type"], "content_id": item["content_id"], "hour": hour}
+            },
+            upsert=True
+        )
+        for item in items
+        if item["count"]
+    ]
+    if operations:
+        await _db.view_counter_shards.bulk_write(operations, ordered=False)
+
+
+view_buffer = WriteBehindBuffer(
+    "view_counters",
+    flush_views,
+    interval_seconds=FLUSH_INTERVAL_SECONDS,
+    merge=lambda old, new: {**old, "dedupe_keys": old["dedupe_keys"] + new["dedupe_keys"]}
+)
+
+
+def _window(moment: datetime) -> int:
+    return int(moment.timestamp() // VIEW_DEDUPE_SECONDS)
+
+
+def view_dedupe_key(user_id: str, content_type: str, content_id: str, moment: datetime) -> str:
+    return f"{user_id}:{content_type}:{content_id}:{_window(moment)}"
+
+
+class RecentViews:
+    """Clés de vue déjà reçues par ce worker dans la fenêtre en cours (oubliées au changement de fenêtre)"""
+
+    def __init__(self, max_keys: int = VIEW_DEDUPE_MAX_KEYS):
+        self.max_keys = max_keys
+        self.window = None
+        self.keys = set()
+
+    def add(self, key: str, window: int) -> bool:
+        """False si la clé a déjà été vue"""
+        if window != self.window or len(self.keys) >= self.max_keys:
+            self.window = window
+            self.keys = set()
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+
+recent_views = RecentViews()
+
+
+def record_user_view(user_id: str, content_type: str, content_id: str) -> bool:
+    """
+    Enregistre la vue d'un utilisateur, sans I/O; False si ce worker l'a déjà reçue dans la fenêtre
+    en cours. Une vue déjà comptée par un autre worker est écartée au vidage
+    """
+    now = datetime.now(timezone.utc)
+    key = view_dedupe_key(user_id, content_type, content_id, now)
+    if not recent_views.add(key, _window(now)):
+        return False
+    view_buffer.add((content_type, content_id), {"content_type": content_type, "content_id": content_id, "dedupe_keys": [key]})
+    return True
+
+
+def _merge_by_key(into: str, key_field: str) -> List[dict]:
+    """Fin de pipeline: remplace le document agrégé (idempotent si l'agrégation est rejouée)"""
+    # updated_at: filigrane des snapshots incrémentaux
+    projection = {
+        "_id": {"$concat": ["$_id.content_type", ":", "$_id.content_id", ":", f"$_id.{key_field}"]},
+        "content_type": "$_id.content_type",
+        "content_id": "$_id.content_id",
+        key_field: f"$_id.{key_field}",
+        "count": 1,
+        "updated_at": {"$literal": datetime.now(timezone.utc).isoformat()}
+    }
+    if key_field == "hour":
+        projection["day"] = {"$substrCP": ["$_id.hour", 0, 10]}
+    return [
+        {"$project": projection},
+        {"$merge": {"into": into, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+
+async def rollup_views(db):
+    """Agrège les compteurs des heures closes en tranches horaires puis journalières"""
+    now = datetime.now(timezone.utc)
+    hours = await db.view_counter_shards.distinct("hour", {"hour": {"$lt": _hour_key(now - ROLLUP_GRACE)}})
+    if hours:
+        await db.view_counter_shards.aggregate([
+            {"$match": {"hour": {"$in": hours}}},
+            {"$group": {
+                "_id": {"content_type": "$content_type", "content_id": "$content_id", "hour": "$hour"},
+                "count": {"$sum": "$count"}
+            }},
+            *_merge_by_key("view_counts_hourly", "hour")
+        ]).to_list(None)
+        await db.view_counter_shards.delete_many({"hour": {"$in": hours}})
+
+        # Recalculer entièrement les jours touchés depuis les tranches horaires
+        days = sorted({hour[:10] for hour in hours})
+        await db.view_counts_hourly.aggregate([
+            {"$match": {"day": {"$in": days}}},
+            {"$group": {
+                "_id": {"content_type": "$content_type", "content_id": "$content_id", "day": "$day"},
+                "count": {"$sum": "$count"}
+            }},
+            *_merge_by_key("view_counts_daily", "day")
+        ]).to_list(None)
+        logger.info(f"📈 Vues agrégées pour {len(hours)} heure(s)")
+
+    await db.view_counts_hourly.delete_many({"day": {"$lt": _day_key(now - timedelta(days=HOURLY_RETENTION_DAYS))}})
+    await db.view_counts_daily.delete_many({"day": {"$lt": _day_key(now - timedelta(days=DAILY_RETENTION_DAYS))}})
+
+    for content_type in CONTENT_COLLECTIONS:
+        await compute_most_watched(db, content_type)
+
+
+async def compute_most_watched(db, content_type: str, days: int = RAIL_DAYS, size: int = RAIL_SIZE) -> List[dict]:
+    """Titres les plus regardés sur `days` jours, mémorisés dans la collection rails"""
+    collection = CONTENT_COLLECTIONS[content_type]
+    since = _day_key(datetime.now(timezone.utc) - timedelta(days=days - 1))
+    top = await db.view_counts_daily.aggregate([
+        {"$match": {"content_type": content_type, "day": {"$gte": since}}},
+        {"$group": {"_id": "$content_id", "views": {"$sum": "$count"}}},
+        {"$sort": {"views": -1}},
+        # Marge pour les titres masqués ou supprimés depuis
+        {"$limit": size * 2}
+    ]).to_list(None)
+
+    ranked = [(t["_id"], t["views"]) for t in top]
+    return await save_rail(db, f"most_watched_{collection}", collection, ranked, "views_week", size)
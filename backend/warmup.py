@@ -0,0 +1,87 @@
+"""
+Préchauffage d'un worker avant de recevoir du trafic
+Pendant le démarrage (lifespan, avant que uvicorn n'accepte des connexions sur le socket partagé
+de gunicorn), le worker attend MongoDB puis exécute les étapes de préchauffage (pool de connexions,
+caches, clients HTTP...), dans la limite de WARMUP_DEADLINE_SECONDS: un worker ne reçoit donc pas
+de requêtes à froid. Au-delà de ce délai (MongoDB injoignable), le préchauffage continue en tâche
+de fond et /ready répond 503 jusqu'à sa fin. /live indique seulement que le processus répond.
+À l'arrêt, uvicorn ferme le socket d'écoute avant toute autre chose: le répartiteur de charge le
+constate par l'échec de connexion, /ready n'a pas d'état « arrêt en cours »
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WARMUP_STEP_TIMEOUT_SECONDS = float(os.environ.get('WARMUP_STEP_TIMEOUT_SECONDS', '30'))
+# Doit rester sous le timeout des workers gunicorn (120s): aucun battement pendant le lifespan
+WARMUP_DEADLINE_SECONDS = float(os.environ.get('WARMUP_DEADLINE_SECONDS', '60'))
+MONGO_RETRY_MAX_SECONDS = 30
+
+Step = Tuple[str, Callable[[], Awaitable]]
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.steps: Dict[str, dict] = {}
+
+    def status(self) -> dict:
+        state = "ready" if self.ready else "warming_up"
+        return {"status": state, "uptime_seconds": round(time.monotonic() - self.started_at, 1), "warmup": self.steps}
+
+
+readiness = Readiness()
+
+
+async def wait_for_mongo(db):
+    """Réessaie le ping jusqu'au succès (MongoDB peut démarrer après l'application)"""
+    delay = 0.5
+    while True:
+        try:
+            await db.command("ping")
+            return
+        except Exception as e:
+            logger.warning(f"⏳ MongoDB indisponible ({e}), nouvel essai dans {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MONGO_RETRY_MAX_SECONDS)
+
+
+async def open_connection_pool(db, size: int):
+    """`size` commandes simultanées: chacune emprunte une connexion, le pool en ouvre autant"""
+    await asyncio.gather(*(db.command("ping") for _ in range(size)))
+
+
+async def run_warmup(db, steps: List[Step]):
+    """Exécute les étapes dans l'ordre; une étape en échec est journalisée sans bloquer la disponibilité"""
+    started = time.perf_counter()
+    await wait_for_mongo(db)
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            await asyncio.wait_for(step(), WARMUP_STEP_TIMEOUT_SECONDS)
+            outcome = "ok"
+        except Exception as e:
+            outcome = f"erreur: {e}" if not isinstance(e, asyncio.TimeoutError) else "délai dépassé"
+            logger.warning(f"⚠️ Préchauffage {name}: {outcome}")
+        readiness.steps[name] = {"result": outcome, "ms": round((time.perf_counter() - step_started) * 1000, 1)}
+    readiness.ready = True
+    logger.info(f"🔥 Worker prêt après {time.perf_counter() - started:.2f}s de préchauffage")
+
+
+async def warm_up_before_serving(db, steps: List[Step], deadline: float = WARMUP_DEADLINE_SECONDS) -> Optional[asyncio.Task]:
+    """
+    Attend le préchauffage au plus `deadline` secondes; s'il n'est pas terminé, renvoie sa tâche,
+    qui continue en arrière-plan (à annuler à l'arrêt)
+    """
+    task = asyncio.create_task(run_warmup(db, steps))
+    try:
+        await asyncio.wait_for(asyncio.shield(task), deadline)
+        return None
+    except asyncio.TimeoutError:
+        logger.warning(f"⏳ Préchauffage inachevé après {deadline:.0f}s: le worker démarre, /ready reste à 503 jusqu'à sa fin")
+        return task
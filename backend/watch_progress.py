@@ -0,0 +1,120 @@
+"""
+Progression de lecture côté serveur
+Les battements du lecteur sont regroupés par (utilisateur, contenu) dans un tampon
+write-behind puis écrits dans watch_history en un seul bulk upsert non ordonné
+"""
+import os
+import uuid
+import logging
+from datetime import datetime, timezone
+from typing import List
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from user_stats import record_watch_events
+from write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('WATCH_PROGRESS_FLUSH_SECONDS', '10'))
+MAX_PENDING = 20000
+
+# MongoDB (sera importé depuis server.py)
+_db = None
+
+def init_db(db):
+    """Initialiser la connexion à la base de données"""
+    global _db
+    _db = db
+
+
+async def ensure_indexes(db):
+    await db.watch_history.create_index([
+        ("user_id", ASCENDING), ("content_type", ASCENDING), ("content_id", ASCENDING), ("episode_id", ASCENDING)
+    ])
+
+
+def history_key(item: dict) -> dict:
+    """Une ligne d'historique par film, ou par épisode pour les séries"""
+    return {
+        "user_id": item["user_id"],
+        "content_type": item["content_type"],
+        "content_id": item["content_id"],
+        "episode_id": item.get("episode_id"),
+    }
+
+
+async def _titles(db, items: List[dict]) -> dict:
+    movie_ids = list({i["content_id"] for i in items if i["content_type"] == "movie"})
+    series_ids = list({i["content_id"] for i in items if i["content_type"] == "series"})
+    titles = {}
+    if movie_ids:
+        async for movie in db.movies.find({"id": {"$in": movie_ids}}, {"_id": 0, "id": 1, "title": 1}):
+            titles[movie["id"]] = movie.get("title")
+    if series_ids:
+        async for series in db.series.find({"id": {"$in": series_ids}}, {"_id": 0, "id": 1, "title": 1}):
+            titles[series["id"]] = series.get("title")
+    return titles
+
+
+async def flush_progress(items: List[dict]):
+    """Écrit un lot de progressions puis met à jour les statistiques des utilisateurs"""
+    now = datetime.now(timezone.utc).isoformat()
+    operations = [
+        UpdateOne(
+            history_key(item),
+            {
+                "$set": {
+                    "position": item["position"],
+                    "duration": item.get("duration"),
+                    "season_number": item.get("season_number"),
+                    "episode_number": item.get("episode_number"),
+                    "watched_at": item["watched_at"],
+                    "updated_at": now
+                },
+                "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now}
+            },
+            upsert=True
+        )
+        for item in items
+    ]
+    # Les lignes créées par ce lot sont de nouvelles vues. Marquées sur l'élément lui-même: si la suite
+    # échoue, l'élément remis en tampon garde l'information (la ligne existera au prochain essai)
+    try:
+        result = await _db.watch_history.bulk_write(operations, ordered=False)
+        upserted = result.upserted_ids.keys()
+    except BulkWriteError as e:
+        for entry in e.details.get("upserted", []):
+            items[entry["index"]]["new_view"] = True
+        raise
+    for index in upserted:
+        items[index]["new_view"] = True
+
+    titles = await _titles(_db, items)
+    await record_watch_events(_db, [
+        {**item, "title": titles.get(item["content_id"]), "new_view": item.get("new_view", False)}
+        for item in items
+    ])
+
+
+def merge_progress(old: dict, new: dict) -> dict:
+    """Le dernier battement l'emporte, sans perdre une nouvelle vue déjà constatée sur l'ancien"""
+    if old.get("new_view") and not new.get("new_view"):
+        return {**new, "new_view": True}
+    return new
+
+
+progress_buffer = WriteBehindBuffer(
+    "watch_progress",
+    flush_progress,
+    interval_seconds=FLUSH_INTERVAL_SECONDS,
+    max_items=MAX_PENDING,
+    merge=merge_progress
+)
+
+
+def record_progress(item: dict):
+    """Enregistre un battement: le dernier battement d'un même contenu remplace les précédents"""
+    key = tuple(history_key(item).values())
+    progress_buffer.add(key, item)
@@ -0,0 +1,92 @@
+"""
+Tampon d'écriture différée (write-behind)
+Les écritures pour une même clé sont fusionnées en mémoire puis vidées
+périodiquement en un seul lot; un crash perd au plus un intervalle de vidage.
+Un lot dont l'écriture échoue est remis en tampon (fusionné sous les écritures plus récentes);
+au-delà de `max_pending` clés, les nouveaux éléments sont perdus et comptés
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+from metrics import WRITE_BEHIND_DROPPED, WRITE_BEHIND_FAILURES, WRITE_BEHIND_ITEMS
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        name: str,
+        flush: Callable[[List[dict]], Awaitable],
+        interval_seconds: float,
+        max_items: int = 10000,
+        merge: Optional[Callable[[dict, dict], dict]] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.name = name
+        self._flush = flush
+        self._interval = interval_seconds
+        self._max_items = max_items
+        # Borne la mémoire quand la base reste indisponible (vidages en échec successifs)
+        self._max_pending = max_pending or 10 * max_items
+        self._merge = merge or (lambda old, new: new)
+        self._pending: Dict[Hashable, dict] = {}
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, key: Hashable, value: dict):
+        """O(1), sans I/O: appelé directement depuis les routes"""
+        if key in self._pending:
+            value = self._merge(self._pending[key], value)
+        elif len(self._pending) >= self._max_pending:
+            WRITE_BEHIND_DROPPED.labels(self.name).inc()
+            return
+        self._pending[key] = value
+        if len(self._pending) >= self._max_items:
+            self._full.set()
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            items, self._pending = self._pending, {}
+            started = time.monotonic()
+            try:
+                await self._flush(list(items.values()))
+            except Exception as e:
+                # Remettre les éléments non écrits sans écraser les plus récents; `flush` peut les
+                # avoir annotés (ex: nouvelle vue déjà créée), `merge` conserve ces annotations
+                dropped = 0
+                for key, value in items.items():
+                    if key in self._pending:
+                        self._pending[key] = self._merge(value, self._pending[key])
+                    elif len(self._pending) < self._max_pending:
+                        self._pending[key] = value
+                    else:
+                        dropped += 1
+                WRITE_BEHIND_FAILURES.labels(self.name).inc()
+                if dropped:
+                    WRITE_BEHIND_DROPPED.labels(self.name).inc(dropped)
+                logger.error(f"❌ Vidage {self.name} échoué ({len(items) - dropped} éléments conservés, {dropped} perdus): {e}")
+                return 0
+            WRITE_BEHIND_ITEMS.labels(self.name).inc(len(items))
+            logger.debug(f"💾 {self.name}: {len(items)} éléments écrits en {(time.monotonic() - started) * 1000:.0f}ms")
+            return len(items)
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def close(self):
+        """Dernier vidage à l'arrêt du worker"""
+        await self.flush()
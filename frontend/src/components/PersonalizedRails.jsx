@@ -0,0 +1,70 @@
+import React, { useState, useEffect } from 'react';
+import { useNavigate } from 'react-router-dom';
+import axiosInstance from '../utils/axios';
+import { useAuth } from '../context/AuthContext';
+
+// Rails personnalisés ("Parce que vous avez regardé...", "Vos genres")
+const PersonalizedRails = () => {
+  const { user } = useAuth();
+  const [rails, setRails] = useState([]);
+  const navigate = useNavigate();
+
+  useEffect(() => {
+    if (user) {
+      fetchRails();
+    } else {
+      setRails([]);
+    }
+  }, [user]);
+
+  const fetchRails = async () => {
+    try {
+      const res = await axiosInstance.get('/me/rails');
+      setRails(res.data.rails || []);
+    } catch (error) {
+      console.error('Erreur chargement rails personnalisés:', error);
+    }
+  };
+
+  if (rails.length === 0) return null;
+
+  return (
+    <>
+      {rails.map((rail) => (
+        <section key={rail.id} className="py-8 bg-black">
+          <div className="relative px-4 md:px-8 lg:px-16 max-w-[2000px] mx-auto">
+            <h2 className="text-2xl md:text-3xl font-bold text-white mb-6">
+              {rail.title}
+            </h2>
+            <div
+              className="flex gap-2 md:gap-3 overflow-x-auto scrollbar-hide scroll-smooth pb-4"
+              style={{ scrollbarWidth: 'none', msOverflowStyle: 'none' }}
+            >
+              {rail.items.map((item) => (
+                <div
+                  key={`${item.content_type}-${item.id}`}
+                  className="group/card cursor-pointer flex-shrink-0 w-[150px] sm:w-[170px] md:w-[200px] lg:w-[220px]"
+                  onClick={() => navigate(item.content_type === 'movie' ? `/movie/${item.id}` : `/series/${item.id}`)}
+                >
+                  <div className="relative aspect-[2/3] rounded-lg overflow-hidden bg-gray-900 shadow-lg mb-3">
+                    <img
+                      src={item.poster_url}
+                      alt={item.title}
+                      className="w-full h-full object-cover transition-all duration-300 group-hover/card:scale-105"
+                      loading="lazy"
+                    />
+                  </div>
+                  <h3 className="font-semibold text-sm line-clamp-2 group-hover/card:text-[#e50914] transition-colors">
+                    {item.title}
+                  </h3>
+                </div>
+              ))}
+            </div>
+          </div>
+        </section>
+      ))}
+    </>
+  );
+};
+
+export default PersonalizedRails;
@@ -0,0 +1,62 @@
+import React, { useState, useEffect } from 'react';
+import { useNavigate } from 'react-router-dom';
+import axios from 'axios';
+
+const BACKEND_URL = import.meta.env.VITE_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+// Rail "Titres similaires" (index précalculé côté serveur)
+const SimilarTitles = ({ type, id }) => {
+  const [items, setItems] = useState([]);
+  const navigate = useNavigate();
+
+  useEffect(() => {
+    fetchSimilar();
+  }, [type, id]);
+
+  const fetchSimilar = async () => {
+    try {
+      const res = await axios.get(`${API}/${type}/${id}/similar?limit=12`);
+      setItems(type === 'movies' ? res.data.movies : res.data.series);
+    } catch (error) {
+      console.error('Erreur chargement titres similaires:', error);
+      setItems([]);
+    }
+  };
+
+  if (items.length === 0) return null;
+
+  return (
+    <div className="space-y-3">
+      <h3 className="text-xl font-semibold">
+        {type === 'movies' ? 'Films similaires' : 'Séries similaires'}
+      </h3>
+      <div
+        className="flex gap-3 overflow-x-auto scrollbar-hide pb-4"
+        style={{ scrollbarWidth: 'none', msOverflowStyle: 'none' }}
+      >
+        {items.map((item) => (
+          <div
+            key={item.id}
+            className="group/card cursor-pointer flex-shrink-0 w-[120px] md:w-[150px]"
+            onClick={() => navigate(type === 'movies' ? `/movie/${item.id}` : `/series/${item.id}`)}
+          >
+            <div className="aspect-[2/3] rounded-lg overflow-hidden bg-gray-900 mb-2">
+              <img
+                src={item.poster_url}
+                alt={item.title}
+                className="w-full h-full object-cover transition-all duration-300 group-hover/card:scale-105"
+                loading="lazy"
+              />
+            </div>
+            <p className="text-sm font-medium line-clamp-2 group-hover/card:text-[#e50914] transition-colors">
+              {item.title}
+            </p>
+          </div>
+        ))}
+      </div>
+    </div>
+  );
+};
+
+export default SimilarTitles;
@@ -6,7 +6,13 @@ import { ChevronLeft, ChevronRight } from 'lucide-react';
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
-const Top10Section = ({ type, title }) => {
+// Classement affiché: meilleures notes TMDB ou tendances (vues récentes)
+const ENDPOINTS = {
+  top: { movies: '/top-movies', series: '/top-series' },
+  trending: { movies: '/trending-movies', series: '/trending-series' }
+};
+
+const Top10Section = ({ type, title, ranking = 'top' }) => {
   const [items, setItems] = useState([]);
   const [loading, setLoading] = useState(true);
   const [scrollState, setScrollState] = useState({ atStart: true, atEnd: false });
@@ -15,11 +21,11 @@ const Top10Section = ({ type, title }) => {
 
   useEffect(() => {
     fetchTop10();
-  }, [type]);
+  }, [type, ranking]);
 
   const fetchTop10 = async () => {
     try {
-      const endpoint = type === 'movies' ? '/top-movies' : '/top-series';
+      const endpoint = ENDPOINTS[ranking][type];
       const res = await axios.get(`${API}${endpoint}?limit=10`);
       setItems(type === 'movies' ? res.data.movies : res.data.series);
     } catch (error) {
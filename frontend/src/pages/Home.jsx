@@ -6,6 +6,7 @@ import { Button } from '../components/ui/button';
 import Navbar from '../components/Navbar';
 import RecentContent from '../components/RecentContent';
 import { Top10Section } from '../components/Top10';
+import PersonalizedRails from '../components/PersonalizedRails';
 
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -237,7 +238,14 @@ const Home = () => {
         </div>
       )}
 
-      {/* Structure: Top 10 Films -> Films Récents -> Top 10 Séries -> Séries Récentes */}
+      {/* Structure: Pour vous -> Tendances -> Top 10 Films -> Films Récents -> Top 10 Séries -> Séries Récentes */}
+      
+      {/* Rails personnalisés (utilisateurs connectés avec un historique) */}
+      <PersonalizedRails />
+      
+      {/* Tendances (masquées tant qu'aucune vue n'a été agrégée) */}
+      <Top10Section type="movies" ranking="trending" title="Films en tendance" />
+      <Top10Section type="series" ranking="trending" title="Séries en tendance" />
       
       {/* Top 10 Films */}
       <Top10Section type="movies" title="Top 10 Films" />
@@ -6,6 +6,7 @@ import { Button } from '../components/ui/button';
 import { toast } from 'sonner';
 import { useAuth } from '../context/AuthContext';
 import AdModal from '../components/AdModal';
+import SimilarTitles from '../components/SimilarTitles';
 
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -294,6 +295,9 @@ const MovieDetail = () => {
                   </div>
                 </div>
               )}
+
+              {/* Titres similaires */}
+              <SimilarTitles type="movies" id={movie.id} />
             </div>
           </div>
         </div>
@@ -8,6 +8,7 @@ import { Button } from '../components/ui/button';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '../components/ui/select';
 import { Badge } from '../components/ui/badge';
 import { useAuth } from '../context/AuthContext';
+import { syncCollection } from '../utils/catalogSync';
 
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -46,10 +47,16 @@ const MoviesPage = () => {
   
   const fetchMovies = async () => {
     try {
-      const response = await axios.get(`${API}/movies?per_page=5000`);
-      setMovies(response.data.movies || response.data);
-    } catch (error) {
-      console.error('Erreur:', error);
+      // Copie locale synchronisée par différences; téléchargement complet en secours
+      setMovies(await syncCollection('movies'));
+    } catch (syncError) {
+      console.error('Synchronisation locale impossible:', syncError);
+      try {
+        const response = await axios.get(`${API}/movies?per_page=5000`);
+        setMovies(response.data.movies || response.data);
+      } catch (error) {
+        console.error('Erreur:', error);
+      }
     } finally {
       setLoading(false);
     }
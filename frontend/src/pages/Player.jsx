@@ -32,6 +32,7 @@ const PlayerNew = () => {
   const playerContainerRef = useRef(null);
   const progressIntervalRef = useRef(null);
   const controlsTimeoutRef = useRef(null);
+  const viewRecordedRef = useRef(false);
   
   const videoUrl = location.state?.videoUrl;
   const contentId = location.state?.contentId;
@@ -399,6 +400,25 @@ const PlayerNew = () => {
     };
   }, []);
 
+  // Compter une vue au premier démarrage de la lecture (film, ou série pour un épisode)
+  useEffect(() => {
+    if (!isPlaying || viewRecordedRef.current) return;
+    const isSeries = Boolean(seriesId) && (contentType === 'episode' || contentType === 'series');
+    const viewedId = isSeries ? seriesId : contentId;
+    const token = localStorage.getItem('token');
+    if (!viewedId || !token) return;
+
+    viewRecordedRef.current = true;
+    axios.post(`${API}/views`, {
+      content_type: isSeries ? 'series' : 'movie',
+      content_id: viewedId
+    }, {
+      headers: { Authorization: `Bearer ${token}` }
+    }).catch((error) => {
+      console.error('Erreur enregistrement vue:', error);
+    });
+  }, [isPlaying]);
+
   // Sauvegarder la progression
   const saveProgress = () => {
     const video = videoRef.current;
@@ -421,6 +441,25 @@ const PlayerNew = () => {
       
       console.log(`💾 Progression mise à jour pour ${activeContentId}: ${Math.floor(video.currentTime)}s / ${Math.floor(video.duration)}s`);
     }
+
+    // Synchroniser la progression côté serveur (suivi entre appareils)
+    const token = localStorage.getItem('token');
+    if (user && token) {
+      const isEpisode = Boolean(currentEpisode) || contentType === 'episode';
+      axios.post(`${API}/me/progress`, {
+        content_type: isEpisode ? 'episode' : 'movie',
+        content_id: activeContentId,
+        series_id: isEpisode ? seriesId : undefined,
+        season_number: currentEpisode?.season_number ?? seasonNumber,
+        episode_number: currentEpisode?.episode_number ?? episodeNumber,
+        position: video.currentTime,
+        duration: Number.isFinite(video.duration) ? video.duration : undefined
+      }, {
+        headers: { Authorization: `Bearer ${token}` }
+      }).catch((error) => {
+        console.error('Erreur synchronisation progression:', error);
+      });
+    }
   };
 
   // Gestionnaire des raccourcis clavier
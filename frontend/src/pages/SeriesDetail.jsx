@@ -8,6 +8,7 @@ import { toast } from 'sonner';
 import { useAuth } from '../context/AuthContext';
 import Navbar from '../components/Navbar';
 import AdModal from '../components/AdModal';
+import SimilarTitles from '../components/SimilarTitles';
 import {
   Accordion,
   AccordionContent,
@@ -23,14 +24,15 @@ const SeriesDetail = () => {
   const navigate = useNavigate();
   const { user } = useAuth();
   const [series, setSeries] = useState(null);
-  const [episodes, setEpisodes] = useState([]);
+  const [seasonEpisodes, setSeasonEpisodes] = useState({});
   const [loading, setLoading] = useState(true);
   const [isFavorite, setIsFavorite] = useState(false);
   const [seriesFreeAccess, setSeriesFreeAccess] = useState(false);
   const [settingsLoading, setSettingsLoading] = useState(true);
 
   useEffect(() => {
-    fetchSeriesAndEpisodes();
+    setSeasonEpisodes({});
+    fetchSeries();
     fetchSeriesAccessSettings();
   }, [id]);
 
@@ -52,14 +54,11 @@ const SeriesDetail = () => {
     }
   };
 
-  const fetchSeriesAndEpisodes = async () => {
+  // Les saisons viennent du résumé porté par la série; les épisodes sont chargés à l'ouverture d'une saison
+  const fetchSeries = async () => {
     try {
-      const [seriesRes, episodesRes] = await Promise.all([
-        axios.get(`${API}/series/${id}`),
-        axios.get(`${API}/episodes?series_id=${id}&per_page=5000`), // Charger TOUS les épisodes
-      ]);
+      const seriesRes = await axios.get(`${API}/series/${id}`);
       setSeries(seriesRes.data);
-      setEpisodes(episodesRes.data.episodes || episodesRes.data);
     } catch (error) {
       console.error('Erreur:', error);
     } finally {
@@ -67,6 +66,22 @@ const SeriesDetail = () => {
     }
   };
 
+  const fetchSeasonEpisodes = async (season) => {
+    if (seasonEpisodes[season]) return;
+    try {
+      const res = await axios.get(`${API}/episodes?series_id=${id}&season=${season}&per_page=500`);
+      setSeasonEpisodes((prev) => ({ ...prev, [season]: res.data.episodes }));
+    } catch (error) {
+      console.error('Erreur chargement épisodes:', error);
+    }
+  };
+
+  const handleSeasonChange = (value) => {
+    if (value) {
+      fetchSeasonEpisodes(Number(value.replace('season-', '')));
+    }
+  };
+
   const checkFavorite = () => {
     const favorites = JSON.parse(localStorage.getItem('favorites') || '[]');
     setIsFavorite(favorites.some((item) => item.id === series.id));
@@ -147,12 +162,7 @@ const SeriesDetail = () => {
     });
   };
 
-  const groupedEpisodes = episodes.reduce((acc, episode) => {
-    const season = episode.season_number;
-    if (!acc[season]) acc[season] = [];
-    acc[season].push(episode);
-    return acc;
-  }, {});
+  const seasons = series?.seasons || [];
 
   // Afficher un loader pendant le chargement
   if (loading || settingsLoading) {
@@ -317,11 +327,9 @@ const SeriesDetail = () => {
 
                 {/* Saisons et Épisodes */}
                 <div data-testid="episodes-list">
-                  {Object.keys(groupedEpisodes).length > 0 ? (
-                    <Accordion type="single" collapsible className="space-y-2">
-                      {Object.keys(groupedEpisodes)
-                        .sort((a, b) => a - b)
-                        .map((season) => (
+                  {seasons.length > 0 ? (
+                    <Accordion type="single" collapsible className="space-y-2" onValueChange={handleSeasonChange}>
+                      {seasons.map(({ season_number: season, episode_count, available_count }) => (
                           <AccordionItem
                             key={season}
                             value={`season-${season}`}
@@ -330,10 +338,11 @@ const SeriesDetail = () => {
                           >
                             <AccordionTrigger className="px-4 py-3 hover:no-underline hover:bg-white/5">
                               <span className="text-base font-semibold">Saison {season}</span>
+                              <span className="ml-auto mr-3 text-xs text-gray-400">{episode_count} épisode(s)</span>
                             </AccordionTrigger>
                             <AccordionContent className="px-4 pb-3">
                               {/* Message si toute la saison est indisponible */}
-                              {groupedEpisodes[season].every(ep => ep.available === false) && (
+                              {available_count === 0 && (
                                 <div className="mb-3 p-4 rounded-md bg-orange-500/10 border border-orange-500/30">
                                   <div className="flex items-center gap-2 text-orange-400">
                                     <div className="text-lg">⚠️</div>
@@ -342,8 +351,10 @@ const SeriesDetail = () => {
                                 </div>
                               )}
                               <div className="space-y-2 pt-2">
-                                {groupedEpisodes[season]
-                                  .sort((a, b) => a.episode_number - b.episode_number)
+                                {!seasonEpisodes[season] && (
+                                  <div className="text-sm text-gray-400 py-2">Chargement...</div>
+                                )}
+                                {(seasonEpisodes[season] || [])
                                   .map((episode) => (
                                     <div
                                       key={episode.id}
@@ -419,8 +430,8 @@ const SeriesDetail = () => {
                 {series.release_year && (
                   <span className="text-gray-300">{series.release_year}</span>
                 )}
-                {series.total_seasons && (
-                  <span className="text-gray-300">{series.total_seasons} saison(s)</span>
+                {(seasons.length > 0 || series.total_seasons) && (
+                  <span className="text-gray-300">{seasons.length || series.total_seasons} saison(s)</span>
                 )}
                 {series.rating && (
                   <div className="flex items-center gap-1 text-yellow-400">
@@ -495,6 +506,9 @@ const SeriesDetail = () => {
                   </div>
                 </div>
               )}
+
+              {/* Titres similaires */}
+              <SimilarTitles type="series" id={series.id} />
             </div>
           </div>
         </div>
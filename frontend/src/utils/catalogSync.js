@@ -0,0 +1,71 @@
+import axios from 'axios';
+import { API } from './axios';
+
+// Copie locale du catalogue (IndexedDB), tenue à jour par /catalog/changes:
+// seules les modifications depuis la dernière visite sont téléchargées
+const DB_NAME = 'catalog-sync';
+const DB_VERSION = 1;
+const COLLECTIONS = ['movies', 'series'];
+const PAGE_SIZE = 2000;
+
+const request = (req) =>
+  new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+
+const transactionDone = (tx) =>
+  new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve();
+    tx.onerror = () => reject(tx.error);
+    tx.onabort = () => reject(tx.error);
+  });
+
+const openDb = () => {
+  const req = indexedDB.open(DB_NAME, DB_VERSION);
+  req.onupgradeneeded = () => {
+    const db = req.result;
+    COLLECTIONS.forEach((name) => {
+      if (!db.objectStoreNames.contains(name)) db.createObjectStore(name, { keyPath: 'id' });
+    });
+    if (!db.objectStoreNames.contains('meta')) db.createObjectStore('meta', { keyPath: 'collection' });
+  };
+  return request(req);
+};
+
+// Synchronise une collection puis renvoie tous ses documents
+export const syncCollection = async (collection) => {
+  if (!window.indexedDB) throw new Error('IndexedDB indisponible');
+  const db = await openDb();
+  try {
+    let meta = (await request(db.transaction('meta').objectStore('meta').get(collection))) || { collection, since: 0, epoch: null };
+    let hasMore = true;
+
+    while (hasMore) {
+      const { data } = await axios.get(`${API}/catalog/changes`, {
+        params: { since: meta.since, epoch: meta.epoch || undefined, collections: collection, limit: PAGE_SIZE },
+      });
+
+      const tx = db.transaction([collection, 'meta'], 'readwrite');
+      const store = tx.objectStore(collection);
+      if (data.reset) {
+        // Journal compacté ou reconstruit depuis notre séquence: resynchronisation complète
+        store.clear();
+        meta = { collection, since: 0, epoch: data.epoch };
+      } else {
+        data.changes.forEach((change) => {
+          if (change.op === 'delete') store.delete(change.id);
+          else store.put(change.doc);
+        });
+        meta = { collection, since: data.next_since, epoch: data.epoch };
+      }
+      tx.objectStore('meta').put(meta);
+      await transactionDone(tx);
+      hasMore = data.has_more;
+    }
+
+    return await request(db.transaction(collection).objectStore(collection).getAll());
+  } finally {
+    db.close();
+  }
+};